@@ -15,23 +15,37 @@ CONFIG_ENVIRONMENTS_FOLDER = f'{CONFIG_FOLDER}/environments'
 STRATEGIES_CONFIG_FOLDER_NAME = 'strategies'
 STRATEGY_MANAGERS_CONFIG_FOLDER_NAME = 'strategy_managers'
 LOG_FOLDER = '.logs'
+CACHE_FOLDER = '.cache'
+
+BINANCE_METADATA_SNAPSHOT_FILENAME = 'binance_metadata.json'
 
 DB_NAME_HISTORY = 'history'
 COLLECTION_REQUEST_DATA = 'request_data'
 COLLECTION_BROKER_RESPONSE = 'broker_response'
+COLLECTION_REQUEST_TRACES = 'request_traces'
+COLLECTION_CAPITAL_JOURNAL = 'capital_journal'
+COLLECTION_CIRCUIT_BREAKER_EVENTS = 'circuit_breaker_events'
 
 DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING = 'strategy_crypto_pair_trading'
 COLLECTION_POSITION_INFO = 'position_info'
+COLLECTION_ARM_INFO = 'arm_info'
 
 DB_NAME_MIRAGE_SECURITY = 'mirage_security'
 COLLECTION_REQUEST_NONCES = 'request_nonces'
 
+DB_NAME_MIRAGE_SEQUENCER = 'mirage_sequencer'
+COLLECTION_SEQUENCE_STATES = 'sequence_states'
+COLLECTION_PENDING_SIGNALS = 'pending_signals'
+
 DB_NAME_MIRAGE_PERFORMANCE = 'mirage_performance'
 COLLECTION_TRADES_PERFORMANCE = 'trades_performance'
 
 RECORD_KEY_CREATED_AT = 'created_at'
 RECORD_KEY_UPDATED_AT = 'updated_at'
 
+# Signal time in request data. Set by Mirage security from authenticated message, or sent in body for other methods.
+REQUEST_KEY_TIMENOW = 'timenow'
+
 STRATEGY_MODULE_PREFIX = 'mirage.strategy'
 STRATEGY_MANAGER_MODULE_PREFIX = 'mirage.strategy_manager'
 
@@ -6,6 +6,9 @@ import signal
 import logging
 
 from mirage.config.config_manager import ConfigManager
+from mirage.jobs.account_reconcile.account_reconcile_job import AccountReconcileJob
+from mirage.jobs.armed_entry_expiry.armed_entry_expiry_job import ArmedEntryExpiryJob
+from mirage.jobs.binance_metadata.binance_metadata_refresh_job import BinanceMetadataRefreshJob
 from mirage.jobs.mirage_job_manager import MirageJobManager
 from mirage.jobs.self_update.self_update_job import SelfUpdateJob
 from mirage.mirage_nexus import MirageNexus
@@ -40,6 +43,7 @@ def _create_config_folders():
 def create_folders():
     _create_config_folders()
     Path(consts.LOG_FOLDER).mkdir(parents=True, exist_ok=True)
+    Path(consts.CACHE_FOLDER).mkdir(parents=True, exist_ok=True)
 
 
 def bootstrap():
@@ -76,7 +80,10 @@ async def main():
     signal.signal(signal.SIGINT, signal_handler)
 
     job_manager = MirageJobManager([
-        SelfUpdateJob(60)
+        SelfUpdateJob(60),
+        BinanceMetadataRefreshJob(3600),
+        AccountReconcileJob(30),
+        ArmedEntryExpiryJob(10)
     ])
 
     logging.info('Main loop running')
@@ -1,9 +1,12 @@
 from dataclasses import dataclass
 import logging
-from ccxt.base.errors import OperationRejected, ExchangeError
+from ccxt.base.errors import OperationRejected
 from mirage.algorithm.borrow.exceptions import BorrowAlgorithmException, NoLendersException
 from mirage.algorithm.mirage_algorithm import CommandBase, MirageAlgorithm
-from mirage.brokers.binance.binance import Binance
+from mirage.brokers.binance.account_mirror import BinanceAccountMirror
+from mirage.brokers.binance.binance_metadata import BinanceMetadata
+from mirage.brokers.binance.binance_rate_limiter import BinanceRateLimiter
+from mirage.brokers.binance.binance_sessions import BinanceSessions
 
 
 @dataclass
@@ -20,24 +23,23 @@ class RepayCommand(CommandBase):
 
 class BorrowAlgorithm(MirageAlgorithm):
     """
-    We provide param amount as ccxt fetching precision for each coin and may reduce borrowing according to that precision.
-    Binance can return small precisions, like 1 for NEO, but in practice it allows to borrow up to 8 decimals for most coins, even the cheapest.
+    We provide param amount ourselves, as ccxt uses coin withdraw precision and may reduce borrowing according to it.
+    Binance can return small precisions, like 1 for NEO, but in practice it allows to borrow up to the coin's market step size.
     Therefore, we avoid case where we request to borrow, for example 3.2 NEO when actually will be borrowed only 3 - and it will cause errors.
-    So we kinda override the ccxt precision calculation stuff here.
 
-    But still, there are some cases(NOT coin) where precision needed to avoid errors. So if we get precision relevant error we execute algorithm again
-    but this time with the original precision reduction logic of ccxt.
-
-    Therefore recommended for strategies to use the actual amount borrowed param for further calculations.
+    Amount is floored to the coin step from exchange metadata index, so request is sent once with valid precision.
+    Still, recommended for strategies to use the actual amount borrowed, found in result of each borrow command, for further calculations.
     """
 
     ERROR_CODE_NO_LENDERS = 'binance {"code":-3045,"msg":"The system does not have enough asset now."}'
-    ERROR_CODE_PRECISION_OVER_MAX_DEFINED = 'binance {"code":51077,"msg":"Precision is over the maximum defined for this asset."}'
 
-    PARAM_ACTUALLY_BORROWED_AMOUNT = 'actually_borrowed_amount'
+    WALLET_MARGIN = 'margin'
+
+    RESULT_KEY_ACTUALLY_BORROWED_AMOUNT = 'actually_borrowed_amount'
     description = 'Supports borrow & repay commands in Binance cross margin wallet'
+    max_concurrency = 4
 
-    async def _process_command(self, command: dataclass) -> None:
+    async def _process_command(self, command: dataclass) -> dict[str, any]:
         if isinstance(command, BorrowCommand):
             result = await self._process_operation_borrow(command)
         elif isinstance(command, RepayCommand):
@@ -45,26 +47,19 @@ class BorrowAlgorithm(MirageAlgorithm):
         else:
             raise BorrowAlgorithmException(f'Unknown {self.__class__.__name__} command')
 
-        self.command_results.append(result)
+        BinanceAccountMirror.mark_changed(BorrowAlgorithm.WALLET_MARGIN)
+        return result
 
     async def _process_operation_borrow(self, command: BorrowCommand) -> dict[str, any]:
         try:
-            self.custom_params[BorrowAlgorithm.PARAM_ACTUALLY_BORROWED_AMOUNT] = command.amount
-
-            binance = Binance()
-            async with binance.exchange:
-                logging.info('Borrowing coin on Binance margin. Symbol %s, amount: %s', command.symbol, command.amount)
-                try:
-                    return await binance.exchange.borrow_cross_margin(command.symbol, command.amount, params={'amount': str(command.amount)})
-                except ExchangeError as err:
-                    if err.args[0] == BorrowAlgorithm.ERROR_CODE_PRECISION_OVER_MAX_DEFINED:
-                        logging.info('Failed borrow without precision amount reduction. Trying with ccxt precision.')
-                        self.custom_params[BorrowAlgorithm.PARAM_ACTUALLY_BORROWED_AMOUNT] = float(binance.exchange.currency_to_precision(
-                            command.symbol, command.amount
-                        ))
-                        return await binance.exchange.borrow_cross_margin(command.symbol, command.amount)
-
-                    raise err
+            amount = BinanceMetadata.floor_currency_step(command.symbol, command.amount)
+
+            exchange = BinanceSessions.get_session().exchange
+            logging.info('Borrowing coin on Binance margin. Symbol %s, amount: %s', command.symbol, amount)
+            result = await BinanceRateLimiter.request(exchange.borrow_cross_margin, command.symbol, amount, params={'amount': str(amount)})
+
+            # Kept per command, as commands may run concurrently
+            return {**result, BorrowAlgorithm.RESULT_KEY_ACTUALLY_BORROWED_AMOUNT: amount}
 
         except OperationRejected as exc:
             if exc.args[0] == BorrowAlgorithm.ERROR_CODE_NO_LENDERS:
@@ -73,14 +68,8 @@ class BorrowAlgorithm(MirageAlgorithm):
             raise exc
 
     async def _process_operation_repay(self, command: RepayCommand) -> dict[str, any]:
-        binance = Binance()
-        async with binance.exchange:
-            logging.info('Repaying coin on Binance margin. Symbol %s, amount: %s', command.symbol, command.amount)
-            try:
-                return await binance.exchange.repay_cross_margin(command.symbol, command.amount, params={'amount': str(command.amount)})
-            except ExchangeError as err:
-                if err.args[0] == BorrowAlgorithm.ERROR_CODE_PRECISION_OVER_MAX_DEFINED:
-                    logging.info('Failed repay without precision amount reduction. Trying with ccxt precision.')
-                    return await binance.exchange.repay_cross_margin(command.symbol, command.amount)
-
-                raise err
+        amount = BinanceMetadata.floor_currency_step(command.symbol, command.amount)
+
+        exchange = BinanceSessions.get_session().exchange
+        logging.info('Repaying coin on Binance margin. Symbol %s, amount: %s', command.symbol, amount)
+        return await BinanceRateLimiter.request(exchange.repay_cross_margin, command.symbol, amount, params={'amount': str(amount)})
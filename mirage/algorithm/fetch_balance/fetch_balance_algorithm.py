@@ -1,9 +1,12 @@
 
 from dataclasses import dataclass
 import logging
+import time
 from ccxt.base.types import Balances
 from mirage.algorithm.mirage_algorithm import CommandBase, MirageAlgorithm
-from mirage.brokers.binance.binance import Binance
+from mirage.brokers.binance.account_mirror import BinanceAccountMirror
+from mirage.brokers.binance.binance_rate_limiter import BinanceRateLimiter
+from mirage.brokers.binance.binance_sessions import BinanceSessions
 
 
 class FetchCommandException(Exception):
@@ -17,16 +20,18 @@ class Command(CommandBase):
 
 class FetchBalanceAlgorithm(MirageAlgorithm):
     description = 'Fetch balance of wallet Binance'
+    max_concurrency = 4
 
-    async def _process_command(self, command: dataclass) -> None:
+    async def _process_command(self, command: dataclass) -> Balances:
         if not isinstance(command, Command):
             raise FetchCommandException(f'Unknown {self.__class__.__name__} command')
 
-        result = await self._fetch_balance(command)
-        self.command_results.append(result)
+        return await self._fetch_balance(command)
 
     async def _fetch_balance(self, command: Command) -> Balances:
-        binance = Binance()
-        async with binance.exchange:
-            logging.info('Fetching balance for wallet: %s', str(command.wallet))
-            return await binance.exchange.fetch_balance({'type': command.wallet})
+        exchange = BinanceSessions.get_session().exchange
+        logging.info('Fetching balance for wallet: %s', str(command.wallet))
+        started_at = time.time()
+        balance = await BinanceRateLimiter.request(exchange.fetch_balance, {'type': command.wallet})
+        BinanceAccountMirror.update_from_balance(command.wallet, balance, snapshot_started_at=started_at)
+        return balance
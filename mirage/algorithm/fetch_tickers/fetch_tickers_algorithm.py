@@ -3,7 +3,8 @@ from dataclasses import dataclass
 import logging
 from ccxt.base.types import Tickers
 from mirage.algorithm.mirage_algorithm import CommandBase, MirageAlgorithm
-from mirage.brokers.binance.binance import Binance
+from mirage.brokers.binance.binance_rate_limiter import BinanceRateLimiter
+from mirage.brokers.binance.binance_sessions import BinanceSessions
 
 
 class FetchTickersException(Exception):
@@ -16,17 +17,16 @@ class Command(CommandBase):
 
 
 class FetchTickersAlgorithm(MirageAlgorithm):
-    description = 'Transfer funds between wallets in Binance'
+    description = 'Fetch tickers of symbols in Binance'
+    max_concurrency = 4
 
-    async def _process_command(self, command: dataclass) -> None:
+    async def _process_command(self, command: dataclass) -> Tickers:
         if not isinstance(command, Command):
             raise FetchTickersException(f'Unknown {self.__class__.__name__} command')
 
-        result = await self._fetch_tickers(command)
-        self.command_results.append(result)
+        return await self._fetch_tickers(command)
 
     async def _fetch_tickers(self, command: Command) -> Tickers:
-        binance = Binance()
-        async with binance.exchange:
-            logging.info('Fetching tickers: %s', str(command.symbols))
-            return await binance.exchange.fetch_tickers(command.symbols)
+        exchange = BinanceSessions.get_session().exchange
+        logging.info('Fetching tickers: %s', str(command.symbols))
+        return await BinanceRateLimiter.request(exchange.fetch_tickers, command.symbols)
@@ -1,10 +1,12 @@
 from abc import ABCMeta, abstractmethod
+import asyncio
 from dataclasses import dataclass
 import logging
 
 import consts
-from mirage.brokers.binance.binance import Binance
-from mirage.database.mongo.common_operations import insert_dict
+from mirage.brokers.binance.binance_sessions import BinanceSessions
+from mirage.database.mongo.write_behind_writer import WriteBehindWriter
+from mirage.tracing.request_tracer import RequestTracer
 from mirage.utils.dict_utils import dataclass_to_dict
 from mirage.utils.variable_reference import VariableReference
 
@@ -21,9 +23,18 @@ class CommandBase:
 
 
 class MirageAlgorithm:
+    """
+    Algorithms whose commands don't depend on each other can raise max_concurrency, so commands are processed concurrently.
+    Results keep commands order either way. In concurrent mode all commands run to completion, failed ones are recorded
+    with their error and the first error in commands order is raised after results are flushed.
+    """
+
     __metaclass__ = ABCMeta
 
     description = ''
+    max_concurrency = 1
+
+    RESULT_KEY_ERROR = 'error'
 
     def __init__(self, capital_flow: VariableReference, spent_fees: VariableReference, request_data_id: str, commands: list[CommandBase]):
         self._capital_flow = capital_flow
@@ -31,10 +42,14 @@ class MirageAlgorithm:
         self._request_data_id = request_data_id
         self.commands = commands
         self.command_results = []
+        self.command_errors: dict[int, Exception] = {}
         self.custom_params = {}
 
     @abstractmethod
-    async def _process_command(self, command: dataclass) -> None:
+    async def _process_command(self, command: dataclass) -> any:
+        """
+        Process single command and return its result.
+        """
         raise NotImplementedError()
 
     def _validate_have_funds(self, expected_cost: float = 0) -> None:
@@ -47,18 +62,51 @@ class MirageAlgorithm:
     async def execute(self) -> None:
         logging.info('Executing %s', self.__class__.__name__)
 
-        for command in self.commands:
-            await self._process_command(command)
+        if self.max_concurrency <= 1 or len(self.commands) <= 1:
+            for index, command in enumerate(self.commands):
+                self.command_results.append(await self._process_traced_command(index, command))
+
+            await self._flush_command_results()
+            return
+
+        await self._execute_concurrently()
+
+    async def _execute_concurrently(self) -> None:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def process_command(index: int, command: CommandBase) -> any:
+            async with semaphore:
+                return await self._process_traced_command(index, command)
+
+        results = await asyncio.gather(*[process_command(index, command) for index, command in enumerate(self.commands)], return_exceptions=True)
+        for index, result in enumerate(results):
+            if isinstance(result, Exception):
+                logging.error('%s command %s failed: %s', self.__class__.__name__, index, repr(result))
+                self.command_errors[index] = result
+                self.command_results.append({MirageAlgorithm.RESULT_KEY_ERROR: repr(result)})
+                continue
+
+            if isinstance(result, BaseException):
+                raise result
+
+            self.command_results.append(result)
 
         await self._flush_command_results()
 
+        if self.command_errors:
+            raise self.command_errors[min(self.command_errors)]
+
+    async def _process_traced_command(self, index: int, command: CommandBase) -> any:
+        with RequestTracer.span(f'{self.__class__.__name__}.command', index=index, description=command.description):
+            return await self._process_command(command)
+
     async def _flush_command_results(self) -> None:
-        insert_dict(
+        WriteBehindWriter.enqueue(
             consts.DB_NAME_HISTORY,
             consts.COLLECTION_BROKER_RESPONSE,
             {
                 'request_data_id': self._request_data_id,
-                'broker': Binance.BINANCE,
+                'broker': BinanceSessions.selected_broker.get(),
                 'commands': [dataclass_to_dict(command) for command in self.commands],
                 'command_results': self.command_results,
                 'custom_params': self.custom_params
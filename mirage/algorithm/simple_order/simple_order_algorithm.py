@@ -3,9 +3,11 @@ from abc import ABCMeta
 from dataclasses import dataclass
 import logging
 from typing import Optional
-import consts
 from mirage.algorithm.mirage_algorithm import CommandBase, MirageAlgorithm, MirageAlgorithmException
-from mirage.brokers.binance.binance import Binance
+from mirage.brokers.binance.account_mirror import BinanceAccountMirror
+from mirage.brokers.binance.binance_metadata import BinanceMetadata
+from mirage.brokers.binance.binance_rate_limiter import BinanceRateLimiter
+from mirage.brokers.binance.binance_sessions import BinanceSessions
 
 
 class SimpleOrderAlgorithmException(MirageAlgorithmException):
@@ -46,7 +48,7 @@ class SimpleOrderAlgorithm(MirageAlgorithm):
     OPERATION_BUY = 'buy'
     OPERATION_SELL = 'sell'
 
-    async def _process_command(self, command: CommandBase) -> None:
+    async def _process_command(self, command: CommandBase) -> dict[str, any]:
         self._validate_command(command)
 
         if isinstance(command, CommandAmount):
@@ -58,9 +60,10 @@ class SimpleOrderAlgorithm(MirageAlgorithm):
         else:
             raise SimpleOrderAlgorithmException(f'Unknown {self.__class__.__name__} command')
 
+        BinanceAccountMirror.mark_changed(command.wallet)
         self._capital_flow.variable += order['cost'] if command.operation == SimpleOrderAlgorithm.OPERATION_SELL else -order['cost']
-        self._spent_fees.variable += order['cost'] * consts.BINANCE_TRADE_FEE
-        self.command_results.append(order)
+        self._spent_fees.variable += order['cost'] * BinanceMetadata.get_taker_fee(command.symbol)
+        return order
 
     def _validate_command(self, command: CommandBase) -> None:
         if command.operation not in [SimpleOrderAlgorithm.OPERATION_BUY, SimpleOrderAlgorithm.OPERATION_SELL]:
@@ -79,38 +82,38 @@ class SimpleOrderAlgorithm(MirageAlgorithm):
             raise SimpleOrderAlgorithmException('No cost command for limit order type')
 
     async def _process_command_amount(self, command: CommandAmount) -> None:
-        binance = Binance()
-        async with binance.exchange:
-            logging.info(
-                'Placing %s order on binance. Symbol: %s, Side: %s, Amount: %s',
-                command.wallet, command.symbol, command.operation, command.amount
-            )
-            return await binance.exchange.create_order(
-                symbol=command.symbol,
-                type=command.type,
-                side=command.operation,
-                amount=command.amount,
-                price=command.price,
-                params={
-                    'type': command.wallet
-                }
-            )
+        exchange = BinanceSessions.get_session().exchange
+        logging.info(
+            'Placing %s order on binance. Symbol: %s, Side: %s, Amount: %s',
+            command.wallet, command.symbol, command.operation, command.amount
+        )
+        return await BinanceRateLimiter.request(
+            exchange.create_order,
+            symbol=command.symbol,
+            type=command.type,
+            side=command.operation,
+            amount=command.amount,
+            price=command.price,
+            params={
+                'type': command.wallet
+            }
+        )
 
     async def _process_command_cost(self, command: CommandCost) -> None:
-        binance = Binance()
-        async with binance.exchange:
-            logging.info(
-                'Placing %s order on binance. Symbol: %s, Side: %s, Cost: %s',
-                command.wallet, command.symbol, command.operation, command.cost
-            )
-            return await binance.exchange.create_order(
-                symbol=command.symbol,
-                type=command.type,
-                side=command.operation,
-                amount=command.cost,
-                price=command.price,
-                params={
-                    'type': command.wallet,
-                    'quoteOrderQty': command.cost
-                }
-            )
+        exchange = BinanceSessions.get_session().exchange
+        logging.info(
+            'Placing %s order on binance. Symbol: %s, Side: %s, Cost: %s',
+            command.wallet, command.symbol, command.operation, command.cost
+        )
+        return await BinanceRateLimiter.request(
+            exchange.create_order,
+            symbol=command.symbol,
+            type=command.type,
+            side=command.operation,
+            amount=command.cost,
+            price=command.price,
+            params={
+                'type': command.wallet,
+                'quoteOrderQty': command.cost
+            }
+        )
@@ -3,7 +3,9 @@ from dataclasses import dataclass
 import logging
 from ccxt.base.types import TransferEntry
 from mirage.algorithm.mirage_algorithm import CommandBase, MirageAlgorithm
-from mirage.brokers.binance.binance import Binance
+from mirage.brokers.binance.account_mirror import BinanceAccountMirror
+from mirage.brokers.binance.binance_rate_limiter import BinanceRateLimiter
+from mirage.brokers.binance.binance_sessions import BinanceSessions
 
 
 class TransferAlgorithmException(Exception):
@@ -20,19 +22,20 @@ class Command(CommandBase):
 
 class TransferAlgorithm(MirageAlgorithm):
     description = 'Transfer funds between wallets in Binance'
+    max_concurrency = 4
 
-    async def _process_command(self, command: dataclass) -> None:
+    async def _process_command(self, command: dataclass) -> TransferEntry:
         if not isinstance(command, Command):
             raise TransferAlgorithmException(f'Unknown {self.__class__.__name__} command')
 
-        order = await self._transfer_funds(command)
-        self.command_results.append(order)
+        return await self._transfer_funds(command)
 
     async def _transfer_funds(self, command: Command) -> TransferEntry:
-        binance = Binance()
-        async with binance.exchange:
-            logging.info(
-                'Transferring coin on Binance. Asset %s, amount: %s, from: %s, to: %s',
-                command.asset, command.amount, command.from_wallet, command.to_wallet
-            )
-            return await binance.exchange.transfer(command.asset, command.amount, command.from_wallet, command.to_wallet)
+        exchange = BinanceSessions.get_session().exchange
+        logging.info(
+            'Transferring coin on Binance. Asset %s, amount: %s, from: %s, to: %s',
+            command.asset, command.amount, command.from_wallet, command.to_wallet
+        )
+        transfer = await BinanceRateLimiter.request(exchange.transfer, command.asset, command.amount, command.from_wallet, command.to_wallet)
+        BinanceAccountMirror.apply_transfer(command.asset, command.amount, command.from_wallet, command.to_wallet)
+        return transfer
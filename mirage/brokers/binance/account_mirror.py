@@ -0,0 +1,163 @@
+from dataclasses import dataclass, field
+import time
+from typing import Optional
+from ccxt.base.types import Balances
+
+from mirage.brokers.binance.binance_sessions import BinanceSessions
+
+
+@dataclass
+class WalletState:
+    # Per coin: free, used, total & debt(margin only)
+    balances: dict[str, dict[str, float]] = field(default_factory=dict)
+    updated_at: Optional[float] = None
+    # When last rest snapshot was requested. Our transfers during the request may or may not be in it.
+    snapshot_started_at: Optional[float] = None
+    # Our transfer was confirmed while last snapshot was requested
+    has_transfer_in_doubt: bool = False
+    # Margin wallet totals as returned by rest api. Needed to calculate margin level.
+    margin_info: Optional[dict[str, any]] = None
+    margin_info_updated_at: Optional[float] = None
+    # Balances changed since margin info was fetched, so margin level can't be calculated from it anymore
+    margin_info_dirty: bool = False
+
+
+class BinanceAccountMirror:
+    """
+    Local mirror of Binance wallets, so strategy managers can answer balance questions from memory instead of rest calls on trade path.
+    Margin wallet coin balances are kept current by user data stream. Funding wallet is not in the stream, so it's kept current only
+    by our own transfers and periodic rest reconciliation - outside deposits show up after reconcile.
+    Margin info (collateral & liability totals) comes only from rest snapshots. Stream doesn't carry it, and it can't be rebuilt
+    from coin balances without collateral ratios, so any trade or borrow makes it dirty. In practice margin level check after
+    trading, like transfer out on exit, still goes to rest. Mirror saves it only when nothing traded since last snapshot.
+    Readers pass max age, and should fall back to rest when mirror returns None.
+    Mirrors real account only, so it's bypassed while paper broker is selected.
+    """
+
+    BALANCE_STRUCTURE_KEYS = {'info', 'free', 'used', 'total', 'debt', 'timestamp', 'datetime'}
+    MARGIN_INFO_KEYS = ['totalCollateralValueInUSDT', 'totalAssetOfBtc', 'totalLiabilityOfBtc']
+
+    wallets: dict[str, WalletState] = {}
+    # When our last transfer touching each wallet was confirmed. Kept apart from wallet state, so it survives invalidation.
+    transfer_times: dict[str, float] = {}
+
+    @staticmethod
+    def update_from_balance(wallet: str, balance: Balances, is_full_snapshot: bool = True, snapshot_started_at: Optional[float] = None) -> None:
+        """
+        Rest responses are full snapshots, and should pass when they were requested. Stream updates contain only changed coins,
+        so those are merged.
+        """
+        if BinanceSessions.is_paper_selected():
+            return
+
+        state = BinanceAccountMirror._get_wallet_state(wallet)
+        if is_full_snapshot:
+            state.balances = {}
+
+        for code, account in balance.items():
+            if code in BinanceAccountMirror.BALANCE_STRUCTURE_KEYS or not isinstance(account, dict):
+                continue
+
+            coin_state = state.balances.setdefault(code, {})
+            for key in ['free', 'used', 'total', 'debt']:
+                if account.get(key) is not None:
+                    coin_state[key] = float(account[key])
+
+        now = time.time()
+        # Partial update without previous snapshot does not give the full wallet picture
+        if is_full_snapshot or state.updated_at is not None:
+            state.updated_at = now
+        if is_full_snapshot:
+            state.snapshot_started_at = snapshot_started_at if snapshot_started_at is not None else now
+            last_transfer_at = BinanceAccountMirror.transfer_times.get(wallet)
+            state.has_transfer_in_doubt = last_transfer_at is not None and last_transfer_at >= state.snapshot_started_at
+
+        info = balance.get('info')
+        if is_full_snapshot and isinstance(info, dict) and all(key in info for key in BinanceAccountMirror.MARGIN_INFO_KEYS):
+            state.margin_info = {key: info[key] for key in BinanceAccountMirror.MARGIN_INFO_KEYS}
+            state.margin_info_updated_at = now
+            state.margin_info_dirty = False
+        elif not is_full_snapshot:
+            state.margin_info_dirty = True
+
+    @staticmethod
+    def apply_transfer(asset: str, amount: float, from_wallet: str, to_wallet: str) -> None:
+        if BinanceSessions.is_paper_selected():
+            return
+
+        BinanceAccountMirror._apply_delta(from_wallet, asset, -amount)
+        BinanceAccountMirror._apply_delta(to_wallet, asset, amount)
+
+    @staticmethod
+    def mark_changed(wallet: str) -> None:
+        """
+        Called after our own trades/borrows, in case stream update did not arrive yet.
+        """
+        if BinanceSessions.is_paper_selected():
+            return
+
+        state = BinanceAccountMirror._get_wallet_state(wallet)
+        state.margin_info_dirty = True
+
+    @staticmethod
+    def invalidate(wallet: str) -> None:
+        BinanceAccountMirror.wallets.pop(wallet, None)
+
+    @staticmethod
+    def get_free(wallet: str, code: str, max_age: float) -> Optional[float]:
+        if BinanceSessions.is_paper_selected():
+            return None
+
+        state = BinanceAccountMirror.wallets.get(wallet)
+        if state is None or state.updated_at is None or time.time() - state.updated_at > max_age:
+            return None
+
+        return state.balances.get(code, {}).get('free', 0)
+
+    @staticmethod
+    def get_balance_time(wallet: str) -> Optional[float]:
+        """
+        Time till which our transfers are known to be in mirrored balances. Transfers are applied as soon as confirmed,
+        so it's now, unless one was confirmed while last snapshot was requested.
+        """
+        state = BinanceAccountMirror.wallets.get(wallet)
+        if state is None or state.snapshot_started_at is None:
+            return None
+
+        if state.has_transfer_in_doubt:
+            return state.snapshot_started_at
+
+        return time.time()
+
+    @staticmethod
+    def get_margin_info(wallet: str, max_age: float) -> Optional[dict[str, any]]:
+        if BinanceSessions.is_paper_selected():
+            return None
+
+        state = BinanceAccountMirror.wallets.get(wallet)
+        if state is None or state.margin_info is None or state.margin_info_dirty:
+            return None
+
+        if time.time() - state.margin_info_updated_at > max_age:
+            return None
+
+        return state.margin_info
+
+    @staticmethod
+    def _apply_delta(wallet: str, code: str, delta: float) -> None:
+        BinanceAccountMirror.transfer_times[wallet] = time.time()
+        state = BinanceAccountMirror.wallets.get(wallet)
+        if state is None:
+            return
+
+        coin_state = state.balances.setdefault(code, {'free': 0, 'used': 0, 'total': 0})
+        coin_state['free'] = coin_state.get('free', 0) + delta
+        coin_state['total'] = coin_state.get('total', 0) + delta
+        state.margin_info_dirty = True
+
+    @staticmethod
+    def _get_wallet_state(wallet: str) -> WalletState:
+        if wallet not in BinanceAccountMirror.wallets:
+            BinanceAccountMirror.wallets[wallet] = WalletState()
+
+        return BinanceAccountMirror.wallets[wallet]
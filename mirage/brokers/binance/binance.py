@@ -8,8 +8,14 @@ class Binance:
     KEY_API_KEY = 'brokers.binance.api_key'
     KEY_SECRET_KEY = 'brokers.binance.secret_key'
 
-    def __init__(self):
+    def __init__(self, api_key: str = None, secret_key: str = None, exchange: ccxt.binance = None):
+        if exchange is not None:
+            self.exchange = exchange
+            return
+
         self.exchange = ccxt.binance({
-            'apiKey': ConfigManager.config.get(Binance.KEY_API_KEY),
-            'secret': ConfigManager.config.get(Binance.KEY_SECRET_KEY),
+            'apiKey': api_key if api_key is not None else ConfigManager.config.get(Binance.KEY_API_KEY),
+            'secret': secret_key if secret_key is not None else ConfigManager.config.get(Binance.KEY_SECRET_KEY),
+            # Weight budget shared by all calls is handled by BinanceRateLimiter
+            'enableRateLimit': False
         })
@@ -0,0 +1,203 @@
+import asyncio
+from dataclasses import dataclass
+import logging
+import os
+from pathlib import Path
+import time
+from typing import Optional
+import ccxt.async_support as ccxt
+
+import consts
+from mirage.brokers.binance.binance_rate_limiter import BinanceRateLimiter
+from mirage.utils import json_codec
+from mirage.utils.symbol_utils import floor_amount, floor_coin_amount, floor_to_step
+
+
+@dataclass
+class MarketMetadata:
+    symbol: str
+    base: str
+    quote: str
+    amount_step: Optional[float]
+    price_step: Optional[float]
+    cost_step: Optional[float]
+    min_amount: Optional[float]
+    min_notional: Optional[float]
+    maker_fee: Optional[float]
+    taker_fee: Optional[float]
+
+
+class BinanceMetadata:
+    """
+    Index of precision, step sizes, min notional and fees per symbol, built once from loaded markets.
+    Fees are the account's, by its VIP tier and BNB discount. Markets only have exchange default fees, used till account fees are loaded.
+    Lets us round amounts correctly in one pass instead of guessing decimals and retrying on precision errors.
+    Raw markets & currencies are saved to disk, so after restart the exchange can be warmed from the snapshot and refreshed in background.
+    """
+
+    # Markets we trade are quoted in this currency, so its market step is what the exchange accepts for the coin
+    QUOTE_CURRENCY = consts.COIN_NAME_USDT
+    DEFAULT_DECIMALS = 8
+
+    markets: dict[str, MarketMetadata] = {}
+    account_fees: dict[str, dict[str, any]] = {}
+    refreshed_at: Optional[float] = None
+    refresh_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    async def init(exchange: ccxt.binance) -> None:
+        if BinanceMetadata._load_snapshot(exchange):
+            logging.info('Binance metadata loaded from snapshot. Refreshing in background.')
+            BinanceMetadata.refresh_task = asyncio.create_task(BinanceMetadata.refresh(exchange))
+            return
+
+        await BinanceMetadata.refresh(exchange)
+
+    @staticmethod
+    async def refresh(exchange: ccxt.binance) -> None:
+        try:
+            await BinanceRateLimiter.request(exchange.load_markets, reload=True)
+            BinanceMetadata._build_index(exchange.markets)
+            BinanceMetadata._save_snapshot(exchange)
+            logging.info('Binance metadata refreshed. Markets: %s', len(BinanceMetadata.markets))
+
+        except Exception:
+            logging.exception('Failed refreshing binance metadata')
+
+        await BinanceMetadata._refresh_account_fees(exchange)
+
+    @staticmethod
+    async def _refresh_account_fees(exchange: ccxt.binance) -> None:
+        """
+        Not saved to snapshot, as they belong to api key and change with account tier.
+        """
+        try:
+            BinanceMetadata.account_fees = await BinanceRateLimiter.request(exchange.fetch_trading_fees)
+            BinanceMetadata._apply_account_fees(BinanceMetadata.markets)
+            logging.info('Binance account trading fees refreshed. Symbols: %s', len(BinanceMetadata.account_fees))
+
+        except Exception:
+            logging.exception('Failed refreshing binance account trading fees. Using market fees.')
+
+    @staticmethod
+    def get_market(symbol: str) -> Optional[MarketMetadata]:
+        return BinanceMetadata.markets.get(symbol)
+
+    @staticmethod
+    def get_taker_fee(symbol: str) -> float:
+        market = BinanceMetadata.get_market(symbol)
+        if market is None or market.taker_fee is None:
+            return consts.BINANCE_TRADE_FEE
+
+        return market.taker_fee
+
+    @staticmethod
+    def floor_market_amount(symbol: str, amount: float) -> float:
+        """
+        Floor coin amount to the step size the exchange accepts for the symbol.
+        """
+        market = BinanceMetadata.get_market(symbol)
+        if market is None or market.amount_step is None:
+            return floor_amount(amount, BinanceMetadata.DEFAULT_DECIMALS)
+
+        return floor_to_step(amount, market.amount_step)
+
+    @staticmethod
+    def floor_market_cost(symbol: str, cost: float) -> float:
+        """
+        Floor quote currency cost of order to the precision the exchange accepts for the symbol.
+        """
+        market = BinanceMetadata.get_market(symbol)
+        if market is None or market.cost_step is None:
+            return floor_amount(cost, BinanceMetadata.DEFAULT_DECIMALS)
+
+        return floor_to_step(cost, market.cost_step)
+
+    @staticmethod
+    def floor_currency_step(code: str, amount: float) -> float:
+        """
+        Floor coin amount, for borrow or repay, to the coin's step size.
+        """
+        return BinanceMetadata.floor_market_amount(f'{code}/{BinanceMetadata.QUOTE_CURRENCY}', amount)
+
+    @staticmethod
+    def floor_currency_amount(code: str, amount: float) -> float:
+        """
+        Same as floor_coin_amount, but with coin step from the index. Deducts one step to give room for miscalculations.
+        """
+        market = BinanceMetadata.get_market(f'{code}/{BinanceMetadata.QUOTE_CURRENCY}')
+        if market is None or market.amount_step is None:
+            return floor_coin_amount(code, amount)
+
+        return floor_to_step(amount - market.amount_step, market.amount_step)
+
+    @staticmethod
+    def _build_index(raw_markets: dict[str, dict[str, any]]) -> None:
+        markets = {}
+        for symbol, raw_market in raw_markets.items():
+            if not raw_market.get('spot'):
+                continue
+
+            precision = raw_market.get('precision') or {}
+            limits = raw_market.get('limits') or {}
+            markets[symbol] = MarketMetadata(
+                symbol=symbol,
+                base=raw_market.get('base'),
+                quote=raw_market.get('quote'),
+                amount_step=precision.get('amount'),
+                price_step=precision.get('price'),
+                cost_step=precision.get('quote'),
+                min_amount=(limits.get('amount') or {}).get('min'),
+                min_notional=(limits.get('cost') or {}).get('min'),
+                maker_fee=raw_market.get('maker'),
+                taker_fee=raw_market.get('taker')
+            )
+
+        BinanceMetadata._apply_account_fees(markets)
+        BinanceMetadata.markets = markets
+        BinanceMetadata.refreshed_at = time.time()
+
+    @staticmethod
+    def _apply_account_fees(markets: dict[str, MarketMetadata]) -> None:
+        for symbol, fees in BinanceMetadata.account_fees.items():
+            market = markets.get(symbol)
+            if market is None:
+                continue
+
+            if fees.get('maker') is not None:
+                market.maker_fee = fees['maker']
+            if fees.get('taker') is not None:
+                market.taker_fee = fees['taker']
+
+    @staticmethod
+    def _get_snapshot_path() -> Path:
+        return Path(consts.CACHE_FOLDER) / consts.BINANCE_METADATA_SNAPSHOT_FILENAME
+
+    @staticmethod
+    def _save_snapshot(exchange: ccxt.binance) -> None:
+        snapshot_path = BinanceMetadata._get_snapshot_path()
+        temp_path = snapshot_path.with_suffix('.tmp')
+
+        json_codec.dump_file(str(temp_path), {
+            'saved_at': time.time(),
+            'markets': exchange.markets,
+            'currencies': exchange.currencies
+        })
+
+        os.replace(str(temp_path), str(snapshot_path))
+
+    @staticmethod
+    def _load_snapshot(exchange: ccxt.binance) -> bool:
+        snapshot_path = BinanceMetadata._get_snapshot_path()
+        if not snapshot_path.exists():
+            return False
+
+        try:
+            snapshot = json_codec.load_file(str(snapshot_path))
+            exchange.set_markets(snapshot['markets'], snapshot['currencies'])
+            BinanceMetadata._build_index(exchange.markets)
+            return True
+
+        except Exception:
+            logging.exception('Failed loading binance metadata snapshot. Fetching from exchange.')
+            return False
@@ -0,0 +1,280 @@
+import asyncio
+from dataclasses import dataclass
+from enum import IntEnum
+import heapq
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable
+import ccxt.async_support as ccxt
+
+from mirage.brokers.binance.circuit_breaker import CircuitBreaker
+from mirage.config.config_manager import ConfigManager
+from mirage.tracing.request_tracer import RequestTracer
+
+
+class RequestPriority(IntEnum):
+    ORDER = 0
+    MARGIN = 1
+    ACCOUNT = 2
+    MARKET_DATA = 3
+
+
+@dataclass
+class EndpointCost:
+    pool: str
+    weight: int
+    priority: RequestPriority
+    is_order: bool = False
+
+
+class TokenBucket:
+    def __init__(self, capacity: float, period_seconds: float):
+        self.capacity = capacity
+        self.period_seconds = period_seconds
+        self.tokens = capacity
+        self._refilled_at = time.monotonic()
+
+    def get_wait_time(self, amount: float) -> float:
+        self._refill()
+        # Request heavier than bucket waits for full bucket instead of forever
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0
+
+        return (amount - self.tokens) * self.period_seconds / self.capacity
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    def sync_used(self, used: float) -> None:
+        """
+        Exchange tells how much it counted in current window. Trust it when it's more than we think.
+        """
+        self._refill()
+        self.tokens = min(self.tokens, self.capacity - used)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._refilled_at) * self.capacity / self.period_seconds)
+        self._refilled_at = now
+
+
+class BinanceRateLimiter:
+    """
+    Single scheduler for all Binance rest calls, so concurrent strategy instances share one weight budget and don't trip IP bans.
+    Keeps token bucket per Binance limit, with weights per ccxt method. Waiting calls are served by priority, so orders go
+    before margin, account and market data calls. Buckets are corrected from used weight headers Binance returns.
+    Weights are IP weights from Binance docs, except borrow & transfer which are limited by UID weight.
+    Calls pass circuit breaker of their endpoint group first, so calls to degraded endpoints don't take budget or wait for timeout.
+    """
+
+    POOL_API = 'api'
+    POOL_SAPI = 'sapi'
+    POOL_SAPI_UID = 'sapi_uid'
+    POOL_ORDERS = 'orders'
+
+    # pool: (limit, period seconds)
+    LIMITS = {
+        POOL_API: (6000, 60),
+        POOL_SAPI: (12000, 60),
+        POOL_SAPI_UID: (180000, 60),
+        POOL_ORDERS: (100, 10)
+    }
+
+    USED_WEIGHT_HEADERS = {
+        POOL_API: 'x-mbx-used-weight-1m',
+        POOL_SAPI: 'x-sapi-used-ip-weight-1m',
+        POOL_SAPI_UID: 'x-sapi-used-uid-weight-1m',
+        POOL_ORDERS: 'x-mbx-order-count-10s'
+    }
+
+    WALLET_MARGIN = 'margin'
+    WALLET_FUNDING = 'funding'
+
+    ENDPOINT_COSTS = {
+        'create_order': EndpointCost(POOL_API, 1, RequestPriority.ORDER, is_order=True),
+        'borrow_cross_margin': EndpointCost(POOL_SAPI_UID, 1500, RequestPriority.MARGIN),
+        'repay_cross_margin': EndpointCost(POOL_SAPI_UID, 1500, RequestPriority.MARGIN),
+        'transfer': EndpointCost(POOL_SAPI_UID, 900, RequestPriority.ACCOUNT),
+        'fetch_balance': EndpointCost(POOL_API, 20, RequestPriority.ACCOUNT),
+        'fetch_tickers': EndpointCost(POOL_API, 80, RequestPriority.MARKET_DATA),
+        'load_markets': EndpointCost(POOL_API, 20, RequestPriority.MARKET_DATA),
+        'fetch_trading_fees': EndpointCost(POOL_SAPI, 1, RequestPriority.ACCOUNT)
+    }
+
+    # Same methods, when called for margin or funding wallet hit sapi endpoints
+    WALLET_ENDPOINT_COSTS = {
+        (WALLET_MARGIN, 'create_order'): EndpointCost(POOL_SAPI, 6, RequestPriority.ORDER, is_order=True),
+        (WALLET_MARGIN, 'fetch_balance'): EndpointCost(POOL_SAPI, 10, RequestPriority.ACCOUNT),
+        (WALLET_FUNDING, 'fetch_balance'): EndpointCost(POOL_SAPI, 1, RequestPriority.ACCOUNT)
+    }
+
+    DEFAULT_ENDPOINT_COST = EndpointCost(POOL_API, 1, RequestPriority.MARKET_DATA)
+
+    CIRCUIT_GROUPS = {
+        RequestPriority.ORDER: CircuitBreaker.GROUP_ORDERS,
+        RequestPriority.MARGIN: CircuitBreaker.GROUP_MARGIN,
+        RequestPriority.ACCOUNT: CircuitBreaker.GROUP_WALLET,
+        RequestPriority.MARKET_DATA: CircuitBreaker.GROUP_MARKET_DATA
+    }
+    DEFAULT_BAN_PAUSE_SECONDS = 60
+
+    CONFIG_KEY_SAFETY_RATIO = 'brokers.binance.rate_limit.safety_ratio'
+    DEFAULT_SAFETY_RATIO = 0.8
+
+    buckets: dict[str, TokenBucket] = {}
+    paused_until = 0
+
+    _waiters = []
+    _sequence = itertools.count()
+    _dispatch_handle: asyncio.TimerHandle = None
+
+    @staticmethod
+    async def request(method: Callable[..., Awaitable[any]], *args, **kwargs) -> any:
+        """
+        Waits for weight budget, then calls bound exchange method with given args.
+        """
+        with RequestTracer.span(f'exchange.{method.__name__}'):
+            if getattr(method.__self__, 'simulated', False):
+                return await method(*args, **kwargs)
+
+            cost = BinanceRateLimiter._get_endpoint_cost(method.__name__, args, kwargs)
+            group = BinanceRateLimiter.CIRCUIT_GROUPS[cost.priority]
+            with RequestTracer.span('circuit_wait', group=group):
+                is_probe = await CircuitBreaker.admit(group)
+
+            started_at = time.monotonic()
+            try:
+                with RequestTracer.span('rate_limit_wait', weight=cost.weight):
+                    await BinanceRateLimiter._acquire(cost)
+
+                started_at = time.monotonic()
+                result = await BinanceRateLimiter._call(method, *args, **kwargs)
+
+            except BaseException as exc:
+                CircuitBreaker.record(group, is_probe, exc, time.monotonic() - started_at)
+                raise
+
+            CircuitBreaker.record(group, is_probe, None, time.monotonic() - started_at)
+            return result
+
+    @staticmethod
+    async def _call(method: Callable[..., Awaitable[any]], *args, **kwargs) -> any:
+        try:
+            return await method(*args, **kwargs)
+
+        except (ccxt.RateLimitExceeded, ccxt.DDoSProtection):
+            BinanceRateLimiter._pause_from_headers(method.__self__)
+            raise
+
+        finally:
+            BinanceRateLimiter._sync_from_headers(method.__self__)
+
+    @staticmethod
+    def _get_endpoint_cost(method_name: str, args: tuple, kwargs: dict[str, any]) -> EndpointCost:
+        params = kwargs.get('params')
+        if params is None and args and isinstance(args[-1], dict):
+            params = args[-1]
+
+        wallet = (params or {}).get('type')
+        cost = BinanceRateLimiter.WALLET_ENDPOINT_COSTS.get((wallet, method_name))
+        if cost is not None:
+            return cost
+
+        cost = BinanceRateLimiter.ENDPOINT_COSTS.get(method_name)
+        if cost is None:
+            logging.debug('No rate limit weight known for %s. Using default.', method_name)
+            return BinanceRateLimiter.DEFAULT_ENDPOINT_COST
+
+        if method_name == 'fetch_tickers':
+            symbols = kwargs.get('symbols', args[0] if args else None)
+            cost = EndpointCost(cost.pool, BinanceRateLimiter._get_tickers_weight(symbols), cost.priority)
+
+        return cost
+
+    @staticmethod
+    def _get_tickers_weight(symbols: list[str]) -> int:
+        if not symbols:
+            return 80
+
+        if len(symbols) <= 20:
+            return 2
+
+        if len(symbols) <= 100:
+            return 40
+
+        return 80
+
+    @staticmethod
+    async def _acquire(cost: EndpointCost) -> None:
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(BinanceRateLimiter._waiters, (cost.priority, next(BinanceRateLimiter._sequence), cost, future))
+        BinanceRateLimiter._dispatch()
+        await future
+
+    @staticmethod
+    def _dispatch() -> None:
+        """
+        Serve waiters in priority order while budget allows. Otherwise wake up when head of queue can be served.
+        """
+        BinanceRateLimiter._dispatch_handle = None
+        waiters = BinanceRateLimiter._waiters
+
+        while waiters:
+            _, _, cost, future = waiters[0]
+            if future.done():
+                heapq.heappop(waiters)
+                continue
+
+            wait_time = BinanceRateLimiter._get_wait_time(cost)
+            if wait_time > 0:
+                BinanceRateLimiter._schedule_dispatch(wait_time)
+                return
+
+            heapq.heappop(waiters)
+            BinanceRateLimiter._get_bucket(cost.pool).take(cost.weight)
+            if cost.is_order:
+                BinanceRateLimiter._get_bucket(BinanceRateLimiter.POOL_ORDERS).take(1)
+
+            future.set_result(None)
+
+    @staticmethod
+    def _schedule_dispatch(wait_time: float) -> None:
+        if BinanceRateLimiter._dispatch_handle is not None:
+            BinanceRateLimiter._dispatch_handle.cancel()
+
+        BinanceRateLimiter._dispatch_handle = asyncio.get_running_loop().call_later(wait_time, BinanceRateLimiter._dispatch)
+
+    @staticmethod
+    def _get_wait_time(cost: EndpointCost) -> float:
+        wait_time = max(0, BinanceRateLimiter.paused_until - time.monotonic())
+        wait_time = max(wait_time, BinanceRateLimiter._get_bucket(cost.pool).get_wait_time(cost.weight))
+        if cost.is_order:
+            wait_time = max(wait_time, BinanceRateLimiter._get_bucket(BinanceRateLimiter.POOL_ORDERS).get_wait_time(1))
+
+        return wait_time
+
+    @staticmethod
+    def _get_bucket(pool: str) -> TokenBucket:
+        if pool not in BinanceRateLimiter.buckets:
+            limit, period = BinanceRateLimiter.LIMITS[pool]
+            safety_ratio = ConfigManager.config.get(BinanceRateLimiter.CONFIG_KEY_SAFETY_RATIO, BinanceRateLimiter.DEFAULT_SAFETY_RATIO)
+            BinanceRateLimiter.buckets[pool] = TokenBucket(limit * safety_ratio, period)
+
+        return BinanceRateLimiter.buckets[pool]
+
+    @staticmethod
+    def _sync_from_headers(exchange: ccxt.binance) -> None:
+        headers = {key.lower(): value for key, value in (exchange.last_response_headers or {}).items()}
+        for pool, header in BinanceRateLimiter.USED_WEIGHT_HEADERS.items():
+            if header in headers:
+                BinanceRateLimiter._get_bucket(pool).sync_used(float(headers[header]))
+
+    @staticmethod
+    def _pause_from_headers(exchange: ccxt.binance) -> None:
+        headers = {key.lower(): value for key, value in (exchange.last_response_headers or {}).items()}
+        pause_seconds = float(headers.get('retry-after', BinanceRateLimiter.DEFAULT_BAN_PAUSE_SECONDS))
+        BinanceRateLimiter.paused_until = time.monotonic() + pause_seconds
+        logging.critical('Binance rate limit exceeded. Pausing all rest calls for %s seconds.', pause_seconds)
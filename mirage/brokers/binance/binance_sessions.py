@@ -0,0 +1,118 @@
+from contextvars import ContextVar
+import logging
+from typing import Optional
+import ccxt.async_support as ccxt
+from mirage.brokers.binance.binance import Binance
+from mirage.brokers.binance.binance_metadata import BinanceMetadata
+from mirage.brokers.binance.paper_exchange import PaperExchange
+from mirage.config.config_manager import ConfigManager
+
+
+class BinanceSessionsException(Exception):
+    pass
+
+
+class BinanceSessions:
+    """
+    Holds one long-lived exchange object per api key. Reusing it keeps http connections alive and markets loaded between commands,
+    instead of paying for new TCP+TLS handshakes and load_markets on every algorithm command.
+    Session of configured key opened on bootstrap, and closed on shutdown. If keys are changed at runtime through config commands,
+    session of new keys is opened on first use, reusing markets already loaded.
+
+    Strategy managers may select paper broker for the request they process. Then get_session returns simulated exchange
+    for the whole request, without algorithms knowing about it.
+    """
+
+    BROKER_BINANCE = 'binance'
+    BROKER_PAPER = 'paper'
+    RECORD_KEY_BROKER = 'broker'
+
+    sessions: dict[str, Binance] = {}
+    paper_session: Binance = None
+    selected_broker: ContextVar[str] = ContextVar('selected_broker', default=BROKER_BINANCE)
+
+    @staticmethod
+    async def open_session(api_key: str = None, secret_key: str = None) -> Binance:
+        api_key = api_key if api_key is not None else ConfigManager.config.get(Binance.KEY_API_KEY)
+        secret_key = secret_key if secret_key is not None else ConfigManager.config.get(Binance.KEY_SECRET_KEY)
+        if BinanceSessions._is_session_open(api_key, secret_key):
+            return BinanceSessions.sessions[api_key]
+
+        binance = Binance(api_key, secret_key)
+        logging.info('Opening binance session. Loading markets.')
+        try:
+            await BinanceMetadata.init(binance.exchange)
+        except Exception:
+            await binance.exchange.close()
+            raise
+
+        # Stored only when usable, so failed bootstrap can be retried
+        BinanceSessions.sessions[api_key] = binance
+        return binance
+
+    @staticmethod
+    def get_session(api_key: str = None) -> Binance:
+        if BinanceSessions.is_paper_selected():
+            return BinanceSessions.get_paper_session()
+
+        api_key = api_key if api_key is not None else ConfigManager.config.get(Binance.KEY_API_KEY)
+        secret_key = ConfigManager.config.get(Binance.KEY_SECRET_KEY)
+        if not BinanceSessions._is_session_open(api_key, secret_key):
+            BinanceSessions._open_session_from_loaded(api_key, secret_key)
+
+        return BinanceSessions.sessions[api_key]
+
+    @staticmethod
+    def _is_session_open(api_key: str, secret_key: str) -> bool:
+        return api_key in BinanceSessions.sessions and BinanceSessions.sessions[api_key].exchange.secret == secret_key
+
+    @staticmethod
+    def _open_session_from_loaded(api_key: str, secret_key: str) -> None:
+        """
+        Keys were changed after bootstrap. Markets don't depend on keys, so they are copied from already opened session.
+        Session of previous keys stays open till shutdown, as requests in flight may still use it.
+        """
+        loaded = BinanceSessions._get_loaded_exchange()
+        if loaded is None:
+            raise BinanceSessionsException('Binance session not opened. Sessions are opened on Mirage bootstrap.')
+
+        logging.info('Binance keys changed, opening new binance session')
+        binance = Binance(api_key, secret_key)
+        binance.exchange.set_markets(loaded.markets, loaded.currencies)
+        BinanceSessions.sessions[api_key] = binance
+
+    @staticmethod
+    def get_paper_session() -> Binance:
+        if BinanceSessions.paper_session is None:
+            logging.info('Opening paper broker session')
+            # Public tickers don't depend on keys, so paper prices can come from any opened session
+            BinanceSessions.paper_session = Binance(exchange=PaperExchange(BinanceSessions._get_loaded_exchange))
+
+        return BinanceSessions.paper_session
+
+    @staticmethod
+    def _get_loaded_exchange() -> Optional[ccxt.binance]:
+        loaded = next(iter(BinanceSessions.sessions.values()), None)
+        return loaded.exchange if loaded is not None else None
+
+    @staticmethod
+    def is_paper_selected() -> bool:
+        return BinanceSessions.selected_broker.get() == BinanceSessions.BROKER_PAPER
+
+    @staticmethod
+    def get_selected_broker_query() -> dict[str, any]:
+        """
+        Query part matching records made with selected broker. Records without broker are from before paper broker, so real ones.
+        """
+        if BinanceSessions.is_paper_selected():
+            return {BinanceSessions.RECORD_KEY_BROKER: BinanceSessions.BROKER_PAPER}
+
+        return {BinanceSessions.RECORD_KEY_BROKER: {'$ne': BinanceSessions.BROKER_PAPER}}
+
+    @staticmethod
+    async def close_all_sessions() -> None:
+        for binance in BinanceSessions.sessions.values():
+            await binance.exchange.close()
+
+        BinanceSessions.sessions = {}
+        BinanceSessions.paper_session = None
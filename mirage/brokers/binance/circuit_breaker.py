@@ -0,0 +1,229 @@
+import asyncio
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import Enum
+import logging
+import time
+from typing import Optional
+import ccxt.async_support as ccxt
+
+import consts
+from mirage.channels.channels_manager import ChannelsManager
+from mirage.config.config_manager import ConfigManager
+from mirage.database.mongo.write_behind_writer import WriteBehindWriter
+from mirage.utils.multi_logging import log_and_send
+
+
+class CircuitBreakerException(Exception):
+    pass
+
+
+class CircuitState(Enum):
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+
+@dataclass
+class EndpointCircuit:
+    group: str
+    state: CircuitState = CircuitState.CLOSED
+    consecutive_failures: int = 0
+    open_until: float = 0
+    probe_in_flight: bool = False
+    retry_lane_waiters: int = 0
+    rejected: int = 0
+    opened_count: int = 0
+    last_error: Optional[str] = None
+    # Replaced on every state change, after waking up everyone waiting on previous one
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+class CircuitBreaker:
+    """
+    Circuit per Binance endpoint group, so degraded exchange fails requests fast instead of each waiting through ccxt timeout.
+    Consecutive network failures or slow calls open the circuit. After open period single probe call is let through (half open),
+    and its result closes or reopens the circuit.
+    While not closed, calls of requests in retry lane (exits and reverts) wait for the circuit, and get the probe before others.
+    Other calls, like entries, are rejected immediately. Calls are never resent, as order may have reached exchange.
+    """
+
+    GROUP_ORDERS = 'orders'
+    GROUP_MARGIN = 'margin'
+    GROUP_WALLET = 'wallet'
+    GROUP_MARKET_DATA = 'market_data'
+
+    CONFIG_KEY_FAILURE_THRESHOLD = 'brokers.binance.circuit_breaker.failure_threshold'
+    CONFIG_KEY_OPEN_SECONDS = 'brokers.binance.circuit_breaker.open_seconds'
+    CONFIG_KEY_SLOW_CALL_SECONDS = 'brokers.binance.circuit_breaker.slow_call_seconds'
+    CONFIG_KEY_RETRY_LANE_MAX_WAIT = 'brokers.binance.circuit_breaker.retry_lane_max_wait_seconds'
+
+    DEFAULT_FAILURE_THRESHOLD = 5
+    DEFAULT_OPEN_SECONDS = 30
+    DEFAULT_SLOW_CALL_SECONDS = 10
+    DEFAULT_RETRY_LANE_MAX_WAIT = 120
+
+    circuits: dict[str, EndpointCircuit] = {}
+    retry_lane: ContextVar[bool] = ContextVar('retry_lane', default=False)
+    # Referenced till done, as event loop keeps only weak references to tasks
+    notification_tasks: set[asyncio.Task] = set()
+
+    @staticmethod
+    async def admit(group: str) -> bool:
+        """
+        Waits or raises while circuit is not closed. Returns true if call is the half open probe.
+        """
+        circuit = CircuitBreaker.get_circuit(group)
+        if circuit.state == CircuitState.CLOSED:
+            return False
+
+        if not CircuitBreaker.retry_lane.get():
+            # Retry lane goes first, so others may probe only when no one there waits
+            if circuit.state == CircuitState.HALF_OPEN and not circuit.probe_in_flight and not circuit.retry_lane_waiters:
+                circuit.probe_in_flight = True
+                return True
+
+            circuit.rejected += 1
+            raise CircuitBreakerException(f'Binance {group} endpoints unavailable, circuit {circuit.state.value}. Last error: {circuit.last_error}')
+
+        deadline = time.monotonic() + ConfigManager.config.get(
+            CircuitBreaker.CONFIG_KEY_RETRY_LANE_MAX_WAIT, CircuitBreaker.DEFAULT_RETRY_LANE_MAX_WAIT
+        )
+        circuit.retry_lane_waiters += 1
+        try:
+            while True:
+                CircuitBreaker._refresh(circuit)
+                if circuit.state == CircuitState.CLOSED:
+                    return False
+
+                if circuit.state == CircuitState.HALF_OPEN and not circuit.probe_in_flight:
+                    circuit.probe_in_flight = True
+                    return True
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise CircuitBreakerException(f'Binance {group} endpoints still unavailable after waiting in retry lane')
+
+                if circuit.state == CircuitState.OPEN:
+                    remaining = min(remaining, circuit.open_until - time.monotonic())
+
+                try:
+                    await asyncio.wait_for(circuit.changed.wait(), max(0, remaining))
+                except asyncio.TimeoutError:
+                    pass
+
+        finally:
+            circuit.retry_lane_waiters -= 1
+
+    @staticmethod
+    def record(group: str, is_probe: bool, exc: Optional[BaseException], duration: float) -> None:
+        circuit = CircuitBreaker.get_circuit(group)
+        slow_call_seconds = ConfigManager.config.get(CircuitBreaker.CONFIG_KEY_SLOW_CALL_SECONDS, CircuitBreaker.DEFAULT_SLOW_CALL_SECONDS)
+
+        if CircuitBreaker._is_failure(exc):
+            error = repr(exc)
+        elif exc is None and duration > slow_call_seconds:
+            error = f'Slow call, {duration:.1f} seconds'
+        elif exc is None or isinstance(exc, ccxt.BaseError):
+            # Exchange answered, even if with business error
+            error = None
+        else:
+            # Cancelled or failed on our side. Says nothing about exchange.
+            if is_probe:
+                circuit.probe_in_flight = False
+                CircuitBreaker._change_state(circuit, CircuitState.HALF_OPEN)
+            return
+
+        if error is None:
+            if circuit.state == CircuitState.CLOSED:
+                circuit.consecutive_failures = 0
+            elif is_probe:
+                circuit.consecutive_failures = 0
+                circuit.probe_in_flight = False
+                CircuitBreaker._change_state(circuit, CircuitState.CLOSED)
+            return
+
+        circuit.last_error = error
+        if is_probe:
+            circuit.probe_in_flight = False
+            CircuitBreaker._open(circuit)
+            return
+
+        # Results of calls admitted before circuit opened don't count
+        if circuit.state != CircuitState.CLOSED:
+            return
+
+        circuit.consecutive_failures += 1
+        if circuit.consecutive_failures >= ConfigManager.config.get(
+            CircuitBreaker.CONFIG_KEY_FAILURE_THRESHOLD, CircuitBreaker.DEFAULT_FAILURE_THRESHOLD
+        ):
+            CircuitBreaker._open(circuit)
+
+    @staticmethod
+    def get_circuit(group: str) -> EndpointCircuit:
+        """
+        Open circuit past its open period is moved to half open here.
+        """
+        if group not in CircuitBreaker.circuits:
+            CircuitBreaker.circuits[group] = EndpointCircuit(group)
+
+        circuit = CircuitBreaker.circuits[group]
+        CircuitBreaker._refresh(circuit)
+        return circuit
+
+    @staticmethod
+    def get_unavailable_groups() -> list[str]:
+        return [group for group in list(CircuitBreaker.circuits) if CircuitBreaker.get_circuit(group).state != CircuitState.CLOSED]
+
+    @staticmethod
+    def _is_failure(exc: Optional[BaseException]) -> bool:
+        # Rate limits are handled by rate limiter pause
+        return isinstance(exc, ccxt.NetworkError) and not isinstance(exc, ccxt.DDoSProtection)
+
+    @staticmethod
+    def _open(circuit: EndpointCircuit) -> None:
+        circuit.open_until = time.monotonic() + ConfigManager.config.get(
+            CircuitBreaker.CONFIG_KEY_OPEN_SECONDS, CircuitBreaker.DEFAULT_OPEN_SECONDS
+        )
+        circuit.opened_count += 1
+        CircuitBreaker._change_state(circuit, CircuitState.OPEN)
+
+    @staticmethod
+    def _refresh(circuit: EndpointCircuit) -> None:
+        if circuit.state == CircuitState.OPEN and time.monotonic() >= circuit.open_until:
+            CircuitBreaker._change_state(circuit, CircuitState.HALF_OPEN)
+
+    @staticmethod
+    def _change_state(circuit: EndpointCircuit, state: CircuitState) -> None:
+        previous_state = circuit.state
+        circuit.state = state
+        changed = circuit.changed
+        circuit.changed = asyncio.Event()
+        changed.set()
+
+        if previous_state == state:
+            return
+
+        WriteBehindWriter.enqueue(consts.DB_NAME_HISTORY, consts.COLLECTION_CIRCUIT_BREAKER_EVENTS, {
+            'group': circuit.group,
+            'from_state': previous_state.value,
+            'to_state': state.value,
+            'consecutive_failures': circuit.consecutive_failures,
+            'rejected': circuit.rejected,
+            'last_error': circuit.last_error
+        })
+
+        # Only opening and recovery are worth a message, not every failed probe
+        if state == CircuitState.HALF_OPEN or previous_state == CircuitState.HALF_OPEN and state == CircuitState.OPEN:
+            logging.info('Binance %s circuit %s', circuit.group, state.value)
+            return
+
+        if state == CircuitState.OPEN:
+            message = f'Binance {circuit.group} circuit opened. Entries rejected, exits wait. Last error: {circuit.last_error}'
+        else:
+            message = f'Binance {circuit.group} circuit closed. Exchange recovered.'
+
+        # Not awaited, so calls changing state don't wait for the message
+        task = asyncio.create_task(log_and_send(logging.warning, ChannelsManager.get_communication_channel(), message))
+        CircuitBreaker.notification_tasks.add(task)
+        task.add_done_callback(CircuitBreaker.notification_tasks.discard)
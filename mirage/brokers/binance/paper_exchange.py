@@ -0,0 +1,343 @@
+import asyncio
+import itertools
+import logging
+import random
+import time
+from typing import Callable, Optional
+from ccxt.base.errors import InsufficientFunds, InvalidOrder
+
+import consts
+from mirage.brokers.binance.binance_metadata import BinanceMetadata
+from mirage.brokers.binance.binance_rate_limiter import BinanceRateLimiter
+from mirage.config.config_manager import ConfigManager
+from mirage.market_data.market_data_manager import MarketDataManager
+from mirage.market_data.ticker_cache import Quote, TickerCache
+
+
+class PaperExchangeException(Exception):
+    pass
+
+
+class PaperExchange:
+    """
+    Simulated Binance with the subset of ccxt methods algorithms use. Keeps spot, margin and funding wallets in memory, supports
+    borrow & repay, transfers and market/limit fills against ticker cache or static prices, with injected latency.
+    With ticker cache prices, symbols it trades or holds are subscribed to ticker feed, and till feed has fresh quotes for them
+    they are fetched from real exchange public tickers. Quotes older than max quote age are not used.
+    Lets us run full strategy path at production-like volume without live exchange or real funds, and measure Mirage's own overhead.
+    Fee charged in received currency, as when BNB is not used for fees.
+    """
+
+    # Lets shared infrastructure, like rate limiter, tell it's not talking to real exchange
+    simulated = True
+
+    WALLET_SPOT = 'spot'
+    WALLET_MARGIN = 'margin'
+    WALLET_FUNDING = 'funding'
+    WALLETS = [WALLET_SPOT, WALLET_MARGIN, WALLET_FUNDING]
+
+    PRICE_SOURCE_TICKER_CACHE = 'ticker_cache'
+    PRICE_SOURCE_STATIC = 'static'
+
+    TYPE_MARKET = 'market'
+    TYPE_LIMIT = 'limit'
+
+    SIDE_BUY = 'buy'
+    SIDE_SELL = 'sell'
+
+    STATUS_OPEN = 'open'
+    STATUS_CLOSED = 'closed'
+
+    CONFIG_KEY_PRICE_SOURCE = 'brokers.paper.price_source'
+    CONFIG_KEY_STATIC_PRICES = 'brokers.paper.static_prices'
+    CONFIG_KEY_LATENCY_MS = 'brokers.paper.latency_ms'
+    CONFIG_KEY_LATENCY_JITTER_MS = 'brokers.paper.latency_jitter_ms'
+    CONFIG_KEY_INITIAL_BALANCES = 'brokers.paper.initial_balances'
+
+    def __init__(self, get_market_data_exchange: Callable[[], Optional[any]] = None):
+        # Real exchange for public tickers. May be missing, then only ticker cache and static prices are used.
+        self.get_market_data_exchange = get_market_data_exchange
+        self.price_source = ConfigManager.config.get(PaperExchange.CONFIG_KEY_PRICE_SOURCE, PaperExchange.PRICE_SOURCE_TICKER_CACHE)
+        self.static_prices: dict[str, float] = ConfigManager.config.get(PaperExchange.CONFIG_KEY_STATIC_PRICES, {})
+        self.latency_ms = ConfigManager.config.get(PaperExchange.CONFIG_KEY_LATENCY_MS, 0)
+        self.latency_jitter_ms = ConfigManager.config.get(PaperExchange.CONFIG_KEY_LATENCY_JITTER_MS, 0)
+
+        self.last_response_headers = {}
+        self.wallets: dict[str, dict[str, dict[str, float]]] = {wallet: {} for wallet in PaperExchange.WALLETS}
+        self.debts: dict[str, float] = {}
+        self.open_orders: list[dict[str, any]] = []
+        # Fetched from real exchange for symbols ticker cache had no fresh quote of
+        self.fetched_quotes: dict[str, Quote] = {}
+        self._ids = itertools.count(1)
+
+        initial_balances = ConfigManager.config.get(PaperExchange.CONFIG_KEY_INITIAL_BALANCES, {})
+        for wallet, balances in initial_balances.items():
+            for code, amount in balances.items():
+                self._add_free(wallet, code, amount)
+
+    async def load_markets(self, reload: bool = False) -> dict[str, any]:
+        return {}
+
+    async def close(self) -> None:
+        pass
+
+    async def fetch_tickers(self, symbols: Optional[list[str]] = None, params: dict[str, any] = None) -> dict[str, dict[str, any]]:
+        await self._refresh_quotes(symbols or [])
+        await self._simulate_latency()
+
+        tickers = {}
+        for symbol in symbols or list(self.static_prices.keys()):
+            last, bid, ask = self._get_quote(symbol)
+            tickers[symbol] = {'symbol': symbol, 'timestamp': self._milliseconds(), 'last': last, 'bid': bid, 'ask': ask}
+
+        return tickers
+
+    async def fetch_balance(self, params: dict[str, any] = None) -> dict[str, any]:
+        wallet = (params or {}).get('type', PaperExchange.WALLET_SPOT)
+        symbols = self._get_open_order_symbols()
+        if wallet == PaperExchange.WALLET_MARGIN:
+            symbols += self._get_margin_symbols()
+
+        await self._refresh_quotes(symbols)
+        await self._simulate_latency()
+        self._match_open_orders()
+
+        balance = {'info': {}, 'free': {}, 'used': {}, 'total': {}, 'debt': {}}
+        codes = set(self.wallets[wallet].keys())
+        if wallet == PaperExchange.WALLET_MARGIN:
+            codes |= set(self.debts.keys())
+
+        for code in codes:
+            account = self.wallets[wallet].get(code, {'free': 0, 'used': 0})
+            debt = self.debts.get(code, 0) if wallet == PaperExchange.WALLET_MARGIN else 0
+            balance[code] = {'free': account['free'], 'used': account['used'], 'total': account['free'] + account['used'], 'debt': debt}
+            for key in ['free', 'used', 'total', 'debt']:
+                balance[key][code] = balance[code][key]
+
+        if wallet == PaperExchange.WALLET_MARGIN:
+            balance['info'] = self._get_margin_info()
+
+        return balance
+
+    async def transfer(self, code: str, amount: float, from_account: str, to_account: str, params: dict[str, any] = None) -> dict[str, any]:
+        await self._simulate_latency()
+
+        self._take_free(from_account, code, amount)
+        self._add_free(to_account, code, amount)
+        return {
+            'id': str(next(self._ids)), 'timestamp': self._milliseconds(), 'currency': code, 'amount': amount,
+            'fromAccount': from_account, 'toAccount': to_account, 'status': 'ok', 'info': {}
+        }
+
+    async def borrow_cross_margin(self, code: str, amount: float, params: dict[str, any] = None) -> dict[str, any]:
+        await self._simulate_latency()
+
+        self._add_free(PaperExchange.WALLET_MARGIN, code, amount)
+        self.debts[code] = self.debts.get(code, 0) + amount
+        return {'id': str(next(self._ids)), 'currency': code, 'amount': amount, 'timestamp': self._milliseconds(), 'info': {}}
+
+    async def repay_cross_margin(self, code: str, amount: float, params: dict[str, any] = None) -> dict[str, any]:
+        await self._simulate_latency()
+
+        debt = self.debts.get(code, 0)
+        if amount > debt:
+            raise InvalidOrder(f'paper Repay amount {amount} {code} exceeds debt {debt}')
+
+        self._take_free(PaperExchange.WALLET_MARGIN, code, amount)
+        self.debts[code] = debt - amount
+        return {'id': str(next(self._ids)), 'currency': code, 'amount': amount, 'timestamp': self._milliseconds(), 'info': {}}
+
+    async def create_order(
+            self, symbol: str, type: str, side: str, amount: float, price: Optional[float] = None, params: dict[str, any] = None
+    ) -> dict[str, any]:
+        await self._refresh_quotes([symbol] + self._get_open_order_symbols())
+        await self._simulate_latency()
+        self._match_open_orders()
+
+        params = params or {}
+        wallet = params.get('type', PaperExchange.WALLET_SPOT)
+        last, bid, ask = self._get_quote(symbol)
+
+        if type == PaperExchange.TYPE_MARKET:
+            fill_price = ask if side == PaperExchange.SIDE_BUY else bid
+            if 'quoteOrderQty' in params:
+                amount = BinanceMetadata.floor_market_amount(symbol, float(params['quoteOrderQty']) / fill_price)
+
+            order = self._new_order(symbol, type, side, amount, None, wallet)
+            self._fill_order(order, fill_price)
+            return order
+
+        if type != PaperExchange.TYPE_LIMIT or price is None:
+            raise InvalidOrder(f'paper Unsupported order type {type} or missing price')
+
+        order = self._new_order(symbol, type, side, amount, price, wallet)
+        if self._is_marketable(order, bid, ask):
+            self._fill_order(order, price)
+            return order
+
+        self._lock_order_funds(order)
+        self.open_orders.append(order)
+        return dict(order)
+
+    def _new_order(self, symbol: str, type: str, side: str, amount: float, price: Optional[float], wallet: str) -> dict[str, any]:
+        return {
+            'id': str(next(self._ids)), 'timestamp': self._milliseconds(), 'symbol': symbol, 'type': type, 'side': side,
+            'amount': amount, 'price': price, 'filled': 0, 'remaining': amount, 'cost': 0, 'average': None,
+            'status': PaperExchange.STATUS_OPEN, 'fee': None, 'info': {'wallet': wallet}
+        }
+
+    def _fill_order(self, order: dict[str, any], fill_price: float, is_locked: bool = False) -> None:
+        base, quote = order['symbol'].split('/')
+        wallet = order['info']['wallet']
+        amount = order['amount']
+        cost = amount * fill_price
+        fee_rate = BinanceMetadata.get_taker_fee(order['symbol'])
+
+        take = self._take_used if is_locked else self._take_free
+        if order['side'] == PaperExchange.SIDE_BUY:
+            take(wallet, quote, cost)
+            fee = {'currency': base, 'cost': amount * fee_rate}
+            self._add_free(wallet, base, amount - fee['cost'])
+        else:
+            take(wallet, base, amount)
+            fee = {'currency': quote, 'cost': cost * fee_rate}
+            self._add_free(wallet, quote, cost - fee['cost'])
+
+        order.update({
+            'filled': amount, 'remaining': 0, 'cost': cost, 'average': fill_price, 'price': order['price'] or fill_price,
+            'status': PaperExchange.STATUS_CLOSED, 'fee': fee, 'lastTradeTimestamp': self._milliseconds()
+        })
+
+    def _is_marketable(self, order: dict[str, any], bid: float, ask: float) -> bool:
+        if order['side'] == PaperExchange.SIDE_BUY:
+            return order['price'] >= ask
+
+        return order['price'] <= bid
+
+    def _lock_order_funds(self, order: dict[str, any]) -> None:
+        base, quote = order['symbol'].split('/')
+        wallet = order['info']['wallet']
+        if order['side'] == PaperExchange.SIDE_BUY:
+            self._take_free(wallet, quote, order['amount'] * order['price'])
+            self._get_account(wallet, quote)['used'] += order['amount'] * order['price']
+        else:
+            self._take_free(wallet, base, order['amount'])
+            self._get_account(wallet, base)['used'] += order['amount']
+
+    def _match_open_orders(self) -> None:
+        """
+        Resting limit orders fill at their price once market crosses it. Checked whenever exchange is called.
+        """
+        still_open = []
+        for order in self.open_orders:
+            try:
+                _, bid, ask = self._get_quote(order['symbol'])
+            except PaperExchangeException:
+                still_open.append(order)
+                continue
+
+            if self._is_marketable(order, bid, ask):
+                self._fill_order(order, order['price'], is_locked=True)
+                logging.info('Paper limit order %s of %s filled at %s', order['id'], order['symbol'], order['price'])
+            else:
+                still_open.append(order)
+
+        self.open_orders = still_open
+
+    def _get_margin_info(self) -> dict[str, any]:
+        btc_price = self._get_usdt_price('BTC')
+        collateral = sum(
+            (account['free'] + account['used']) * self._get_usdt_price(code)
+            for code, account in self.wallets[PaperExchange.WALLET_MARGIN].items() if account['free'] + account['used'] > 0
+        )
+        liability = sum(debt * self._get_usdt_price(code) for code, debt in self.debts.items() if debt > 0)
+        return {
+            'totalCollateralValueInUSDT': str(collateral),
+            'totalAssetOfBtc': str(collateral / btc_price),
+            'totalLiabilityOfBtc': str(liability / btc_price)
+        }
+
+    def _get_usdt_price(self, code: str) -> float:
+        if code == consts.COIN_NAME_USDT:
+            return 1
+
+        last, _, _ = self._get_quote(f'{code}/{consts.COIN_NAME_USDT}')
+        return last
+
+    def _get_margin_symbols(self) -> list[str]:
+        """
+        Symbols margin info is priced with, BTC and every held or borrowed coin against USDT.
+        """
+        codes = [code for code, account in self.wallets[PaperExchange.WALLET_MARGIN].items() if account['free'] + account['used'] > 0]
+        codes += [code for code, debt in self.debts.items() if debt > 0]
+        return [f'{code}/{consts.COIN_NAME_USDT}' for code in ['BTC'] + codes if code != consts.COIN_NAME_USDT]
+
+    def _get_open_order_symbols(self) -> list[str]:
+        return [order['symbol'] for order in self.open_orders]
+
+    async def _refresh_quotes(self, symbols: list[str]) -> None:
+        if self.price_source != PaperExchange.PRICE_SOURCE_TICKER_CACHE or not symbols:
+            return
+
+        symbols = list(dict.fromkeys(symbols))
+        MarketDataManager.subscribe(symbols)
+
+        missing = [symbol for symbol in symbols if self._get_fresh_quote(symbol) is None]
+        exchange = self.get_market_data_exchange() if self.get_market_data_exchange is not None else None
+        if not missing or exchange is None:
+            return
+
+        logging.info('No fresh paper quotes for %s. Fetching tickers from exchange.', missing)
+        tickers = await BinanceRateLimiter.request(exchange.fetch_tickers, missing)
+        for symbol, ticker in tickers.items():
+            if ticker.get('last') is not None:
+                self.fetched_quotes[symbol] = Quote(symbol, ticker['last'], ticker.get('bid'), ticker.get('ask'), time.time())
+
+    def _get_fresh_quote(self, symbol: str) -> Optional[Quote]:
+        max_age = ConfigManager.config.get(MarketDataManager.KEY_MAX_QUOTE_AGE_SECONDS, MarketDataManager.DEFAULT_MAX_QUOTE_AGE_SECONDS)
+        quote = TickerCache.get_fresh_quote(symbol, max_age)
+        if quote is not None:
+            return quote
+
+        quote = self.fetched_quotes.get(symbol)
+        if quote is None or time.time() - quote.received_at > max_age:
+            return None
+
+        return quote
+
+    def _get_quote(self, symbol: str) -> tuple[float, float, float]:
+        if self.price_source == PaperExchange.PRICE_SOURCE_TICKER_CACHE:
+            quote = self._get_fresh_quote(symbol)
+            if quote is not None:
+                return quote.last, quote.bid or quote.last, quote.ask or quote.last
+
+        if symbol in self.static_prices:
+            price = self.static_prices[symbol]
+            return price, price, price
+
+        raise PaperExchangeException(f'No paper price for {symbol}')
+
+    def _get_account(self, wallet: str, code: str) -> dict[str, float]:
+        return self.wallets[wallet].setdefault(code, {'free': 0, 'used': 0})
+
+    def _add_free(self, wallet: str, code: str, amount: float) -> None:
+        self._get_account(wallet, code)['free'] += amount
+
+    def _take_free(self, wallet: str, code: str, amount: float) -> None:
+        account = self._get_account(wallet, code)
+        if account['free'] < amount:
+            raise InsufficientFunds(f'paper Insufficient {code} in {wallet} wallet. Free: {account["free"]}, required: {amount}')
+
+        account['free'] -= amount
+
+    def _take_used(self, wallet: str, code: str, amount: float) -> None:
+        account = self._get_account(wallet, code)
+        account['used'] = max(0, account['used'] - amount)
+
+    async def _simulate_latency(self) -> None:
+        latency_ms = self.latency_ms + random.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000)
+
+    def _milliseconds(self) -> int:
+        return int(time.time() * 1000)
@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import ccxt.pro as ccxtpro
+from mirage.brokers.binance.account_mirror import BinanceAccountMirror
+from mirage.brokers.binance.binance import Binance
+from mirage.config.config_manager import ConfigManager
+
+
+class BinanceUserDataStream:
+    """
+    Listens to Binance user data stream and applies balance updates to the account mirror.
+    Funding wallet is not part of the stream - it's kept current by our transfers and rest reconciliation.
+    """
+
+    STREAMED_WALLETS = ['margin']
+    RECONNECT_DELAY = 5
+
+    def __init__(self):
+        self._exchange = ccxtpro.binance({
+            'apiKey': ConfigManager.config.get(Binance.KEY_API_KEY),
+            'secret': ConfigManager.config.get(Binance.KEY_SECRET_KEY),
+        })
+        self._tasks = []
+
+    async def start(self) -> None:
+        for wallet in BinanceUserDataStream.STREAMED_WALLETS:
+            self._tasks.append(asyncio.create_task(self._watch_wallet(wallet)))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+
+        self._tasks = []
+        await self._exchange.close()
+
+    async def _watch_wallet(self, wallet: str) -> None:
+        while True:
+            try:
+                balance = await self._exchange.watch_balance({'type': wallet})
+                BinanceAccountMirror.update_from_balance(wallet, balance, is_full_snapshot=False)
+
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception(
+                    'Binance user data stream for %s wallet failed. Reconnecting in %s seconds.', wallet, BinanceUserDataStream.RECONNECT_DELAY
+                )
+                BinanceAccountMirror.invalidate(wallet)
+                await asyncio.sleep(BinanceUserDataStream.RECONNECT_DELAY)
@@ -1,5 +1,9 @@
 import consts
+from mirage.channels.telegram.commands.circuit_status import CircuitStatusCommand
+from mirage.channels.telegram.commands.close_all import CloseAllCommand
+from mirage.channels.telegram.commands.db_indexes import DbIndexesCommand
 from mirage.channels.telegram.commands.export_db import ExportDbCommand
+from mirage.channels.telegram.commands.security_stats import SecurityStatsCommand
 from mirage.channels.telegram.commands.performance.show_summary import PerformaceSummaryCommand
 from mirage.channels.telegram.telegram_command import TelegramCommand
 from mirage.channels.telegram.commands.backup import BackupCommand
@@ -12,6 +16,10 @@ _SHOW_CONFIG = 'show-config'
 _PERFORMANCE_SUMMARY = 'performance-summary'
 _UPDATE_CONFIG = 'update-config'
 _EXPORT_DB = 'export-db'
+_DB_INDEXES = 'db-indexes'
+_SECURITY_STATS = 'security-stats'
+_CIRCUIT_STATUS = 'circuit-status'
+_CLOSE_ALL = 'close-all'
 
 _TERMINATE = f'{_UPDATE_CONFIG}\n{UpdateConfigCommand.CONFIG_NAME_EXECUTION}\n{UpdateConfigCommand.ROOT_CONFIG_KEY_VALUE}\n \
     {{"{consts.EXECUTION_CONFIG_KEY_TERMINATE}": true}}'
@@ -32,7 +40,11 @@ enabled_commands: dict[str, TelegramCommand] = {
     _SHOW_CONFIG: ShowConfigCommand,
     _UPDATE_CONFIG: UpdateConfigCommand,
     _PERFORMANCE_SUMMARY: PerformaceSummaryCommand,
-    _EXPORT_DB: ExportDbCommand
+    _EXPORT_DB: ExportDbCommand,
+    _DB_INDEXES: DbIndexesCommand,
+    _SECURITY_STATS: SecurityStatsCommand,
+    _CIRCUIT_STATUS: CircuitStatusCommand,
+    _CLOSE_ALL: CloseAllCommand
 }
 
 enabled_aliases: dict[str, str] = {
@@ -50,6 +62,10 @@ enabled_aliases: dict[str, str] = {
     'sc': _SHOW_CONFIG,
     'pfs': _PERFORMANCE_SUMMARY,
     'edb': _EXPORT_DB,
+    'dbi': _DB_INDEXES,
+    'scs': _SECURITY_STATS,
+    'crs': _CIRCUIT_STATUS,
+    'cla': _CLOSE_ALL,
 
     # Params to commands
     'Pdacts': _DEACTIVATE_STRATEGY_BODY,
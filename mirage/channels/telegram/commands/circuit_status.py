@@ -0,0 +1,27 @@
+import time
+
+from mirage.brokers.binance.circuit_breaker import CircuitBreaker, CircuitState
+from mirage.channels.channels_manager import ChannelsManager
+from mirage.channels.telegram.telegram_command import TelegramCommand
+
+
+class CircuitStatusCommand(TelegramCommand):
+    """
+    Show circuit breaker state of each Binance endpoint group, with failures, rejected calls and last error.
+    """
+
+    async def execute(self) -> None:
+        lines = []
+        for group in [
+            CircuitBreaker.GROUP_ORDERS, CircuitBreaker.GROUP_MARGIN, CircuitBreaker.GROUP_WALLET, CircuitBreaker.GROUP_MARKET_DATA
+        ]:
+            circuit = CircuitBreaker.get_circuit(group)
+            line = f'{group}: {circuit.state.value}, failures {circuit.consecutive_failures}, opened {circuit.opened_count} times, ' \
+                f'rejected {circuit.rejected}, exits waiting {circuit.retry_lane_waiters}'
+            if circuit.state == CircuitState.OPEN:
+                line += f', probing in {max(0, circuit.open_until - time.monotonic()):.0f}s'
+            if circuit.last_error is not None:
+                line += f'\nLast error: {circuit.last_error}'
+            lines.append(line)
+
+        await ChannelsManager.get_communication_channel().send_message('\n'.join(lines))
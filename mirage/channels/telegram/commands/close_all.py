@@ -0,0 +1,100 @@
+import asyncio
+import logging
+
+from mirage.channels.channels_manager import ChannelsManager
+from mirage.channels.telegram.telegram_command import TelegramCommand
+from mirage.config.config_manager import ConfigManager
+from mirage.strategy import enabled_strategies
+from mirage.strategy_manager.admin_request import process_admin_request
+
+
+class CloseAllCommand(TelegramCommand):
+    """
+    Exit every open position, with confirm on second line.
+    Each exit runs through its strategy manager like exit signal, so it still repays and returns capital,
+    but with admin priority and even for deactivated instances or when suspended.
+    Each runs with broker its position was opened on, so paper and real positions of an instance are both closed.
+    Exits run concurrently up to parallelism, and binance rate limiter keeps them within weight budget.
+    Progress is reported as each exit finishes.
+    """
+
+    CONFIG_KEY_PARALLELISM = 'channels.telegram.close_all_parallelism'
+    DEFAULT_PARALLELISM = 4
+
+    CONFIRM = 'confirm'
+    REQUEST_SOURCE = 'telegram_close_all'
+
+    RESULT_CLOSED = 'closed'
+    RESULT_NOT_EXECUTED = 'not_executed'
+    RESULT_FAILED = 'failed'
+
+    async def execute(self) -> None:
+        channel = ChannelsManager.get_communication_channel()
+        if self._get_top_line().strip().lower() != CloseAllCommand.CONFIRM:
+            await channel.send_message(f'Closes all open positions. Add {CloseAllCommand.CONFIRM} on second line to run.')
+            return
+
+        exits = []
+        for strategy_name, strategy_class in enabled_strategies.items():
+            for strategy_instance, broker, strategy_data in await strategy_class.get_open_position_exits():
+                exits.append((strategy_name, strategy_instance, broker, strategy_data))
+
+        if not exits:
+            await channel.send_message('No open positions')
+            return
+
+        parallelism = ConfigManager.config.get(CloseAllCommand.CONFIG_KEY_PARALLELISM, CloseAllCommand.DEFAULT_PARALLELISM)
+        await channel.send_message(f'Closing {len(exits)} positions, {parallelism} at a time')
+
+        semaphore = asyncio.Semaphore(parallelism)
+        finished = []
+        results = await asyncio.gather(
+            *[self._close(semaphore, finished, len(exits), *position_exit) for position_exit in exits]
+        )
+
+        def instances_with(result: str) -> list[str]:
+            return [
+                f'{strategy_name} {strategy_instance} on {broker}'
+                for (strategy_name, strategy_instance, broker, _), exit_result in zip(exits, results) if exit_result == result
+            ]
+
+        not_executed = instances_with(CloseAllCommand.RESULT_NOT_EXECUTED)
+        failed = instances_with(CloseAllCommand.RESULT_FAILED)
+        await channel.send_message(
+            f'Close all finished. Closed {len(instances_with(CloseAllCommand.RESULT_CLOSED))} of {len(exits)}.'
+            + (f' Not executed: {", ".join(not_executed)}.' if not_executed else '')
+            + (f' Failed: {", ".join(failed)}.' if failed else '')
+        )
+
+    async def _close(
+            self, semaphore: asyncio.Semaphore, finished: list[str], total: int,
+            strategy_name: str, strategy_instance: str, broker: str, strategy_data: dict[str, any]
+    ) -> str:
+        """
+        Runs in own task, so has own trace. Exit may be not executed, like when strategy found no position to exit.
+        """
+        async with semaphore:
+            try:
+                is_executed = await process_admin_request(
+                    CloseAllCommand.REQUEST_SOURCE, strategy_name, strategy_instance, strategy_data, broker
+                )
+
+                finished.append(strategy_instance)
+                if not is_executed:
+                    await ChannelsManager.get_communication_channel().send_message(
+                        f'[{len(finished)}/{total}] Exit of {strategy_name} {strategy_instance} on {broker} was not executed'
+                    )
+                    return CloseAllCommand.RESULT_NOT_EXECUTED
+
+                await ChannelsManager.get_communication_channel().send_message(
+                    f'[{len(finished)}/{total}] Closed {strategy_name} {strategy_instance} on {broker}'
+                )
+                return CloseAllCommand.RESULT_CLOSED
+
+            except Exception as exc:
+                logging.exception('Failed closing %s %s on %s', strategy_name, strategy_instance, broker)
+                finished.append(strategy_instance)
+                await ChannelsManager.get_communication_channel().send_message(
+                    f'[{len(finished)}/{total}] Failed closing {strategy_name} {strategy_instance} on {broker}: {exc!r}'
+                )
+                return CloseAllCommand.RESULT_FAILED
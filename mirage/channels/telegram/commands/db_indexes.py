@@ -0,0 +1,21 @@
+from mirage.channels.channels_manager import ChannelsManager
+from mirage.channels.telegram.telegram_command import TelegramCommand
+from mirage.database.mongo.db_config import DbConfig
+from mirage.database.mongo.index_registry import IndexRegistry
+
+
+class DbIndexesCommand(TelegramCommand):
+    """
+    Report registered indexes missing in db, indexes not used since mongo server start and indexes not in registry.
+    """
+
+    async def execute(self) -> None:
+        report = await IndexRegistry.build_report(DbConfig.client)
+
+        lines = []
+        for collection, info in sorted(report.items()):
+            lines.append(f'{collection}:')
+            for key in ['missing', 'unused', 'unregistered']:
+                lines.append(f'  {key}: {", ".join(info[key]) if info[key] else "-"}')
+
+        await ChannelsManager.get_communication_channel().send_message('\n'.join(lines))
@@ -50,14 +50,14 @@ class ExportDbCommand(TelegramCommand):
 
         self._remove_first_line()
 
-        records = list(get_records(
+        records = await get_records(
             db_name, collection_name,
             build_dates_query(
                 None if date_from == ExportDbCommand.DATE_ALL else iso_string_to_datetime(date_from),
                 None if date_to == ExportDbCommand.DATE_ALL else iso_string_to_datetime(date_to)
             ),
             sort=[(consts.RECORD_KEY_CREATED_AT, pymongo.DESCENDING)]
-        ))
+        ).to_list()
         df = pd.DataFrame(records)
 
         with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as temp_file:
@@ -0,0 +1,20 @@
+from mirage.channels.channels_manager import ChannelsManager
+from mirage.channels.telegram.telegram_command import TelegramCommand
+from mirage.channels.trading_view.security.security_manager import SecurityManager
+
+
+class SecurityStatsCommand(TelegramCommand):
+    """
+    Show security methods in the order they are tried, with attempts, failures and timing of each.
+    """
+
+    async def execute(self) -> None:
+        lines = []
+        for compiled_method in SecurityManager.get_pipeline():
+            stats = compiled_method.stats
+            lines.append(
+                f'{compiled_method.name} #{compiled_method.config_index}: attempts {stats.attempts}, successes {stats.successes}, '
+                f'failures {stats.failures}, avg {stats.average_ms:.2f}ms'
+            )
+
+        await ChannelsManager.get_communication_channel().send_message('\n'.join(lines) if lines else 'No security methods enabled')
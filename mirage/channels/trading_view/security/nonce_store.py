@@ -0,0 +1,54 @@
+import time
+from pymongo.errors import DuplicateKeyError
+
+import consts
+from mirage.database.mongo.common_operations import insert_dict
+
+
+class NonceStore:
+    """
+    Replay protection for request nonces. Nonces seen in the replay window are kept in memory, bucketed by arrival time,
+    so old buckets are dropped as a whole. Memory covers replays within this process, and single insert into collection,
+    where _id is the nonce, covers restarts and acts as atomic insert-if-absent. Collection is bounded by TTL index.
+    Requests older than expiration are rejected anyway, so nonces don't need to be kept longer than that.
+    """
+
+    BUCKET_SECONDS = 10
+    REPLAY_WINDOW_SECONDS = consts.MIRAGE_SECURITY_REQUEST_EXPIRATION
+
+    buckets: dict[int, set[str]] = {}
+
+    @staticmethod
+    async def register(nonce: str) -> bool:
+        """
+        Returns false if nonce was already used.
+        """
+        NonceStore._prune()
+        if any(nonce in bucket for bucket in NonceStore.buckets.values()):
+            return False
+
+        # Added before awaiting the insert, so concurrent requests with same nonce are caught in memory
+        bucket = NonceStore.buckets.setdefault(NonceStore._current_bucket(), set())
+        bucket.add(nonce)
+
+        try:
+            await insert_dict(consts.DB_NAME_MIRAGE_SECURITY, consts.COLLECTION_REQUEST_NONCES, {'_id': nonce})
+            return True
+
+        except DuplicateKeyError:
+            return False
+
+        except Exception:
+            # Request is rejected, so let its retry through
+            bucket.discard(nonce)
+            raise
+
+    @staticmethod
+    def _current_bucket() -> int:
+        return int(time.time() // NonceStore.BUCKET_SECONDS)
+
+    @staticmethod
+    def _prune() -> None:
+        oldest_bucket = NonceStore._current_bucket() - NonceStore.REPLAY_WINDOW_SECONDS // NonceStore.BUCKET_SECONDS - 1
+        for key in [key for key in NonceStore.buckets if key < oldest_bucket]:
+            del NonceStore.buckets[key]
@@ -1,37 +1,138 @@
+from dataclasses import dataclass, field
 import logging
+import time
 from fastapi import Request
 from mirage.channels.trading_view.security.security_methods import enabled_security_methods
 from mirage.channels.trading_view.security.security_method import SecurityMethod
 from mirage.config.config import Config
 from mirage.config.config_manager import ConfigManager
+from mirage.utils import json_codec
 
 
 class SecurityManagerException(Exception):
     pass
 
 
+@dataclass
+class SecurityMethodStats:
+    attempts: int = 0
+    successes: int = 0
+    total_seconds: float = 0
+
+    @property
+    def failures(self) -> int:
+        return self.attempts - self.successes
+
+    @property
+    def success_rate(self) -> float:
+        # Smoothed, so methods without attempts yet start in the middle and are not pinned to either end
+        return (self.successes + 1) / (self.attempts + 2)
+
+    @property
+    def average_ms(self) -> float:
+        return self.total_seconds * 1000 / self.attempts if self.attempts else 0
+
+
+@dataclass
+class CompiledSecurityMethod:
+    name: str
+    method: SecurityMethod
+    config_index: int
+    stats: SecurityMethodStats = field(default_factory=SecurityMethodStats)
+
+
 class SecurityManager:
+    """
+    Security methods are compiled once from main config and rebuilt only when main config version changes.
+    Methods are tried by observed success rate, so the one authenticating most traffic is tried first.
+    Failure notifications are sent only when no method authorizes the request.
+    """
+
     CONFIG_KEY_SECURITY_METHODS = 'channels.tradingview.security_methods'
 
+    pipeline: list[CompiledSecurityMethod] = []
+    pipeline_config_version = None
+    # Kept by config index and method name across rebuilds, so each configured method has own stats
+    stats: dict[tuple[int, str], SecurityMethodStats] = {}
+
     def __init__(self, request: Request):
         self._request = request
 
     async def perform_security_validation(self) -> dict[str, any]:
-        security_methods: list[dict[str, any]] = ConfigManager.config.get(SecurityManager.CONFIG_KEY_SECURITY_METHODS)
-        for security_method in security_methods:
+        try:
+            request_json = json_codec.loads(await self._request.body())
+
+        except Exception as exc:
+            raise SecurityManagerException('Request body is not valid json') from exc
+
+        failures: list[tuple[CompiledSecurityMethod, Exception]] = []
+        for compiled_method in SecurityManager.get_pipeline():
+            start_time = time.perf_counter()
             try:
-                name = security_method['name']
-                if name not in enabled_security_methods:
-                    logging.debug('Skipping security method %s as not enabled', name)
-                    continue
+                request_data = await compiled_method.method.perform_validation(request_json)
+                SecurityManager._record(compiled_method, start_time, True)
+                return request_data
 
-                security_method: SecurityMethod = enabled_security_methods[name](
-                    self._request,
-                    Config(security_method['config'], f'Security method {name} config')
-                )
-                return await security_method.perform_validation()
+            except Exception as exc:
+                SecurityManager._record(compiled_method, start_time, False)
+                logging.debug('Security method %s did not authorize request', compiled_method.name)
+                failures.append((compiled_method, exc))
 
-            except Exception:
-                pass
+        for compiled_method, exc in failures:
+            await compiled_method.method.maybe_notify_failure(exc)
 
         raise SecurityManagerException('Security manager does not authorize the request')
+
+    @staticmethod
+    def get_pipeline() -> list[CompiledSecurityMethod]:
+        if SecurityManager.pipeline_config_version != ConfigManager.main_config_version:
+            SecurityManager.compile_pipeline()
+
+        return SecurityManager.pipeline
+
+    @staticmethod
+    def compile_pipeline() -> None:
+        pipeline = []
+        security_methods: list[dict[str, any]] = ConfigManager.config.get(SecurityManager.CONFIG_KEY_SECURITY_METHODS)
+        for index, security_method in enumerate(security_methods):
+            name = security_method['name']
+            if name not in enabled_security_methods:
+                logging.debug('Skipping security method %s as not enabled', name)
+                continue
+
+            pipeline.append(CompiledSecurityMethod(
+                name,
+                enabled_security_methods[name](Config(security_method['config'], f'Security method {name} config')),
+                index,
+                SecurityManager.stats.setdefault((index, name), SecurityMethodStats())
+            ))
+
+        SecurityManager.pipeline = SecurityManager._sorted(pipeline)
+        SecurityManager.pipeline_config_version = ConfigManager.main_config_version
+        logging.info('Compiled security pipeline: %s', [compiled_method.name for compiled_method in SecurityManager.pipeline])
+
+    @staticmethod
+    def _record(compiled_method: CompiledSecurityMethod, start_time: float, success: bool) -> None:
+        compiled_method.stats.attempts += 1
+        compiled_method.stats.successes += int(success)
+        compiled_method.stats.total_seconds += time.perf_counter() - start_time
+
+        # Only recorded method moved, so pipeline is still sorted if it's in order with its neighbours
+        pipeline = SecurityManager.pipeline
+        index = next((index for index, pipeline_method in enumerate(pipeline) if pipeline_method is compiled_method), None)
+        if index is None:
+            return
+
+        order_key = SecurityManager._get_order_key(compiled_method)
+        if index > 0 and SecurityManager._get_order_key(pipeline[index - 1]) > order_key \
+                or index + 1 < len(pipeline) and order_key > SecurityManager._get_order_key(pipeline[index + 1]):
+            # New list, so requests iterating current one are not affected
+            SecurityManager.pipeline = SecurityManager._sorted(pipeline)
+
+    @staticmethod
+    def _sorted(pipeline: list[CompiledSecurityMethod]) -> list[CompiledSecurityMethod]:
+        return sorted(pipeline, key=SecurityManager._get_order_key)
+
+    @staticmethod
+    def _get_order_key(compiled_method: CompiledSecurityMethod) -> tuple[float, int]:
+        return -compiled_method.stats.success_rate, compiled_method.config_index
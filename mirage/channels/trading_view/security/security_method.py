@@ -1,11 +1,9 @@
-
 from abc import ABCMeta, abstractmethod
 import logging
 import traceback
-from fastapi import Request
-from uvicorn import Config
 
 from mirage.channels.channels_manager import ChannelsManager
+from mirage.config.config import Config
 from mirage.utils.multi_logging import log_and_send
 
 
@@ -14,36 +12,38 @@ class SecurityMethodException(Exception):
 
 
 class SecurityMethod:
+    """
+    Created once per main config version by security manager and reused for all requests, so must not keep request state.
+    Gets request body already parsed by security manager, which is shared between methods and must not be modified.
+    """
+
     __metaclass__ = ABCMeta
 
     CONFIG_NOTIFY_FAILURE = 'notify_failure'
 
-    def __init__(self, request: Request, method_config: Config):
-        self._request = request
+    def __init__(self, method_config: Config):
         self._method_config = method_config
 
-    async def perform_validation(self) -> dict[str, any]:
+    async def perform_validation(self, request_json: dict[str, any]) -> dict[str, any]:
         try:
-            return await self._perform_validation_internal()
+            return await self._perform_validation_internal(request_json)
 
         except SecurityMethodException as exc:
-            await self._maybe_notify_failure()
             raise exc
         except Exception as exc:
-            await self._maybe_notify_failure()
             raise SecurityMethodException() from exc
 
     @abstractmethod
-    async def _perform_validation_internal(self) -> dict[str, any]:
+    async def _perform_validation_internal(self, request_json: dict[str, any]) -> dict[str, any]:
         raise NotImplementedError()
 
-    async def _maybe_notify_failure(self) -> None:
+    async def maybe_notify_failure(self, exc: Exception) -> None:
         if not self._method_config.get(SecurityMethod.CONFIG_NOTIFY_FAILURE, False):
             return
 
         await log_and_send(
             logging.error, ChannelsManager.get_communication_channel(),
-            f'Exception during authentication\n{traceback.format_exc()}'
+            f'Exception during authentication\n{"".join(traceback.format_exception(exc))}'
         )
         await ChannelsManager.get_communication_channel().send_message(
             'Unauthorized request to correct Mirage endpoint.\nIs someone trying to attack Mirage?\nInvestigate farther & consider changing endpoint.'
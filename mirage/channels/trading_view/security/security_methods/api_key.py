@@ -9,17 +9,15 @@ class ApiKey(SecurityMethod):
     CONFIG_API_KEY = 'api_key'
     REQUEST_API_KEY = 'api_key'
 
-    async def _perform_validation_internal(self) -> dict[str, any]:
+    async def _perform_validation_internal(self, request_json: dict[str, any]) -> dict[str, any]:
         try:
-            request_data = await self._request.json()
-            request_api_key = request_data[ApiKey.REQUEST_API_KEY]
+            request_api_key = request_json[ApiKey.REQUEST_API_KEY]
             config_api_key = self._method_config.get(ApiKey.CONFIG_API_KEY)
 
             if request_api_key != config_api_key:
                 raise ApiKeyException('Invalid api key')
 
-            del request_data[ApiKey.REQUEST_API_KEY]
-            return request_data
+            return {key: value for key, value in request_json.items() if key != ApiKey.REQUEST_API_KEY}
 
         except Exception as exc:
             raise ApiKeyException('Exception during api key authentication') from exc
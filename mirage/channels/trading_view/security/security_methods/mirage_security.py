@@ -1,9 +1,13 @@
+import base64
 import hashlib
-import json
+import hmac
 import time
+import warnings
+import numpy as np
 import consts
 from mirage.channels.trading_view.security.security_method import SecurityMethod, SecurityMethodException
-from mirage.database.mongo.common_operations import get_single_record, insert_dict
+from mirage.channels.trading_view.security.nonce_store import NonceStore
+from mirage.utils import json_codec
 
 
 class MirageSecurityException(SecurityMethodException):
@@ -11,32 +15,74 @@ class MirageSecurityException(SecurityMethodException):
 
 
 class MirageSecurity(SecurityMethod):
+    """
+    Version 1: comma separated xor encrypted bytes, holding message and its sha256 hash with secret key.
+    Version 2: fixed fields envelope. Base64 xor encrypted body, timenow, nonce and hmac-sha256 tag over all of them.
+    Tag checked before decrypting, so invalid requests are rejected cheaply. See docs/mirage_security_example.txt.
+    """
+
     CONFIG_XOR_KEYS = 'xor_keys'
     CONFIG_SECRET_KEY = 'secret_key'
+    CONFIG_ACCEPTED_VERSIONS = 'accepted_versions'
 
-    async def _perform_validation_internal(self) -> dict[str, any]:
-        try:
-            request_json = await self._request.json()
-            decrypted_json = self._decrypt_data(request_json['request']['data'])
-            decrypted_data = decrypted_json['decrypted_data']
+    VERSION_1 = 1
+    VERSION_2 = 2
+    DEFAULT_ACCEPTED_VERSIONS = [VERSION_1, VERSION_2]
 
-            message_content = decrypted_data['message']
-            message_hash = decrypted_data['hash']
+    async def _perform_validation_internal(self, request_json: dict[str, any]) -> dict[str, any]:
+        try:
+            request = request_json['request']
 
-            message = json.loads(message_content)['message']
-            self._validate_hash(message_content, message_hash)
-            self._validate_request_expiration(message['timenow'])
-            self._validate_request_nonce(message['nonce'])
+            version = request.get('version', MirageSecurity.VERSION_1)
+            if version not in self._method_config.get(MirageSecurity.CONFIG_ACCEPTED_VERSIONS, MirageSecurity.DEFAULT_ACCEPTED_VERSIONS):
+                raise MirageSecurityException(f'Request version {version} not accepted')
 
-            self._insert_request_nonce(message['nonce'])
+            if version == MirageSecurity.VERSION_2:
+                return await self._validate_v2(request)
 
-            return message['body']
+            return await self._validate_v1(request)
 
         except MirageSecurityException as exc:
             raise exc
         except Exception as exc:
             raise MirageSecurityException('Exception during mirage security authentication') from exc
 
+    async def _validate_v1(self, request: dict[str, any]) -> dict[str, any]:
+        decrypted_json = self._decrypt_data(request['data'])
+        decrypted_data = decrypted_json['decrypted_data']
+
+        message_content = decrypted_data['message']
+        message_hash = decrypted_data['hash']
+
+        message = json_codec.loads(message_content)['message']
+        self._validate_hash(message_content, message_hash)
+        self._validate_request_expiration(message['timenow'])
+        await self._validate_request_nonce(message['nonce'])
+
+        return {**message['body'], consts.REQUEST_KEY_TIMENOW: message['timenow']}
+
+    async def _validate_v2(self, request: dict[str, any]) -> dict[str, any]:
+        data = request['data']
+        timenow = int(request['timenow'])
+        nonce = str(request['nonce'])
+
+        self._validate_tag(build_v2_signed_content(timenow, nonce, data), request['tag'])
+        self._validate_request_expiration(timenow)
+        await self._validate_request_nonce(nonce)
+
+        encrypted_data = np.frombuffer(base64.b64decode(data, validate=True), dtype=np.uint8).astype(np.uint32)
+        return {**json_codec.loads(self._apply_xor_keys(encrypted_data)), consts.REQUEST_KEY_TIMENOW: timenow}
+
+    def _validate_tag(self, signed_content: str, tag: str) -> None:
+        expected_tag = hmac.new(
+            self._method_config.get(MirageSecurity.CONFIG_SECRET_KEY).encode(), signed_content.encode(), hashlib.sha256
+        ).hexdigest()
+
+        if hmac.compare_digest(expected_tag, tag):
+            return
+
+        raise MirageSecurityException('Invalid request tag')
+
     def _validate_hash(self, message_content: str, message_hash: str) -> None:
         sha256_hash = hashlib.sha256()
         sha256_hash.update((message_content + self._method_config.get(MirageSecurity.CONFIG_SECRET_KEY)).encode())
@@ -55,25 +101,46 @@ class MirageSecurity(SecurityMethod):
 
         raise MirageSecurityException('Request expired')
 
-    def _validate_request_nonce(self, nonce: str) -> None:
-        result = get_single_record(consts.DB_NAME_MIRAGE_SECURITY, consts.COLLECTION_REQUEST_NONCES, {'_id': nonce})
-        if result is None:
+    async def _validate_request_nonce(self, nonce: str) -> None:
+        if await NonceStore.register(nonce):
             return
 
         raise MirageSecurityException('Nonce already exists')
 
-    def _insert_request_nonce(self, nonce: str) -> None:
-        insert_dict(consts.DB_NAME_MIRAGE_SECURITY, consts.COLLECTION_REQUEST_NONCES, {'_id': nonce})
-
     def _decrypt_data(self, data: str) -> dict[str, any]:
-        decrypted_data = self._create_bytearray_from_data(data)
+        """
+        XOR is associative, so all repeating keys are combined into one key stream and applied in single vectorized pass.
+        """
+        return json_codec.loads(self._apply_xor_keys(self._create_array_from_data(data)))
+
+    def _apply_xor_keys(self, encrypted_data: np.ndarray) -> bytes:
+        key_stream = np.zeros(len(encrypted_data), dtype=np.uint32)
         for key in self._method_config.get(MirageSecurity.CONFIG_XOR_KEYS):
-            for index, _ in enumerate(decrypted_data):
-                decrypted_data[index] ^= ord(key[index % len(key)])
+            key_codes = np.fromiter(map(ord, key), dtype=np.uint32, count=len(key))
+            key_stream ^= np.resize(key_codes, len(encrypted_data))
+
+        decrypted_data = encrypted_data ^ key_stream
+        if decrypted_data.size and decrypted_data.max() > 255:
+            raise MirageSecurityException('Decrypted data is not valid bytes')
+
+        return decrypted_data.astype(np.uint8).tobytes()
+
+    def _create_array_from_data(self, data: str) -> np.ndarray:
+        # Parsed in C in one pass. Numpy only warns about malformed input, so make it error.
+        with warnings.catch_warnings(action='error'):
+            numbers = np.fromstring(data, dtype=np.int64, sep=',')
+
+        if numbers.size != data.count(',') + 1:
+            raise MirageSecurityException('Malformed encrypted data')
+
+        if numbers.size and (numbers.min() < 0 or numbers.max() > 255):
+            raise MirageSecurityException('Encrypted data is not valid bytes')
+
+        return numbers.astype(np.uint32)
 
-        content = decrypted_data.decode()
-        return json.loads(content)
 
-    def _create_bytearray_from_data(self, data: str) -> bytearray:
-        numbers = data.split(',')
-        return bytearray([int(number) for number in numbers])
+def build_v2_signed_content(timenow: int, nonce: str, data: str) -> str:
+    """
+    Content covered by version 2 tag. Shared with request generator in tools.
+    """
+    return f'{MirageSecurity.VERSION_2}.{timenow}.{nonce}.{data}'
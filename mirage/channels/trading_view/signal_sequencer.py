@@ -0,0 +1,150 @@
+import asyncio
+from dataclasses import dataclass, field
+import logging
+
+import consts
+from mirage.channels.channels_manager import ChannelsManager
+from mirage.database.mongo.common_operations import delete_dict, get_records, get_single_record, upsert_dict
+from mirage.utils.multi_logging import log_and_send
+
+
+@dataclass
+class _InstanceSequence:
+    next_sequence: int
+    # Turns of waiting and processing signals, by sequence
+    turns: dict[int, asyncio.Future] = field(default_factory=dict)
+    # Pending signals registered on restore, whose tasks did not ask for their turn yet
+    restored: set[int] = field(default_factory=set)
+
+
+class SignalSequencer:
+    """
+    Processes sequenced signals of each strategy instance in sequence order, as TradingView may deliver them reordered.
+    Signal waits till previous sequence finished, and is released right after it. Instance without sequence state starts from
+    configured sequence start.
+    If previous sequences don't arrive within gap timeout they are skipped, and dropped if arrive later.
+    Pending signals and next sequence are kept in db, so pending signals are restored after restart.
+    To restart sequence numbering of instance, delete its sequence state.
+    """
+
+    CONFIG_KEY_GAP_TIMEOUT = 'strategy_manager.sequence_gap_timeout_seconds'
+    CONFIG_KEY_SEQUENCE_START = 'strategy_manager.sequence_start'
+    DEFAULT_GAP_TIMEOUT = 30
+    DEFAULT_SEQUENCE_START = 1
+
+    instances: dict[str, _InstanceSequence] = {}
+
+    @staticmethod
+    async def wait_for_turn(
+            instance_key: str, sequence: int, request_data_id: str, request_content: dict[str, any], gap_timeout: float, sequence_start: int
+    ) -> bool:
+        """
+        Returns false if signal was dropped, as its sequence already processed or skipped.
+        """
+        instance = await SignalSequencer._get_instance(instance_key, sequence_start)
+        if sequence in instance.restored:
+            instance.restored.discard(sequence)
+            turn = instance.turns[sequence]
+
+        else:
+            if sequence < instance.next_sequence or sequence in instance.turns:
+                await log_and_send(
+                    logging.warning, ChannelsManager.get_communication_channel(),
+                    f'Dropped signal {sequence} of {instance_key}. Already processed or skipped, expecting {instance.next_sequence}.'
+                )
+                return False
+
+            turn = SignalSequencer._register_turn(instance, sequence)
+            await SignalSequencer._persist(
+                upsert_dict,
+                consts.COLLECTION_PENDING_SIGNALS,
+                {'_id': f'{instance_key}:{sequence}'},
+                {'instance_key': instance_key, 'sequence': sequence, 'request_data_id': request_data_id, 'content': request_content}
+            )
+
+        while True:
+            try:
+                await asyncio.wait_for(asyncio.shield(turn), gap_timeout)
+                return True
+
+            except asyncio.TimeoutError:
+                if turn.done() or sequence != min(instance.turns):
+                    continue
+
+                # Nothing before this signal is waiting or processing, so the missing ones are skipped
+                skipped_from = instance.next_sequence
+                instance.next_sequence = sequence
+                turn.set_result(None)
+
+                await log_and_send(
+                    logging.warning, ChannelsManager.get_communication_channel(),
+                    f'Signals {skipped_from} to {sequence - 1} of {instance_key} did not arrive in {gap_timeout} seconds. Skipping them.'
+                )
+
+    @staticmethod
+    async def finish_turn(instance_key: str, sequence: int) -> None:
+        instance = SignalSequencer.instances[instance_key]
+        instance.turns.pop(sequence, None)
+        instance.next_sequence = max(instance.next_sequence, sequence + 1)
+
+        next_turn = instance.turns.get(instance.next_sequence)
+        if next_turn is not None and not next_turn.done():
+            next_turn.set_result(None)
+
+        await SignalSequencer._persist(delete_dict, consts.COLLECTION_PENDING_SIGNALS, {'_id': f'{instance_key}:{sequence}'})
+        await SignalSequencer._persist(
+            upsert_dict, consts.COLLECTION_SEQUENCE_STATES, {'_id': instance_key}, {'next_sequence': instance.next_sequence}
+        )
+
+    @staticmethod
+    async def restore_pending() -> list[dict[str, any]]:
+        """
+        Signals not finished before restart, in sequence order. Their turns are registered here, before their tasks start,
+        so tasks resuming in any order keep sequence order. Instance without sequence state starts from lowest pending.
+        """
+        cursor = get_records(
+            consts.DB_NAME_MIRAGE_SEQUENCER, consts.COLLECTION_PENDING_SIGNALS, {}, [('instance_key', 1), ('sequence', 1)]
+        )
+        pending_signals = await cursor.to_list()
+
+        for pending_signal in pending_signals:
+            sequence = pending_signal['sequence']
+            # Pending are sorted, so instance is loaded with its lowest
+            instance = await SignalSequencer._get_instance(pending_signal['instance_key'], sequence)
+
+            # Already processed ones are dropped when their task asks for turn
+            if sequence >= instance.next_sequence and sequence not in instance.turns:
+                SignalSequencer._register_turn(instance, sequence)
+                instance.restored.add(sequence)
+
+        return pending_signals
+
+    @staticmethod
+    def _register_turn(instance: _InstanceSequence, sequence: int) -> asyncio.Future:
+        turn = asyncio.get_running_loop().create_future()
+        instance.turns[sequence] = turn
+        if sequence == instance.next_sequence:
+            turn.set_result(None)
+
+        return turn
+
+    @staticmethod
+    async def _get_instance(instance_key: str, sequence_start: int) -> _InstanceSequence:
+        if instance_key in SignalSequencer.instances:
+            return SignalSequencer.instances[instance_key]
+
+        state = await get_single_record(consts.DB_NAME_MIRAGE_SEQUENCER, consts.COLLECTION_SEQUENCE_STATES, {'_id': instance_key})
+
+        # Another signal of same instance may have loaded it meanwhile
+        return SignalSequencer.instances.setdefault(
+            instance_key, _InstanceSequence(next_sequence=state['next_sequence'] if state is not None else sequence_start)
+        )
+
+    @staticmethod
+    async def _persist(operation: callable, collection_name: str, *args) -> None:
+        # Order in memory is already updated. Failing to persist only affects restore after restart.
+        try:
+            await operation(consts.DB_NAME_MIRAGE_SEQUENCER, collection_name, *args)
+
+        except Exception:
+            logging.exception('Failed persisting signal sequence to %s', collection_name)
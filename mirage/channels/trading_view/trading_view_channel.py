@@ -10,6 +10,7 @@ class TradingViewChannel(Channel):
         self._webhook_server = WebhookServer()
 
     async def start(self) -> None:
+        await self._webhook_server.restore_pending_signals()
         asyncio.create_task(self._webhook_server.run_server())
 
     # Server automatically stops on receiving Ctrl+C signal. Send in case terminated by setting flag.
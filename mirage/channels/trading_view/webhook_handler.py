@@ -3,12 +3,16 @@ import consts
 
 from mirage.channels.trading_view.exceptions import WebhookRequestException
 from mirage.channels.trading_view.request_json import RequestJson
+from mirage.channels.trading_view.signal_sequencer import SignalSequencer
 from mirage.config.config_manager import ConfigManager
-from mirage.database.mongo.common_operations import insert_dict
+from mirage.database.mongo.write_behind_writer import WriteBehindWriter
 from mirage.strategy_manager.strategy_manager import StrategyManager
 from mirage.strategy.strategy import Strategy
 from mirage.strategy_manager import enabled_strategy_managers
 from mirage.strategy import enabled_strategies
+from mirage.tasks.task_manager import TaskManager
+from mirage.tracing.request_tracer import RequestTracer
+from mirage.utils.date_utils import timenow_to_timestamp
 from mirage.utils.mirage_dict import MirageDict
 
 
@@ -17,21 +21,31 @@ class WebhookHandler:
     KEY_STRATEGY_NAME = 'strategy.name'
     KEY_STRATEGY_INSTANCE_ID = 'strategy.instance_id'
     KEY_DATA = 'data'
+    # Optional. Signals of strategy instance with sequence are processed in sequence order.
+    KEY_SEQUENCE = 'sequence'
 
-    def __init__(self, request_data: dict[str, any]):
+    def __init__(self, request_data: dict[str, any], request_data_id: str = None):
+        """
+        Request data id given for requests restored after restart, which are already recorded.
+        """
         self._request_json = RequestJson(request_data)
+        self._request_data_id = request_data_id
 
     async def process_request(self) -> None:
         logging.info('Received webhook data: %s', self._request_json.raw_dict)
 
-        result = insert_dict(
-            consts.DB_NAME_HISTORY,
-            consts.COLLECTION_REQUEST_DATA,
-            {
-                'source': 'trading_view',
-                'content': self._request_json.raw_dict
-            }
-        )
+        request_data_id = self._request_data_id
+        if request_data_id is None:
+            with RequestTracer.span('insert_request_data'):
+                request_data_id = WriteBehindWriter.enqueue(
+                    consts.DB_NAME_HISTORY,
+                    consts.COLLECTION_REQUEST_DATA,
+                    {
+                        'source': 'trading_view',
+                        'content': self._request_json.raw_dict
+                    }
+                )
+        RequestTracer.set_request_data_id(request_data_id)
 
         self._request_json.validate_key_exists(WebhookHandler.KEY_STRATEGY_NAME)
         self._request_json.validate_key_exists(WebhookHandler.KEY_STRATEGY_INSTANCE_ID)
@@ -42,13 +56,48 @@ class WebhookHandler:
             self._request_json.get(WebhookHandler.KEY_STRATEGY_INSTANCE_ID)
         )
 
+        sequence = self._get_sequence()
         strategy_manager: StrategyManager = self._get_strategy_manager(
             strategy_instance_config.get(WebhookHandler.CONFIG_KEY_STRATEGY_MANAGER_NAME),
-            result.inserted_id
+            request_data_id,
+            sequence is None
         )
-        await strategy_manager.process_strategy()
 
-    def _get_strategy_manager(self, strategy_manager_name: str, request_data_id: str) -> StrategyManager:
+        if sequence is None:
+            await strategy_manager.process_strategy()
+            return
+
+        instance_key = TaskManager.strategy_instance_key(
+            self._request_json.get(WebhookHandler.KEY_STRATEGY_NAME),
+            self._request_json.get(WebhookHandler.KEY_STRATEGY_INSTANCE_ID)
+        )
+        with RequestTracer.span('sequence_wait', sequence=sequence):
+            is_turn = await SignalSequencer.wait_for_turn(
+                instance_key, sequence, request_data_id, self._request_json.raw_dict,
+                strategy_instance_config.get(SignalSequencer.CONFIG_KEY_GAP_TIMEOUT, SignalSequencer.DEFAULT_GAP_TIMEOUT),
+                strategy_instance_config.get(SignalSequencer.CONFIG_KEY_SEQUENCE_START, SignalSequencer.DEFAULT_SEQUENCE_START)
+            )
+
+        if not is_turn:
+            return
+
+        try:
+            await strategy_manager.process_strategy()
+
+        finally:
+            await SignalSequencer.finish_turn(instance_key, sequence)
+
+    def _get_sequence(self) -> int | None:
+        if WebhookHandler.KEY_SEQUENCE not in self._request_json.raw_dict:
+            return None
+
+        sequence = self._request_json.raw_dict[WebhookHandler.KEY_SEQUENCE]
+        if not isinstance(sequence, int) or isinstance(sequence, bool):
+            raise WebhookRequestException(f'Invalid sequence {sequence}. Must be integer.')
+
+        return sequence
+
+    def _get_strategy_manager(self, strategy_manager_name: str, request_data_id: str, allow_reprocess: bool) -> StrategyManager:
         if strategy_manager_name not in enabled_strategy_managers:
             raise WebhookRequestException(f'Strategy manager {strategy_manager_name} is not enabled.')
 
@@ -63,4 +112,19 @@ class WebhookHandler:
             MirageDict(self._request_json.get(WebhookHandler.KEY_DATA)),
             strategy_name,
             strategy_instance_id,
+            self._get_signal_time(),
+            allow_reprocess
         )
+
+    def _get_signal_time(self) -> float | None:
+        if consts.REQUEST_KEY_TIMENOW not in self._request_json.raw_dict:
+            return None
+
+        timenow = self._request_json.raw_dict[consts.REQUEST_KEY_TIMENOW]
+
+        try:
+            return timenow_to_timestamp(timenow)
+
+        except (ValueError, TypeError):
+            logging.warning('Ignoring invalid signal time %s', timenow)
+            return None
@@ -12,25 +12,30 @@ from slowapi.errors import RateLimitExceeded
 import consts
 from mirage.channels.channels_manager import ChannelsManager
 from mirage.channels.trading_view.security.security_manager import SecurityManager
+from mirage.channels.trading_view.signal_sequencer import SignalSequencer
 from mirage.channels.trading_view.webhook_handler import WebhookHandler
 from mirage.config.config_manager import ConfigManager
+from mirage.tracing.request_tracer import RequestTracer
 
 
 async def _authenticate(request: Request) -> dict[str, any]:
     try:
-        return await SecurityManager(request).perform_security_validation()
+        with RequestTracer.span('authenticate'):
+            return await SecurityManager(request).perform_security_validation()
 
     except Exception:
         ChannelsManager.channels[consts.CHANNEL_TRADING_VIEW].active_operations.variable -= 1
+        await RequestTracer.finish_trace()
         # pylint: disable=raise-missing-from
         # 500 and not 401 for tradingview to retry send request
         raise HTTPException(status_code=500, detail="Unauthorized")
 
 
-async def _process_webhook(request_data) -> dict[str, any]:
+async def _process_webhook(request_data, request_data_id: str = None) -> dict[str, any]:
     try:
-        webhook_handler = WebhookHandler(request_data)
-        await webhook_handler.process_request()
+        with RequestTracer.span('process_webhook'):
+            webhook_handler = WebhookHandler(request_data, request_data_id)
+            await webhook_handler.process_request()
 
     except Exception as exc:
         logging.exception(exc)
@@ -38,6 +43,12 @@ async def _process_webhook(request_data) -> dict[str, any]:
 
     finally:
         ChannelsManager.channels[consts.CHANNEL_TRADING_VIEW].active_operations.variable -= 1
+        await RequestTracer.finish_trace()
+
+
+async def _process_restored_webhook(pending_signal: dict[str, any]) -> None:
+    RequestTracer.start_trace('restored_webhook')
+    await _process_webhook(pending_signal['content'], pending_signal['request_data_id'])
 
 
 class WebhookServer:
@@ -52,15 +63,30 @@ class WebhookServer:
         self.app.state.limiter = Limiter(key_func=get_remote_address, default_limits=[f'{consts.REQUESTS_PER_MINUTE}/minute'])
         self.app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
         self.app.add_middleware(SlowAPIMiddleware)
+        SecurityManager.compile_pipeline()
 
         @self.app.post(ConfigManager.config.get(WebhookServer.KEY_WEBHOOK_SERVER_ENDPOINT))
         async def webhook_endpoint(request: Request):
             ChannelsManager.channels[consts.CHANNEL_TRADING_VIEW].active_operations.variable += 1
+            # Processing task copies current context, so it continues this trace
+            RequestTracer.start_trace('webhook')
 
             request_data = await _authenticate(request)
             asyncio.create_task(_process_webhook(request_data))
             return {"status": "success"}
 
+    async def restore_pending_signals(self) -> None:
+        """
+        Sequenced signals received but not finished before restart. Each waits for its turn again in own task.
+        """
+        pending_signals = await SignalSequencer.restore_pending()
+        if pending_signals:
+            logging.info('Restoring %s pending sequenced signals', len(pending_signals))
+
+        for pending_signal in pending_signals:
+            ChannelsManager.channels[consts.CHANNEL_TRADING_VIEW].active_operations.variable += 1
+            asyncio.create_task(_process_restored_webhook(pending_signal))
+
     async def run_server(self) -> None:
         server = uvicorn.Server(
             uvicorn.Config(
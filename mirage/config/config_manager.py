@@ -83,6 +83,8 @@ def _get_strategy_config_path(strategy_name: str, strategy_instance: str) -> Pat
 class ConfigManager:
     config: Config = None
     execution_config: Config = None
+    # Incremented on every main config change, so derived state can be rebuilt only when needed
+    main_config_version = 0
 
     @staticmethod
     def init_execution_config() -> None:
@@ -111,6 +113,7 @@ class ConfigManager:
     @staticmethod
     def load_main_config() -> None:
         ConfigManager.config = ConfigManager.load_config_file(get_config_environment() / consts.MAIN_CONFIG_FILENAME, 'Main config')
+        ConfigManager.main_config_version += 1
 
     @staticmethod
     def load_config_file(config_path: Path, config_name: str) -> Config:
@@ -154,6 +157,7 @@ class ConfigManager:
             dict_to_update = ConfigManager.config.get(key_to_update)
 
         dict_to_update.update(config_update.raw_dict)
+        ConfigManager.main_config_version += 1
         _save_config(ConfigManager.config, get_config_environment() / consts.MAIN_CONFIG_FILENAME)
 
     @staticmethod
@@ -194,6 +198,7 @@ class ConfigManager:
 
         dict_to_override.clear()
         dict_to_override.update(config_override.raw_dict)
+        ConfigManager.main_config_version += 1
 
         _save_config(ConfigManager.config, get_config_environment() / consts.MAIN_CONFIG_FILENAME)
 
@@ -1,53 +1,67 @@
 from dataclasses import dataclass
 import datetime
-from pymongo.results import InsertOneResult, UpdateResult
-from pymongo.cursor import Cursor
+from pymongo.results import DeleteResult, InsertOneResult, UpdateResult
+from pymongo.asynchronous.cursor import AsyncCursor
 import consts
 from mirage.database.mongo.db_config import DbConfig
 from mirage.utils.dict_utils import clean_dict, dataclass_to_dict
 
 
-def insert_dataclass(db_name: str, collection_name: str, data: dataclass) -> InsertOneResult:
-    return _insert_record(db_name, collection_name, dataclass_to_dict(data))
+async def insert_dataclass(db_name: str, collection_name: str, data: dataclass) -> InsertOneResult:
+    return await _insert_record(db_name, collection_name, dataclass_to_dict(data))
 
 
-def insert_dict(db_name: str, collection_name: str, record: dict[str, any]) -> InsertOneResult:
-    return _insert_record(db_name, collection_name, clean_dict(record))
+async def insert_dict(db_name: str, collection_name: str, record: dict[str, any]) -> InsertOneResult:
+    return await _insert_record(db_name, collection_name, clean_dict(record))
 
 
-def _insert_record(db_name: str, collection_name: str, clean_record: dict[str, any]) -> InsertOneResult:
+async def _insert_record(db_name: str, collection_name: str, clean_record: dict[str, any]) -> InsertOneResult:
     collection = DbConfig.client[db_name][collection_name]
 
     clean_record[consts.RECORD_KEY_CREATED_AT] = datetime.datetime.now(datetime.timezone.utc)
     clean_record[consts.RECORD_KEY_UPDATED_AT] = clean_record[consts.RECORD_KEY_CREATED_AT]
-    return collection.insert_one(clean_record)
+    return await collection.insert_one(clean_record)
 
 
-def update_dataclass(db_name: str, collection_name: str, query_data: dataclass, update_data: dataclass) -> None:
-    _update_record(db_name, collection_name, dataclass_to_dict(query_data), dataclass_to_dict(update_data))
+async def update_dataclass(db_name: str, collection_name: str, query_data: dataclass, update_data: dataclass) -> None:
+    await _update_record(db_name, collection_name, dataclass_to_dict(query_data), dataclass_to_dict(update_data))
 
 
-def update_dict(db_name: str, collection_name: str, query: dict[str, any], update: dict[str, any]) -> None:
-    _update_record(db_name, collection_name, clean_dict(query), clean_dict(update))
+async def update_dict(db_name: str, collection_name: str, query: dict[str, any], update: dict[str, any]) -> None:
+    await _update_record(db_name, collection_name, clean_dict(query), clean_dict(update))
 
 
-def _update_record(db_name: str, collection_name: str, clean_query: dict[str, any], clean_update: dict[str, any]) -> UpdateResult:
+async def upsert_dict(db_name: str, collection_name: str, query: dict[str, any], update: dict[str, any]) -> None:
+    await _update_record(db_name, collection_name, clean_dict(query), clean_dict(update), upsert=True)
+
+
+async def _update_record(
+        db_name: str, collection_name: str, clean_query: dict[str, any], clean_update: dict[str, any], upsert: bool = False
+) -> UpdateResult:
     collection = DbConfig.client[db_name][collection_name]
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    update = {'$set': {consts.RECORD_KEY_UPDATED_AT: now, **clean_update}}
+    if upsert:
+        update['$setOnInsert'] = {consts.RECORD_KEY_CREATED_AT: now}
 
-    return collection.update_one(clean_query, {
-        '$set': {
-            consts.RECORD_KEY_UPDATED_AT: datetime.datetime.now(datetime.timezone.utc),
-            **clean_update
-        }
-    })
+    return await collection.update_one(clean_query, update, upsert=upsert)
+
+
+async def delete_dict(db_name: str, collection_name: str, query: dict[str, any]) -> DeleteResult:
+    collection = DbConfig.client[db_name][collection_name]
+    return await collection.delete_one(query)
 
 
-def get_single_record(db_name: str, collection_name: str, query: dict[str, any], sort: list[tuple] = None) -> dict[str, any]:
+async def get_single_record(db_name: str, collection_name: str, query: dict[str, any], sort: list[tuple] = None) -> dict[str, any]:
     collection = DbConfig.client[db_name][collection_name]
-    return collection.find_one(query, sort=sort)
+    return await collection.find_one(query, sort=sort)
 
 
-def get_records(db_name: str, collection_name: str, query: dict[str, any], sort: list[tuple] = None) -> Cursor:
+def get_records(db_name: str, collection_name: str, query: dict[str, any], sort: list[tuple] = None) -> AsyncCursor:
+    """
+    Cursor fetches lazily, consume it with async for or to_list.
+    """
     collection = DbConfig.client[db_name][collection_name]
     return collection.find(query, sort=sort)
 
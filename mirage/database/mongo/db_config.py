@@ -1,19 +1,28 @@
-import pymongo
-import pymongo.database
+from pymongo import AsyncMongoClient
 from mirage.config.config_manager import ConfigManager
+from mirage.database.mongo.index_registry import IndexRegistry
 
 
 class DbConfig:
+    """
+    Async client, so db round trips don't block the event loop. Client keeps connection pool shared by all operations.
+    Indexes from registry are ensured on connection.
+    """
+
     KEY_CONNECTION_STRING = 'databases.mongo.database_connection_string'
+    KEY_MAX_POOL_SIZE = 'databases.mongo.max_pool_size'
+    DEFAULT_MAX_POOL_SIZE = 100
 
-    client: pymongo.MongoClient = None
+    client: AsyncMongoClient = None
 
     @staticmethod
-    def init_db_connection() -> None:
-        DbConfig.client = pymongo.MongoClient(
-            ConfigManager.config.get(DbConfig.KEY_CONNECTION_STRING)
+    async def init_db_connection() -> None:
+        DbConfig.client = AsyncMongoClient(
+            ConfigManager.config.get(DbConfig.KEY_CONNECTION_STRING),
+            maxPoolSize=ConfigManager.config.get(DbConfig.KEY_MAX_POOL_SIZE, DbConfig.DEFAULT_MAX_POOL_SIZE)
         )
+        await IndexRegistry.ensure_indexes(DbConfig.client)
 
     @staticmethod
-    def close_db_connection() -> None:
-        DbConfig.client.close()
+    async def close_db_connection() -> None:
+        await DbConfig.client.close()
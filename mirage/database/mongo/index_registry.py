@@ -0,0 +1,130 @@
+from dataclasses import dataclass
+import logging
+from typing import Optional
+import pymongo
+from pymongo import AsyncMongoClient
+from pymongo.errors import OperationFailure
+
+import consts
+
+
+@dataclass
+class IndexDefinition:
+    db_name: str
+    collection_name: str
+    name: str
+    keys: list[tuple[str, int]]
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+    partial_filter: Optional[dict[str, any]] = None
+
+
+class IndexRegistry:
+    """
+    Declarative list of indexes for collections Mirage queries. Ensured on db connection, creating is no-op for existing ones.
+    Changing definition of existing index needs dropping it manually, conflict is only logged.
+    """
+
+    # Nonces of older requests are rejected by expiration check anyway, keep them a bit longer for safety
+    NONCES_TTL_SECONDS = consts.MIRAGE_SECURITY_REQUEST_EXPIRATION * 30
+    REQUEST_TRACES_TTL_SECONDS = 30 * 24 * 60 * 60
+
+    DEFAULT_INDEX_NAME = '_id_'
+
+    INDEXES = [
+        IndexDefinition(
+            consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING, consts.COLLECTION_POSITION_INFO, 'strategy_instance_created_at',
+            [('strategy_instance', pymongo.ASCENDING), (consts.RECORD_KEY_CREATED_AT, pymongo.DESCENDING)]
+        ),
+        # Open positions of all instances, for close all
+        IndexDefinition(
+            consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING, consts.COLLECTION_POSITION_INFO, 'open_positions',
+            [('is_open', pymongo.ASCENDING)], partial_filter={'is_open': True}
+        ),
+        IndexDefinition(
+            consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING, consts.COLLECTION_ARM_INFO, 'active_arms_strategy_instance',
+            [('strategy_instance', pymongo.ASCENDING)], partial_filter={'is_active': True}
+        ),
+        IndexDefinition(
+            consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING, consts.COLLECTION_ARM_INFO, 'active_arms_expires_at',
+            [('expires_at', pymongo.ASCENDING)], partial_filter={'is_active': True}
+        ),
+        IndexDefinition(
+            consts.DB_NAME_HISTORY, consts.COLLECTION_REQUEST_DATA, 'created_at',
+            [(consts.RECORD_KEY_CREATED_AT, pymongo.DESCENDING)]
+        ),
+        IndexDefinition(
+            consts.DB_NAME_HISTORY, consts.COLLECTION_BROKER_RESPONSE, 'created_at',
+            [(consts.RECORD_KEY_CREATED_AT, pymongo.DESCENDING)]
+        ),
+        IndexDefinition(
+            consts.DB_NAME_HISTORY, consts.COLLECTION_BROKER_RESPONSE, 'request_data_id',
+            [('request_data_id', pymongo.ASCENDING)]
+        ),
+        IndexDefinition(
+            consts.DB_NAME_HISTORY, consts.COLLECTION_REQUEST_TRACES, 'request_data_id',
+            [('request_data_id', pymongo.ASCENDING)]
+        ),
+        IndexDefinition(
+            consts.DB_NAME_HISTORY, consts.COLLECTION_REQUEST_TRACES, 'created_at_ttl',
+            [(consts.RECORD_KEY_CREATED_AT, pymongo.ASCENDING)], expire_after_seconds=REQUEST_TRACES_TTL_SECONDS
+        ),
+        IndexDefinition(
+            consts.DB_NAME_HISTORY, consts.COLLECTION_CAPITAL_JOURNAL, 'created_at',
+            [(consts.RECORD_KEY_CREATED_AT, pymongo.DESCENDING)]
+        ),
+        IndexDefinition(
+            consts.DB_NAME_HISTORY, consts.COLLECTION_CIRCUIT_BREAKER_EVENTS, 'created_at',
+            [(consts.RECORD_KEY_CREATED_AT, pymongo.DESCENDING)]
+        ),
+        IndexDefinition(
+            consts.DB_NAME_MIRAGE_PERFORMANCE, consts.COLLECTION_TRADES_PERFORMANCE, 'created_at',
+            [(consts.RECORD_KEY_CREATED_AT, pymongo.DESCENDING)]
+        ),
+        IndexDefinition(
+            consts.DB_NAME_MIRAGE_SECURITY, consts.COLLECTION_REQUEST_NONCES, 'created_at_ttl',
+            [(consts.RECORD_KEY_CREATED_AT, pymongo.ASCENDING)], expire_after_seconds=NONCES_TTL_SECONDS
+        ),
+        IndexDefinition(
+            consts.DB_NAME_MIRAGE_SEQUENCER, consts.COLLECTION_PENDING_SIGNALS, 'instance_key_sequence',
+            [('instance_key', pymongo.ASCENDING), ('sequence', pymongo.ASCENDING)]
+        )
+    ]
+
+    @staticmethod
+    async def ensure_indexes(client: AsyncMongoClient) -> None:
+        for index in IndexRegistry.INDEXES:
+            options = {'name': index.name, 'unique': index.unique}
+            if index.expire_after_seconds is not None:
+                options['expireAfterSeconds'] = index.expire_after_seconds
+
+            if index.partial_filter is not None:
+                options['partialFilterExpression'] = index.partial_filter
+
+            try:
+                await client[index.db_name][index.collection_name].create_index(index.keys, **options)
+
+            except OperationFailure:
+                logging.exception('Failed ensuring index %s on %s.%s', index.name, index.db_name, index.collection_name)
+
+    @staticmethod
+    async def build_report(client: AsyncMongoClient) -> dict[str, dict[str, list[str]]]:
+        """
+        Per collection: registered indexes missing in db, indexes never used since server start and indexes not in registry.
+        """
+        report = {}
+        for db_name, collection_name in {(index.db_name, index.collection_name) for index in IndexRegistry.INDEXES}:
+            collection = client[db_name][collection_name]
+            registered = {index.name for index in IndexRegistry.INDEXES if index.db_name == db_name and index.collection_name == collection_name}
+
+            stats = await (await collection.aggregate([{'$indexStats': {}}])).to_list()
+            usage = {stat['name']: stat['accesses']['ops'] for stat in stats}
+            existing = set(usage.keys()) - {IndexRegistry.DEFAULT_INDEX_NAME}
+
+            report[f'{db_name}.{collection_name}'] = {
+                'missing': sorted(registered - existing),
+                'unused': sorted(name for name in existing if usage[name] == 0),
+                'unregistered': sorted(existing - registered)
+            }
+
+        return report
@@ -0,0 +1,129 @@
+import asyncio
+import datetime
+import logging
+from typing import Optional
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+import consts
+from mirage.config.config_manager import ConfigManager
+from mirage.database.mongo.db_config import DbConfig
+from mirage.utils.dict_utils import clean_dict
+
+
+class WriteBehindWriter:
+    """
+    Buffers audit records, like request data and broker responses, and writes them with insert_many by size or time,
+    so trade path doesn't wait for them. Ids are generated locally, so callers can reference records before they are written.
+    Writes that must be durable before trade continues should keep using common operations directly.
+    Failed batches are returned to buffer for retry, up to max pending records. Remaining records are flushed on stop.
+    """
+
+    CONFIG_KEY_MAX_BATCH_SIZE = 'databases.mongo.write_behind.max_batch_size'
+    CONFIG_KEY_FLUSH_INTERVAL = 'databases.mongo.write_behind.flush_interval_seconds'
+
+    DEFAULT_MAX_BATCH_SIZE = 100
+    DEFAULT_FLUSH_INTERVAL = 1
+    MAX_PENDING_RECORDS = 10000
+
+    buffers: dict[tuple[str, str], list[dict[str, any]]] = {}
+    pending_count = 0
+
+    _flush_event: Optional[asyncio.Event] = None
+    _flush_task: Optional[asyncio.Task] = None
+    _flush_lock: Optional[asyncio.Lock] = None
+    _is_stopping = False
+
+    @staticmethod
+    def start() -> None:
+        WriteBehindWriter._is_stopping = False
+        WriteBehindWriter._flush_event = asyncio.Event()
+        WriteBehindWriter._flush_lock = asyncio.Lock()
+        WriteBehindWriter._flush_task = asyncio.create_task(WriteBehindWriter._flush_loop())
+
+    @staticmethod
+    async def stop() -> None:
+        if WriteBehindWriter._flush_task is not None:
+            # Not cancelled, as cancelling flush in the middle loses records already taken from buffer
+            WriteBehindWriter._is_stopping = True
+            WriteBehindWriter._flush_event.set()
+            await WriteBehindWriter._flush_task
+            WriteBehindWriter._flush_task = None
+
+        await WriteBehindWriter.flush()
+        if WriteBehindWriter.pending_count:
+            logging.critical('Write behind writer stopped with %s records not written', WriteBehindWriter.pending_count)
+
+    @staticmethod
+    def enqueue(db_name: str, collection_name: str, record: dict[str, any]) -> ObjectId:
+        clean_record = clean_dict(record)
+        clean_record.setdefault('_id', ObjectId())
+        clean_record[consts.RECORD_KEY_CREATED_AT] = datetime.datetime.now(datetime.timezone.utc)
+        clean_record[consts.RECORD_KEY_UPDATED_AT] = clean_record[consts.RECORD_KEY_CREATED_AT]
+
+        WriteBehindWriter.buffers.setdefault((db_name, collection_name), []).append(clean_record)
+        WriteBehindWriter.pending_count += 1
+
+        if WriteBehindWriter.pending_count >= WriteBehindWriter._get_max_batch_size() and WriteBehindWriter._flush_event is not None:
+            WriteBehindWriter._flush_event.set()
+
+        return clean_record['_id']
+
+    @staticmethod
+    async def flush() -> None:
+        if WriteBehindWriter._flush_lock is None:
+            WriteBehindWriter._flush_lock = asyncio.Lock()
+
+        async with WriteBehindWriter._flush_lock:
+            buffers = WriteBehindWriter.buffers
+            WriteBehindWriter.buffers = {}
+            WriteBehindWriter.pending_count = 0
+
+            for (db_name, collection_name), records in buffers.items():
+                await WriteBehindWriter._write_records(db_name, collection_name, records)
+
+    @staticmethod
+    async def _flush_loop() -> None:
+        while not WriteBehindWriter._is_stopping:
+            try:
+                await asyncio.wait_for(WriteBehindWriter._flush_event.wait(), WriteBehindWriter._get_flush_interval())
+            except asyncio.TimeoutError:
+                pass
+
+            WriteBehindWriter._flush_event.clear()
+            await WriteBehindWriter.flush()
+
+    @staticmethod
+    async def _write_records(db_name: str, collection_name: str, records: list[dict[str, any]]) -> None:
+        max_batch_size = WriteBehindWriter._get_max_batch_size()
+        for index in range(0, len(records), max_batch_size):
+            batch = records[index:index + max_batch_size]
+            try:
+                await DbConfig.client[db_name][collection_name].insert_many(batch, ordered=False)
+
+            except BulkWriteError as exc:
+                # Per document errors, like duplicates of already written retried records. Retrying won't help.
+                logging.error('Write behind bulk write errors in %s.%s: %s', db_name, collection_name, exc.details.get('writeErrors'))
+
+            except Exception:
+                logging.exception('Failed writing %s records to %s.%s. Returning them to buffer.', len(batch), db_name, collection_name)
+                WriteBehindWriter._requeue(db_name, collection_name, records[index:])
+                return
+
+    @staticmethod
+    def _requeue(db_name: str, collection_name: str, records: list[dict[str, any]]) -> None:
+        if WriteBehindWriter.pending_count + len(records) > WriteBehindWriter.MAX_PENDING_RECORDS:
+            logging.critical('Write behind buffer full. Dropping %s records of %s.%s', len(records), db_name, collection_name)
+            return
+
+        buffer = WriteBehindWriter.buffers.setdefault((db_name, collection_name), [])
+        buffer[:0] = records
+        WriteBehindWriter.pending_count += len(records)
+
+    @staticmethod
+    def _get_max_batch_size() -> int:
+        return ConfigManager.config.get(WriteBehindWriter.CONFIG_KEY_MAX_BATCH_SIZE, WriteBehindWriter.DEFAULT_MAX_BATCH_SIZE)
+
+    @staticmethod
+    def _get_flush_interval() -> float:
+        return ConfigManager.config.get(WriteBehindWriter.CONFIG_KEY_FLUSH_INTERVAL, WriteBehindWriter.DEFAULT_FLUSH_INTERVAL)
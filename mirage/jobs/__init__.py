@@ -1,4 +1,7 @@
+from mirage.jobs.account_reconcile.account_reconcile_job import AccountReconcileJob
+from mirage.jobs.armed_entry_expiry.armed_entry_expiry_job import ArmedEntryExpiryJob
+from mirage.jobs.binance_metadata.binance_metadata_refresh_job import BinanceMetadataRefreshJob
 from mirage.jobs.mirage_job import MirageJob
 from mirage.jobs.self_update.self_update_job import SelfUpdateJob
 
-enabled_jobs: list[MirageJob] = [SelfUpdateJob]
+enabled_jobs: list[MirageJob] = [SelfUpdateJob, BinanceMetadataRefreshJob, AccountReconcileJob, ArmedEntryExpiryJob]
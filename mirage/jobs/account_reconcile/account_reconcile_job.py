@@ -0,0 +1,28 @@
+import logging
+import time
+from mirage.brokers.binance.account_mirror import BinanceAccountMirror
+from mirage.brokers.binance.binance_rate_limiter import BinanceRateLimiter
+from mirage.brokers.binance.binance_sessions import BinanceSessions
+from mirage.jobs.mirage_job import MirageJob
+
+
+class AccountReconcileJob(MirageJob):
+    """
+    Periodically replaces account mirror with rest snapshot, fixing drift from missed stream events or external deposits.
+    """
+
+    WALLETS = ['funding', 'margin']
+
+    async def execute(self) -> None:
+        try:
+            exchange = BinanceSessions.get_session().exchange
+            for wallet in AccountReconcileJob.WALLETS:
+                started_at = time.time()
+                balance = await BinanceRateLimiter.request(exchange.fetch_balance, {'type': wallet})
+                BinanceAccountMirror.update_from_balance(wallet, balance, snapshot_started_at=started_at)
+
+        except Exception:
+            logging.exception('Failed reconciling account mirror')
+
+        finally:
+            self._reset_job()
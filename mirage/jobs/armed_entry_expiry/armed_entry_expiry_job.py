@@ -0,0 +1,41 @@
+import logging
+from mirage.channels.channels_manager import ChannelsManager
+from mirage.jobs.mirage_job import MirageJob
+from mirage.strategy import enabled_strategies
+from mirage.strategy_manager.admin_request import process_admin_request
+from mirage.utils.multi_logging import log_and_send
+
+
+class ArmedEntryExpiryJob(MirageJob):
+    """
+    Releases what strategies staged and let expire, like armed entries never fired, so borrowed coins are repaid and capital returned.
+    Releases run through strategy managers like signals, so they wait for turn of their strategy instance.
+    """
+
+    REQUEST_SOURCE = 'armed_entry_expiry'
+
+    async def execute(self) -> None:
+        try:
+            for strategy_name, strategy_class in enabled_strategies.items():
+                for strategy_instance, broker, strategy_data in await strategy_class.get_expired_releases():
+                    await self._release(strategy_name, strategy_instance, broker, strategy_data)
+
+        except Exception:
+            logging.exception('Failed releasing expired entries')
+
+        finally:
+            self._reset_job()
+
+    async def _release(self, strategy_name: str, strategy_instance: str, broker: str, strategy_data: dict[str, any]) -> None:
+        """
+        Runs with broker release was staged on, whichever is configured now.
+        """
+        try:
+            await process_admin_request(ArmedEntryExpiryJob.REQUEST_SOURCE, strategy_name, strategy_instance, strategy_data, broker)
+
+        except Exception as exc:
+            logging.exception('Failed releasing expired entry of %s %s on %s', strategy_name, strategy_instance, broker)
+            await log_and_send(
+                logging.error, ChannelsManager.get_communication_channel(),
+                f'Failed releasing expired entry of {strategy_name} {strategy_instance} on {broker}: {exc!r}. Retrying on next run.'
+            )
@@ -0,0 +1,12 @@
+from mirage.brokers.binance.binance_metadata import BinanceMetadata
+from mirage.brokers.binance.binance_sessions import BinanceSessions
+from mirage.jobs.mirage_job import MirageJob
+
+
+class BinanceMetadataRefreshJob(MirageJob):
+    async def execute(self) -> None:
+        try:
+            await BinanceMetadata.refresh(BinanceSessions.get_session().exchange)
+
+        finally:
+            self._reset_job()
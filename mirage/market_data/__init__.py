@@ -0,0 +1,8 @@
+from mirage.market_data.feeds.binance_ticker_feed import BinanceTickerFeed
+from mirage.market_data.feeds.local_ticker_feed import LocalTickerFeed
+from mirage.market_data.ticker_feed import TickerFeed
+
+enabled_ticker_feeds: dict[str, TickerFeed] = {
+    'binance': BinanceTickerFeed,
+    'local': LocalTickerFeed
+}
@@ -0,0 +1,47 @@
+import asyncio
+import logging
+import ccxt.pro as ccxtpro
+from mirage.market_data.ticker_cache import TickerCache
+from mirage.market_data.ticker_feed import TickerFeed
+
+
+class BinanceTickerFeed(TickerFeed):
+    """
+    Streams tickers of subscribed symbols over Binance websocket into the ticker cache.
+    """
+
+    RECONNECT_DELAY = 5
+    IDLE_DELAY = 1
+
+    def __init__(self):
+        super().__init__()
+        self._exchange = ccxtpro.binance()
+        self._task = None
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._watch_tickers())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        await self._exchange.close()
+
+    async def _watch_tickers(self) -> None:
+        while True:
+            if not self.symbols:
+                await asyncio.sleep(BinanceTickerFeed.IDLE_DELAY)
+                continue
+
+            try:
+                tickers = await self._exchange.watch_tickers(list(self.symbols))
+                for symbol, ticker in tickers.items():
+                    if ticker.get('last') is not None:
+                        TickerCache.update(symbol, ticker['last'], ticker.get('bid'), ticker.get('ask'))
+
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.exception('Binance ticker feed failed. Reconnecting in %s seconds.', BinanceTickerFeed.RECONNECT_DELAY)
+                await asyncio.sleep(BinanceTickerFeed.RECONNECT_DELAY)
@@ -0,0 +1,18 @@
+from typing import Optional
+from mirage.market_data.ticker_cache import TickerCache
+from mirage.market_data.ticker_feed import TickerFeed
+
+
+class LocalTickerFeed(TickerFeed):
+    """
+    Stand-in feed without exchange connection. Quotes are pushed manually, for tests & paper trading.
+    """
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def push(self, symbol: str, last: float, bid: Optional[float] = None, ask: Optional[float] = None) -> None:
+        TickerCache.update(symbol, last, bid, ask)
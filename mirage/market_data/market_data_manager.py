@@ -0,0 +1,65 @@
+import logging
+from typing import Optional
+from mirage.config.config_manager import ConfigManager
+from mirage.market_data import enabled_ticker_feeds
+from mirage.market_data.ticker_cache import TickerCache
+from mirage.market_data.ticker_feed import TickerFeed
+
+
+class MarketDataManagerException(Exception):
+    pass
+
+
+class MarketDataManager:
+    """
+    Keeps ticker feed running so strategies can read prices from memory.
+    Callers should fall back to REST when cached quote is older than max quote age.
+    """
+
+    KEY_FEED = 'market_data.feed'
+    KEY_SYMBOLS = 'market_data.symbols'
+    KEY_MAX_QUOTE_AGE_SECONDS = 'market_data.max_quote_age_seconds'
+
+    DEFAULT_FEED = 'binance'
+    DEFAULT_MAX_QUOTE_AGE_SECONDS = 2
+
+    feed: TickerFeed = None
+
+    @staticmethod
+    async def start() -> None:
+        feed_name = ConfigManager.config.get(MarketDataManager.KEY_FEED, MarketDataManager.DEFAULT_FEED)
+        if feed_name not in enabled_ticker_feeds:
+            raise MarketDataManagerException(f'Ticker feed {feed_name} is not enabled.')
+
+        MarketDataManager.feed = enabled_ticker_feeds[feed_name]()
+        MarketDataManager.feed.subscribe(ConfigManager.config.get(MarketDataManager.KEY_SYMBOLS, []))
+        await MarketDataManager.feed.start()
+        logging.info('Market data feed %s started', feed_name)
+
+    @staticmethod
+    async def stop() -> None:
+        if MarketDataManager.feed is None:
+            return
+
+        await MarketDataManager.feed.stop()
+        MarketDataManager.feed = None
+        TickerCache.clear()
+
+    @staticmethod
+    def subscribe(symbols: list[str]) -> None:
+        if MarketDataManager.feed is None:
+            return
+
+        MarketDataManager.feed.subscribe(symbols)
+
+    @staticmethod
+    def get_last_prices(symbols: list[str]) -> Optional[dict[str, float]]:
+        """
+        Last prices of symbols if all cached quotes are fresh. Otherwise None.
+        """
+        max_age = ConfigManager.config.get(MarketDataManager.KEY_MAX_QUOTE_AGE_SECONDS, MarketDataManager.DEFAULT_MAX_QUOTE_AGE_SECONDS)
+        quotes = TickerCache.get_fresh_quotes(symbols, max_age)
+        if quotes is None:
+            return None
+
+        return {symbol: quote.last for symbol, quote in quotes.items()}
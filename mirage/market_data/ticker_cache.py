@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+import time
+from typing import Optional
+
+
+@dataclass
+class Quote:
+    symbol: str
+    last: float
+    bid: Optional[float]
+    ask: Optional[float]
+    # Local time quote received, used to track staleness
+    received_at: float
+
+
+class TickerCache:
+    """
+    In-memory last/bid/ask table for subscribed symbols. Fed by a ticker feed.
+    """
+
+    quotes: dict[str, Quote] = {}
+
+    @staticmethod
+    def update(symbol: str, last: float, bid: Optional[float], ask: Optional[float]) -> None:
+        TickerCache.quotes[symbol] = Quote(symbol=symbol, last=last, bid=bid, ask=ask, received_at=time.time())
+
+    @staticmethod
+    def get_staleness(symbol: str) -> Optional[float]:
+        quote = TickerCache.quotes.get(symbol)
+        if quote is None:
+            return None
+
+        return time.time() - quote.received_at
+
+    @staticmethod
+    def get_fresh_quote(symbol: str, max_age: float) -> Optional[Quote]:
+        staleness = TickerCache.get_staleness(symbol)
+        if staleness is None or staleness > max_age:
+            return None
+
+        return TickerCache.quotes[symbol]
+
+    @staticmethod
+    def get_fresh_quotes(symbols: list[str], max_age: float) -> Optional[dict[str, Quote]]:
+        """
+        Returns quotes only if all of them are fresh, so caller can fall back to fetching all at once.
+        """
+        quotes = {}
+        for symbol in symbols:
+            quote = TickerCache.get_fresh_quote(symbol, max_age)
+            if quote is None:
+                return None
+
+            quotes[symbol] = quote
+
+        return quotes
+
+    @staticmethod
+    def clear() -> None:
+        TickerCache.quotes = {}
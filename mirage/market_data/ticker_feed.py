@@ -0,0 +1,19 @@
+from abc import ABCMeta, abstractmethod
+
+
+class TickerFeed:
+    __metaclass__ = ABCMeta
+
+    def __init__(self):
+        self.symbols: set[str] = set()
+
+    def subscribe(self, symbols: list[str]) -> None:
+        self.symbols.update(symbols)
+
+    @abstractmethod
+    async def start(self) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    async def stop(self) -> None:
+        raise NotImplementedError()
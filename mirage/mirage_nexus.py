@@ -1,17 +1,29 @@
 import consts
+from mirage.brokers.binance.binance_sessions import BinanceSessions
+from mirage.brokers.binance.user_data_stream import BinanceUserDataStream
 from mirage.channels.channels_manager import ChannelsManager
 from mirage.channels.telegram.telegram_channel import TelegramChannel
 from mirage.channels.trading_view.trading_view_channel import TradingViewChannel
 from mirage.config.config_manager import ConfigManager
 from mirage.database.mongo.db_config import DbConfig
+from mirage.database.mongo.write_behind_writer import WriteBehindWriter
+from mirage.market_data.market_data_manager import MarketDataManager
 
 
 class MirageNexus:
+    def __init__(self):
+        self._user_data_stream = None
+
     async def bootstrap(self) -> None:
         ConfigManager.init_execution_config()
         ConfigManager.load_main_config()
 
-        DbConfig.init_db_connection()
+        await DbConfig.init_db_connection()
+        WriteBehindWriter.start()
+        await BinanceSessions.open_session()
+        await MarketDataManager.start()
+        self._user_data_stream = BinanceUserDataStream()
+        await self._user_data_stream.start()
 
         ChannelsManager.add_channel(consts.CHANNEL_TELEGRAM, TelegramChannel())
         ChannelsManager.add_channel(consts.CHANNEL_TRADING_VIEW, TradingViewChannel())
@@ -19,4 +31,9 @@ class MirageNexus:
 
     async def shutdown(self) -> None:
         await ChannelsManager.stop_all_channels()
-        DbConfig.close_db_connection()
+        if self._user_data_stream is not None:
+            await self._user_data_stream.stop()
+        await MarketDataManager.stop()
+        await BinanceSessions.close_all_sessions()
+        await WriteBehindWriter.stop()
+        await DbConfig.close_db_connection()
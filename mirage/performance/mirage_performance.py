@@ -2,8 +2,10 @@
 from dataclasses import asdict, dataclass
 
 import consts
+from mirage.brokers.binance.binance_sessions import BinanceSessions
 from mirage.database.mongo.base_db_record import BaseDbRecord
-from mirage.database.mongo.common_operations import insert_dataclass
+from mirage.database.mongo.write_behind_writer import WriteBehindWriter
+from mirage.utils.dict_utils import dataclass_to_dict
 
 
 @dataclass
@@ -14,6 +16,8 @@ class InputTradePerformance:
     available_capital: float
     profit: float
     fees: float
+    # Paper broker trades are kept out of performance reports
+    broker: str = BinanceSessions.BROKER_BINANCE
 
 
 @dataclass
@@ -22,10 +26,10 @@ class DbTradePerformance(BaseDbRecord, InputTradePerformance):
 
 
 class MiragePerformance:
-    def record_trade_performance(self, trade_performance: InputTradePerformance) -> None:
+    async def record_trade_performance(self, trade_performance: InputTradePerformance) -> None:
         db_trade_performance = DbTradePerformance(**asdict(trade_performance))
         self._calculcate_profit_percent(db_trade_performance)
-        insert_dataclass(consts.DB_NAME_MIRAGE_PERFORMANCE, consts.COLLECTION_TRADES_PERFORMANCE, db_trade_performance)
+        WriteBehindWriter.enqueue(consts.DB_NAME_MIRAGE_PERFORMANCE, consts.COLLECTION_TRADES_PERFORMANCE, dataclass_to_dict(db_trade_performance))
 
     def _calculcate_profit_percent(self, db_trade_performance: DbTradePerformance) -> None:
         db_trade_performance.profit_percent = db_trade_performance.profit / db_trade_performance.available_capital
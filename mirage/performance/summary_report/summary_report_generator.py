@@ -2,6 +2,7 @@ import datetime
 
 import numpy as np
 import consts
+from mirage.brokers.binance.binance_sessions import BinanceSessions
 from mirage.database.mongo.common_operations import build_dates_query, get_records
 from mirage.performance.mirage_performance import DbTradePerformance
 from mirage.performance.summary_report.instance_info_processor import InstanceInfoProcessor
@@ -40,10 +41,10 @@ class SummaryReportGenerator:
         iso_date_from = iso_string_to_datetime(date_from) if date_from else None
         iso_date_to = iso_string_to_datetime(date_to) if date_to else None
 
-        records = get_records(
+        records = await get_records(
             consts.DB_NAME_MIRAGE_PERFORMANCE, consts.COLLECTION_TRADES_PERFORMANCE,
-            build_dates_query(iso_date_from, iso_date_to)
-        )
+            {**build_dates_query(iso_date_from, iso_date_to), **BinanceSessions.get_selected_broker_query()}
+        ).to_list()
         performance_summary = self._create_totals_summary(records)
         return self._generate_results(performance_summary, iso_date_from, iso_date_to)
 
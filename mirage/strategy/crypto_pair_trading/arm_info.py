@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from mirage.database.mongo.base_db_record import BaseDbRecord
+
+
+@dataclass
+class ArmInfo(BaseDbRecord):
+    request_data_id: Optional[str] = None
+    strategy_instance: Optional[str] = None
+
+    chart_pair: Optional[str] = None
+    side: Optional[str] = None
+
+    # Active until fired or released
+    is_active: Optional[bool] = None
+    # Unix timestamp
+    expires_at: Optional[float] = None
+
+    longed_coin: Optional[str] = None
+    longed_capital: Optional[float] = None
+
+    shorted_coin: Optional[str] = None
+    shorted_amount: Optional[float] = None
+    is_borrowed: Optional[bool] = None
+    # Repay on disarm failed. Arm stays till repaid manually and disarmed again, and isn't released on expiry.
+    needs_manual_repay: Optional[bool] = None
+
+    transfer_amount: Optional[float] = None
+    broker: Optional[str] = None
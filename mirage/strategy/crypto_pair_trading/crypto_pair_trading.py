@@ -1,4 +1,5 @@
 import logging
+import time
 from typing import Optional
 
 import pymongo
@@ -7,18 +8,24 @@ from mirage.algorithm.borrow import borrow_algorithm
 from mirage.algorithm.borrow.exceptions import NoLendersException
 from mirage.algorithm.fetch_tickers import fetch_tickers_algorithm
 from mirage.algorithm.simple_order import simple_order_algorithm
+from mirage.brokers.binance.binance_metadata import BinanceMetadata
+from mirage.brokers.binance.binance_sessions import BinanceSessions
 from mirage.channels.channels_manager import ChannelsManager
 from mirage.config.config import Config
-from mirage.database.mongo.common_operations import get_single_record, insert_dataclass, update_dataclass
+from mirage.database.mongo.common_operations import get_records, get_single_record, insert_dataclass, update_dataclass
+from mirage.market_data.market_data_manager import MarketDataManager
+from mirage.strategy.crypto_pair_trading.arm_info import ArmInfo
 from mirage.strategy.crypto_pair_trading.exceptions import CryptoPairTradingException, SilentCryptoPairTradingException
-from mirage.strategy.crypto_pair_trading.pair_info_parser import PairInfoParser
+from mirage.strategy.crypto_pair_trading.pair_info_parser import PairInfo, PairInfoParser
 from mirage.strategy.crypto_pair_trading.position_info import PositionInfo
+from mirage.strategy.multi_leg_executor import Leg, MultiLegExecutor, PartiallyFilledLegException
 from mirage.strategy.pre_execution_status import PARAM_REPROCESS_TIME, PARAM_TRANSFER_AMOUNT, PreExecutionStatus
+from mirage.strategy.pre_trade_context import ContextSource
 from mirage.strategy.strategy import Strategy
 from mirage.strategy.strategy_execution_status import StrategyExecutionStatus
 from mirage.utils.dict_utils import dataclass_to_dict
 from mirage.utils.multi_logging import log_and_send
-from mirage.utils.symbol_utils import floor_amount, floor_coin_amount, get_base_symbol
+from mirage.utils.symbol_utils import get_base_symbol
 
 
 class CryptoPairTrading(Strategy):
@@ -37,9 +44,19 @@ class CryptoPairTrading(Strategy):
     NOTIFY_BIG_RATIO_PERCENT = 30
     REPROCESS_TIME = 5
     IGNORE_TRADE_FEE_PERCENT_OF_STOPLOSS = 80
+    CONTEXT_TIMEOUT = 5
+
+    CONTEXT_POSITION = 'position'
+    CONTEXT_PRICES = 'prices'
+    CONTEXT_ARM = 'arm'
 
     CONFIG_KEY_MAX_LOSS_PERCENT = 'strategy.max_loss_percent'
     CONFIG_KEY_BASE_CURRENCY = 'strategy_manager.base_currency'
+    # Entry legs always run one after another
+    CONFIG_KEY_CONCURRENT_EXIT_LEGS = 'strategy.concurrent_exit_legs'
+    CONFIG_KEY_ARM_TTL = 'strategy.arm_ttl_seconds'
+    CONFIG_KEY_ARM_PRE_BORROW = 'strategy.arm_pre_borrow'
+    DEFAULT_ARM_TTL = 300
 
     DATA_ACTION = 'action'
     DATA_PAIR = 'pair'
@@ -49,15 +66,26 @@ class CryptoPairTrading(Strategy):
 
     ACTION_ENTRY = 'entry'
     ACTION_EXIT = 'exit'
+    # Arm sizes entry like entry signal, takes its capital and optionally borrows short coin, but sends no orders.
+    # Fire then only sends the orders. Disarm, or arm expiring, repays and returns the capital.
+    ACTION_ARM = 'arm'
+    ACTION_FIRE = 'fire'
+    ACTION_DISARM = 'disarm'
 
     SIDE_LONG = 'long'
     SIDE_SHORT = 'short'
 
     ACTION_PARAM_NAME = 'name'
+    ACTION_PARAM_AMOUNT = 'amount'
+
+    ORDER_STATUS_CLOSED = 'closed'
 
     ACTION_NAME_BORROWED = 'borrowed'
     ACTION_NAME_SOLD = 'sold'
     ACTION_NAME_BOUGHT = 'bought'
+    ACTION_NAME_EXIT_SOLD = 'exit_sold'
+    ACTION_NAME_EXIT_BOUGHT = 'exit_bought'
+    ACTION_NAME_REPAID = 'repaid'
 
     def __init__(
             self,
@@ -69,7 +97,10 @@ class CryptoPairTrading(Strategy):
     ):
         super().__init__(request_data_id, strategy_data, strategy_name, strategy_instance, strategy_instance_config)
         self._existing_position = None
+        self._armed_entry: Optional[ArmInfo] = None
         self._pair_info = None
+        self._chart_pair = None
+        self._side = None
         self._longed_coin = None
         self._longed_amount = None
         self._longed_capital = None
@@ -80,28 +111,91 @@ class CryptoPairTrading(Strategy):
 
     def is_entry(self) -> bool:
         action = self.strategy_data.get(CryptoPairTrading.DATA_ACTION)
-        return action == CryptoPairTrading.ACTION_ENTRY
+        return action in [CryptoPairTrading.ACTION_ENTRY, CryptoPairTrading.ACTION_ARM, CryptoPairTrading.ACTION_FIRE]
+
+    def is_capital_staged(self) -> bool:
+        return self.strategy_data.get(CryptoPairTrading.DATA_ACTION) == CryptoPairTrading.ACTION_FIRE
+
+    @staticmethod
+    async def get_open_position_exits() -> list[tuple[str, str, dict[str, any]]]:
+        cursor = get_records(
+            consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING, consts.COLLECTION_POSITION_INFO, dataclass_to_dict(PositionInfo(is_open=True))
+        )
+        exits = {
+            (record['strategy_instance'], CryptoPairTrading._get_record_broker(record)): {
+                CryptoPairTrading.DATA_ACTION: CryptoPairTrading.ACTION_EXIT,
+                CryptoPairTrading.DATA_PAIR: record['chart_pair']
+            }
+            async for record in cursor
+        }
+        return [(strategy_instance, broker, strategy_data) for (strategy_instance, broker), strategy_data in exits.items()]
+
+    @staticmethod
+    async def get_expired_releases() -> list[tuple[str, str, dict[str, any]]]:
+        cursor = get_records(
+            consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING, consts.COLLECTION_ARM_INFO,
+            {'is_active': True, 'expires_at': {'$lt': time.time()}, 'needs_manual_repay': {'$ne': True}}
+        )
+        releases = {
+            (record['strategy_instance'], CryptoPairTrading._get_record_broker(record)): {
+                CryptoPairTrading.DATA_ACTION: CryptoPairTrading.ACTION_DISARM
+            }
+            async for record in cursor
+        }
+        return [(strategy_instance, broker, strategy_data) for (strategy_instance, broker), strategy_data in releases.items()]
+
+    @staticmethod
+    def _get_record_broker(record: dict[str, any]) -> str:
+        # Records without broker are from before paper broker, so real ones
+        return record.get(BinanceSessions.RECORD_KEY_BROKER) or BinanceSessions.BROKER_BINANCE
+
+    def get_context_sources(self) -> list[ContextSource]:
+        sources = [
+            ContextSource(CryptoPairTrading.CONTEXT_POSITION, self._get_recent_position_info, CryptoPairTrading.CONTEXT_TIMEOUT),
+            ContextSource(CryptoPairTrading.CONTEXT_ARM, self._get_active_arm_info, CryptoPairTrading.CONTEXT_TIMEOUT)
+        ]
+
+        # Invalid pair or side is reported by should_execute_strategy, and prices are fetched again if failed here
+        action = self.strategy_data.get(CryptoPairTrading.DATA_ACTION)
+        if action in [CryptoPairTrading.ACTION_ENTRY, CryptoPairTrading.ACTION_ARM] \
+                and self.strategy_data.get(CryptoPairTrading.DATA_SIDE) in [CryptoPairTrading.SIDE_LONG, CryptoPairTrading.SIDE_SHORT]:
+            sources.append(
+                ContextSource(CryptoPairTrading.CONTEXT_PRICES, self._get_entry_prices, CryptoPairTrading.CONTEXT_TIMEOUT, required=False)
+            )
+
+        return sources
 
     async def should_execute_strategy(self, available_capital: float) -> tuple[bool, PreExecutionStatus, dict[str, any]]:
-        self._existing_position = self._get_recent_position_info()
+        self._existing_position = self.context.get(CryptoPairTrading.CONTEXT_POSITION)
+        self._armed_entry = self.context.get(CryptoPairTrading.CONTEXT_ARM)
 
-        pair_raw = self.strategy_data.get(CryptoPairTrading.DATA_PAIR)
         action = self.strategy_data.get(CryptoPairTrading.DATA_ACTION)
+        if action in [CryptoPairTrading.ACTION_FIRE, CryptoPairTrading.ACTION_DISARM]:
+            return self._load_armed_entry(action)
 
+        pair_raw = self.strategy_data.get(CryptoPairTrading.DATA_PAIR)
         base_currency = self.strategy_instance_config.get(CryptoPairTrading.CONFIG_KEY_BASE_CURRENCY)
         self._pair_info = PairInfoParser(pair_raw, base_currency).parse_pair_info()
+        self._chart_pair = pair_raw
 
-        if action == CryptoPairTrading.ACTION_ENTRY:
+        if action in [CryptoPairTrading.ACTION_ENTRY, CryptoPairTrading.ACTION_ARM]:
             if self._existing_position:
                 logging.warning(
                     "Can't enter new position: another one exists. Strategy instance %s, pair %s", self._existing_position.strategy_instance, pair_raw
                 )
                 return None, PreExecutionStatus.REPROCESS, {PARAM_REPROCESS_TIME: CryptoPairTrading.REPROCESS_TIME}
 
+            if self._armed_entry:
+                logging.warning(
+                    "Can't %s: armed entry exists, fire or disarm it first. Strategy instance %s, pair %s", action, self.strategy_instance, pair_raw
+                )
+                return False, PreExecutionStatus.REGULAR, {}
+
             side = self.strategy_data.get(CryptoPairTrading.DATA_SIDE)
             if side not in [CryptoPairTrading.SIDE_LONG, CryptoPairTrading.SIDE_SHORT]:
                 raise CryptoPairTradingException(f'Invalid side received {side} with chart pair {pair_raw}')
 
+            self._side = side
             await self._fetch_coins_amounts(side, available_capital)
 
         elif action == CryptoPairTrading.ACTION_EXIT:
@@ -127,14 +221,22 @@ class CryptoPairTrading(Strategy):
             await self._try_borrow_funds()
             await self._enter_new_position()
             return StrategyExecutionStatus.ONGOING
+        elif action == CryptoPairTrading.ACTION_ARM:
+            await self._arm_entry()
+            return StrategyExecutionStatus.ONGOING
+        elif action == CryptoPairTrading.ACTION_FIRE:
+            await self._fire_armed_entry()
+            return StrategyExecutionStatus.ONGOING
+        elif action == CryptoPairTrading.ACTION_DISARM:
+            return await self._disarm_entry()
         elif action == CryptoPairTrading.ACTION_EXIT:
             await self._exit_current_position(self._existing_position)
             return StrategyExecutionStatus.RETURN_FUNDS
 
         raise CryptoPairTradingException('Invalid action - should not get there! This had to be already checked.')
 
-    def _get_recent_position_info(self) -> Optional[PositionInfo]:
-        recent_position = self._get_recent_position_info_from_db()
+    async def _get_recent_position_info(self) -> Optional[PositionInfo]:
+        recent_position = await self._get_recent_position_info_from_db()
         if recent_position is None:
             return None
 
@@ -161,15 +263,16 @@ class CryptoPairTrading(Strategy):
             )
             await ba.execute()
 
-            self._actions_track.append({
-                CryptoPairTrading.ACTION_PARAM_NAME: CryptoPairTrading.ACTION_NAME_BORROWED
-            })
-
-            amount = ba.custom_params[borrow_algorithm.BorrowAlgorithm.PARAM_ACTUALLY_BORROWED_AMOUNT]
+            amount = ba.command_results[0][borrow_algorithm.BorrowAlgorithm.RESULT_KEY_ACTUALLY_BORROWED_AMOUNT]
             if amount != self._shorted_amount:
                 logging.info('Actual borrowed amount changed cause of currency precision to %s', amount)
                 self._shorted_amount = amount
 
+            self._actions_track.append({
+                CryptoPairTrading.ACTION_PARAM_NAME: CryptoPairTrading.ACTION_NAME_BORROWED,
+                CryptoPairTrading.ACTION_PARAM_AMOUNT: amount
+            })
+
         except NoLendersException as exc:
             await log_and_send(
                 logging.warning, ChannelsManager.get_communication_channel(),
@@ -180,16 +283,15 @@ class CryptoPairTrading(Strategy):
     async def _enter_new_position(self):
         await self._binance_enter_new_position()
 
-        side = self.strategy_data.get(CryptoPairTrading.DATA_SIDE)
         pair = get_base_symbol(self._pair_info.first_pair) + '/' + get_base_symbol(self._pair_info.second_pair)
-        insert_dataclass(
+        await insert_dataclass(
             consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING,
             consts.COLLECTION_POSITION_INFO,
             PositionInfo(
                 request_data_id=self.request_data_id,
                 strategy_instance=self.strategy_instance,
-                chart_pair=self.strategy_data.get(CryptoPairTrading.DATA_PAIR),
-                side=side,
+                chart_pair=self._chart_pair,
+                side=self._side,
                 pair=pair,
                 is_open=True,
                 longed_coin=self._longed_coin,
@@ -199,23 +301,162 @@ class CryptoPairTrading(Strategy):
                 shorted_amount=self._shorted_amount,
                 shorted_capital=self._shorted_capital,
                 transfer_amount=self._transfer_amount,
-                base_currency=self.strategy_instance_config.get(CryptoPairTrading.CONFIG_KEY_BASE_CURRENCY)
+                base_currency=self.strategy_instance_config.get(CryptoPairTrading.CONFIG_KEY_BASE_CURRENCY),
+                broker=BinanceSessions.selected_broker.get()
             )
         )
 
+    def _load_armed_entry(self, action: str) -> tuple[bool, PreExecutionStatus, dict[str, any]]:
+        """
+        Fire and disarm work with sizing and coins of armed entry. Its capital is already transferred, so nothing more to transfer.
+        """
+        if not self._armed_entry:
+            logging.warning("Can't %s, no armed entry. Strategy instance %s", action, self.strategy_instance)
+            return False, PreExecutionStatus.REGULAR, {}
+
+        if action == CryptoPairTrading.ACTION_FIRE and self._armed_entry.needs_manual_repay:
+            logging.warning("Can't fire armed entry waiting for manual repay. Strategy instance %s", self.strategy_instance)
+            return False, PreExecutionStatus.REGULAR, {}
+
+        if action == CryptoPairTrading.ACTION_FIRE and self._armed_entry.expires_at < time.time():
+            logging.warning("Can't fire expired armed entry, it will be released. Strategy instance %s", self.strategy_instance)
+            return False, PreExecutionStatus.REGULAR, {}
+
+        self._chart_pair = self._armed_entry.chart_pair
+        self._side = self._armed_entry.side
+        self._pair_info = PairInfoParser(
+            self._chart_pair, self.strategy_instance_config.get(CryptoPairTrading.CONFIG_KEY_BASE_CURRENCY)
+        ).parse_pair_info()
+
+        self._longed_coin = self._armed_entry.longed_coin
+        self._longed_capital = self._armed_entry.longed_capital
+        self._shorted_coin = self._armed_entry.shorted_coin
+        self._shorted_amount = self._armed_entry.shorted_amount
+        self._transfer_amount = self._armed_entry.transfer_amount
+
+        return True, PreExecutionStatus.PARTIAL_ALLOCATION, {PARAM_TRANSFER_AMOUNT: 0}
+
+    async def _arm_entry(self) -> None:
+        is_borrowed = self.strategy_instance_config.get(CryptoPairTrading.CONFIG_KEY_ARM_PRE_BORROW, False)
+        if is_borrowed:
+            await self._try_borrow_funds()
+
+        ttl = self.strategy_instance_config.get(CryptoPairTrading.CONFIG_KEY_ARM_TTL, CryptoPairTrading.DEFAULT_ARM_TTL)
+        await insert_dataclass(
+            consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING,
+            consts.COLLECTION_ARM_INFO,
+            ArmInfo(
+                request_data_id=self.request_data_id,
+                strategy_instance=self.strategy_instance,
+                chart_pair=self._chart_pair,
+                side=self._side,
+                is_active=True,
+                expires_at=time.time() + ttl,
+                longed_coin=self._longed_coin,
+                longed_capital=self._longed_capital,
+                shorted_coin=self._shorted_coin,
+                shorted_amount=self._shorted_amount,
+                is_borrowed=is_borrowed,
+                transfer_amount=self._transfer_amount,
+                broker=BinanceSessions.selected_broker.get()
+            )
+        )
+        logging.info('Armed entry of %s for %s seconds. Pre-borrowed: %s', self._chart_pair, ttl, is_borrowed)
+
+    async def _fire_armed_entry(self) -> None:
+        # Arm is used up by fire whatever the outcome. If fire fails, revert repays pre-borrowed coins and capital is returned.
+        await self._deactivate_armed_entry()
+
+        if self._armed_entry.is_borrowed:
+            self._actions_track.append({
+                CryptoPairTrading.ACTION_PARAM_NAME: CryptoPairTrading.ACTION_NAME_BORROWED,
+                CryptoPairTrading.ACTION_PARAM_AMOUNT: self._shorted_amount
+            })
+        else:
+            await self._try_borrow_funds()
+
+        await self._enter_new_position()
+
+    async def _disarm_entry(self) -> StrategyExecutionStatus:
+        # Arm waiting for manual repay is disarmed after coins were repaid by hand
+        if self._armed_entry.is_borrowed and not self._armed_entry.needs_manual_repay:
+            try:
+                await self._repay_borrowed_funds()
+
+            except Exception:
+                logging.exception('Failed repaying coins borrowed by armed entry')
+                await self._keep_armed_entry_for_manual_repay()
+                return StrategyExecutionStatus.ONGOING
+
+        await self._deactivate_armed_entry()
+
+        if self._armed_entry.expires_at < time.time():
+            await log_and_send(
+                logging.warning, ChannelsManager.get_communication_channel(),
+                f'Released expired armed entry of {self._chart_pair}, strategy instance {self.strategy_instance}'
+            )
+
+        return StrategyExecutionStatus.RETURN_FUNDS
+
+    async def _keep_armed_entry_for_manual_repay(self) -> None:
+        """
+        Capital stays with strategy and arm stays active, so instance doesn't enter again while coins are borrowed.
+        """
+        await update_dataclass(
+            consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING,
+            consts.COLLECTION_ARM_INFO,
+            ArmInfo(_id=self._armed_entry._id),
+            ArmInfo(needs_manual_repay=True)
+        )
+        await log_and_send(
+            logging.error, ChannelsManager.get_communication_channel(),
+            f'Failed repaying {self._shorted_amount} {get_base_symbol(self._shorted_coin)} borrowed by armed entry of {self._chart_pair}, '
+            + f'strategy instance {self.strategy_instance}. Arm kept and its capital stays with strategy. '
+            + 'Repay manually, then disarm to release the capital.'
+        )
+
+    async def _deactivate_armed_entry(self) -> None:
+        await update_dataclass(
+            consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING,
+            consts.COLLECTION_ARM_INFO,
+            ArmInfo(_id=self._armed_entry._id),
+            ArmInfo(is_active=False)
+        )
+
+    async def _get_active_arm_info(self) -> Optional[ArmInfo]:
+        record = await get_single_record(
+            consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING, consts.COLLECTION_ARM_INFO,
+            {
+                **dataclass_to_dict(ArmInfo(strategy_instance=self.strategy_instance, is_active=True)),
+                **BinanceSessions.get_selected_broker_query()
+            }
+        )
+        return ArmInfo(**record) if record is not None else None
+
     async def _binance_enter_new_position(self):
-        # We first sell then buy to not go into negative funds zone and get exception
-        await self._entry_sell_short_coins()
-        self._actions_track.append({
-            CryptoPairTrading.ACTION_PARAM_NAME: CryptoPairTrading.ACTION_NAME_SOLD
-        })
-
-        await self._entry_buy_long_coins()
-        self._actions_track.append({
-            CryptoPairTrading.ACTION_PARAM_NAME: CryptoPairTrading.ACTION_NAME_BOUGHT
-        })
-
-    async def _entry_buy_long_coins(self):
+        legs = [
+            Leg(CryptoPairTrading.ACTION_NAME_SOLD, self._entry_sell_short_coins),
+            Leg(CryptoPairTrading.ACTION_NAME_BOUGHT, self._entry_buy_long_coins)
+        ]
+        # We first sell then buy to not go into negative funds zone and get exception.
+        # Not concurrent, as transferred capital is the long cost itself, so long can't be bought without short sale proceeds.
+        await MultiLegExecutor(self._actions_track).run_sequential(legs)
+
+    def _can_run_exit_legs_concurrently(self) -> bool:
+        """
+        Buying back shorted coins without proceeds of selling longed ones is possible only if capital flow covers expected cost.
+        """
+        if not self.strategy_instance_config.get(CryptoPairTrading.CONFIG_KEY_CONCURRENT_EXIT_LEGS, True):
+            return False
+
+        prices = MarketDataManager.get_last_prices([self._shorted_coin])
+        if prices is None:
+            return False
+
+        required = self._shorted_amount * prices[self._shorted_coin] * (1 + BinanceMetadata.get_taker_fee(self._shorted_coin))
+        return self.capital_flow.variable - required > 0
+
+    async def _entry_buy_long_coins(self) -> dict[str, any]:
         # As longed amount price may change and we won't have enough funds to buy it, we buy it with cost and then store the amount
         soa = simple_order_algorithm.SimpleOrderAlgorithm(
             self.capital_flow,
@@ -243,9 +484,16 @@ class CryptoPairTrading(Strategy):
         # If fee paid using this coin deduct the fee from output
         fee_data = result['fee']
         if fee_data and fee_data['currency'] == get_base_symbol(self._longed_coin):
-            self._longed_amount = floor_coin_amount(self._longed_coin, self._longed_amount - fee_data['cost'])
+            self._longed_amount = BinanceMetadata.floor_market_amount(self._longed_coin, self._longed_amount - fee_data['cost'])
+
+        action_params = {
+            CryptoPairTrading.ACTION_PARAM_NAME: CryptoPairTrading.ACTION_NAME_BOUGHT,
+            CryptoPairTrading.ACTION_PARAM_AMOUNT: self._longed_amount
+        }
+        self._validate_order_filled(result, action_params)
+        return action_params
 
-    async def _entry_sell_short_coins(self):
+    async def _entry_sell_short_coins(self) -> dict[str, any]:
         # As we borrowed exact coins amount we sell this exact amount
         soa = simple_order_algorithm.SimpleOrderAlgorithm(
             self.capital_flow,
@@ -269,21 +517,52 @@ class CryptoPairTrading(Strategy):
         result = soa.command_results[0]
         self._shorted_capital = result['cost']
 
+        action_params = {
+            CryptoPairTrading.ACTION_PARAM_NAME: CryptoPairTrading.ACTION_NAME_SOLD,
+            CryptoPairTrading.ACTION_PARAM_AMOUNT: result['filled'] if result.get('filled') is not None else self._shorted_amount
+        }
+        self._validate_order_filled(result, action_params)
+        return action_params
+
+    def _validate_order_filled(self, result: dict[str, any], action_params: dict[str, any]) -> None:
+        status = result.get('status')
+        if status is not None and status != CryptoPairTrading.ORDER_STATUS_CLOSED:
+            raise PartiallyFilledLegException(
+                f'Order {result.get("id")} of {result.get("symbol")} was not fully filled. Status: {status}', action_params
+            )
+
     async def _exit_current_position(self, position_info: PositionInfo):
-        await self._exit_sell_longed_coins()
-        await self._exit_buy_shorted_coins()
-        await self._repay_borrowed_funds()
+        # Legs that went through on previous failed exit are already closed
+        legs = []
+        if self._longed_amount:
+            legs.append(Leg(CryptoPairTrading.ACTION_NAME_EXIT_SOLD, self._exit_sell_longed_coins))
+        if self._shorted_amount:
+            legs.append(Leg(CryptoPairTrading.ACTION_NAME_EXIT_BOUGHT, self._exit_buy_shorted_coins))
+
+        executor = MultiLegExecutor(self._actions_track)
+        if self._can_run_exit_legs_concurrently():
+            await executor.run_concurrent(legs)
+        else:
+            await executor.run_sequential(legs)
 
-        update_dataclass(
+        if self._shorted_amount:
+            await self._repay_borrowed_funds()
+            self._actions_track.append({
+                CryptoPairTrading.ACTION_PARAM_NAME: CryptoPairTrading.ACTION_NAME_REPAID,
+                CryptoPairTrading.ACTION_PARAM_AMOUNT: self._shorted_amount
+            })
+
+        await update_dataclass(
             consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING,
             consts.COLLECTION_POSITION_INFO,
             PositionInfo(_id=position_info._id),
             PositionInfo(is_open=False)
         )
 
-    async def _exit_sell_longed_coins(self):
+    async def _exit_sell_longed_coins(self, amount: Optional[float] = None) -> dict[str, any]:
         # we sell all the longed coins that we bought
-        await simple_order_algorithm.SimpleOrderAlgorithm(
+        amount = self._longed_amount if amount is None else amount
+        soa = simple_order_algorithm.SimpleOrderAlgorithm(
             self.capital_flow,
             self.spent_fees,
             self.request_data_id,
@@ -295,14 +574,24 @@ class CryptoPairTrading(Strategy):
                     type=simple_order_algorithm.SimpleOrderAlgorithm.TYPE_MARKET,
                     symbol=self._longed_coin,
                     operation=simple_order_algorithm.SimpleOrderAlgorithm.OPERATION_SELL,
-                    amount=self._longed_amount,
+                    amount=amount,
                     price=None
                 )
             ],
-        ).execute()
+        )
+        await soa.execute()
 
-    async def _exit_buy_shorted_coins(self):
+        result = soa.command_results[0]
+        action_params = {
+            CryptoPairTrading.ACTION_PARAM_NAME: CryptoPairTrading.ACTION_NAME_EXIT_SOLD,
+            CryptoPairTrading.ACTION_PARAM_AMOUNT: result['filled'] if result.get('filled') is not None else amount
+        }
+        self._validate_order_filled(result, action_params)
+        return action_params
+
+    async def _exit_buy_shorted_coins(self, amount: Optional[float] = None) -> dict[str, any]:
         # We need to buy an exact amount of shorted coins to repay them.
+        amount = self._shorted_amount if amount is None else amount
         soa = simple_order_algorithm.SimpleOrderAlgorithm(
             self.capital_flow,
             self.spent_fees,
@@ -315,20 +604,30 @@ class CryptoPairTrading(Strategy):
                     type=simple_order_algorithm.SimpleOrderAlgorithm.TYPE_MARKET,
                     symbol=self._shorted_coin,
                     operation=simple_order_algorithm.SimpleOrderAlgorithm.OPERATION_BUY,
-                    amount=self._shorted_amount,
+                    amount=amount,
                     price=None
                 )
             ],
         )
         await soa.execute()
 
-        # If fee paid using this coin deduct the fee from output.
+        # If fee paid using this coin deduct the fee from output. Unsold coins, if any, are still held so repay amount drops by fee only.
         result = soa.command_results[0]
+        received = result['filled'] if result.get('filled') is not None else amount
         fee_data = result['fee']
         if fee_data and fee_data['currency'] == get_base_symbol(self._shorted_coin):
-            self._shorted_amount = floor_coin_amount(self._shorted_coin, self._shorted_amount - fee_data['cost'])
-
-    async def _repay_borrowed_funds(self):
+            self._shorted_amount = BinanceMetadata.floor_market_amount(self._shorted_coin, self._shorted_amount - fee_data['cost'])
+            received = BinanceMetadata.floor_market_amount(self._shorted_coin, received - fee_data['cost'])
+
+        # Amount is coins received, which is what can be repaid
+        action_params = {
+            CryptoPairTrading.ACTION_PARAM_NAME: CryptoPairTrading.ACTION_NAME_EXIT_BOUGHT,
+            CryptoPairTrading.ACTION_PARAM_AMOUNT: received
+        }
+        self._validate_order_filled(result, action_params)
+        return action_params
+
+    async def _repay_borrowed_funds(self, amount: Optional[float] = None):
         await borrow_algorithm.BorrowAlgorithm(
             self.capital_flow,
             self.spent_fees,
@@ -338,26 +637,58 @@ class CryptoPairTrading(Strategy):
                     strategy=self.__class__.__name__,
                     description='Pair trading repay borrowed short coin',
                     symbol=get_base_symbol(self._shorted_coin),
-                    amount=self._shorted_amount
+                    amount=self._shorted_amount if amount is None else amount
                 )
             ]
         ).execute()
 
-    def _get_recent_position_info_from_db(self):
-        return get_single_record(
+    async def _get_recent_position_info_from_db(self):
+        return await get_single_record(
             consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING, consts.COLLECTION_POSITION_INFO,
-            dataclass_to_dict(PositionInfo(strategy_instance=self.strategy_instance)),
+            {**dataclass_to_dict(PositionInfo(strategy_instance=self.strategy_instance)), **BinanceSessions.get_selected_broker_query()},
             sort=[(consts.RECORD_KEY_CREATED_AT, pymongo.DESCENDING)]
         )
 
-    async def _fetch_coins_amounts(self, side: str, available_capital: float) -> None:
+    def _select_coins(self, pair_info: PairInfo, side: str) -> tuple[str, str]:
+        """
+        Longed and shorted coins.
+        """
         if side == CryptoPairTrading.SIDE_LONG:
-            self._longed_coin = self._pair_info.first_pair
-            self._shorted_coin = self._pair_info.second_pair
-        else:
-            self._longed_coin = self._pair_info.second_pair
-            self._shorted_coin = self._pair_info.first_pair
+            return pair_info.first_pair, pair_info.second_pair
+
+        return pair_info.second_pair, pair_info.first_pair
+
+    async def _get_entry_prices(self) -> dict[str, float]:
+        pair_info = PairInfoParser(
+            self.strategy_data.get(CryptoPairTrading.DATA_PAIR), self.strategy_instance_config.get(CryptoPairTrading.CONFIG_KEY_BASE_CURRENCY)
+        ).parse_pair_info()
+        symbols = list(self._select_coins(pair_info, self.strategy_data.get(CryptoPairTrading.DATA_SIDE)))
+
+        prices = MarketDataManager.get_last_prices(symbols)
+        if prices is None:
+            logging.info('No fresh cached quotes for %s. Fetching tickers.', symbols)
+            # Before fetch, so feed fills in even if fetch fails
+            MarketDataManager.subscribe(symbols)
+            prices = await self._fetch_tickers_prices(symbols)
+
+        return prices
+
+    async def _fetch_coins_amounts(self, side: str, available_capital: float) -> None:
+        self._longed_coin, self._shorted_coin = self._select_coins(self._pair_info, side)
+
+        prices = self.context.get(CryptoPairTrading.CONTEXT_PRICES)
+        if prices is None:
+            prices = await self._get_entry_prices()
 
+        longed_coin_price = prices[self._longed_coin]
+        shorted_coin_price = prices[self._shorted_coin]
+
+        logging.info('Longed coin %s price: %s', self._longed_coin, longed_coin_price)
+        logging.info('Shorted coin %s price: %s', self._shorted_coin, shorted_coin_price)
+
+        await self._calculate_coins_amounts(longed_coin_price, shorted_coin_price, available_capital)
+
+    async def _fetch_tickers_prices(self, symbols: list[str]) -> dict[str, float]:
         fta = fetch_tickers_algorithm.FetchTickersAlgorithm(
             self.capital_flow,
             self.spent_fees,
@@ -366,20 +697,14 @@ class CryptoPairTrading(Strategy):
                 fetch_tickers_algorithm.Command(
                     strategy=self.__class__.__name__,
                     description='Fetching pair trading coins price to calculate amount & cost to enter with',
-                    symbols=[self._longed_coin, self._shorted_coin],
+                    symbols=symbols,
                 )
             ]
         )
         await fta.execute()
 
         results = fta.command_results[0]
-        longed_coin_price = results[self._longed_coin]['last']
-        shorted_coin_price = results[self._shorted_coin]['last']
-
-        logging.info('Longed coin %s price: %s', self._longed_coin, longed_coin_price)
-        logging.info('Shorted coin %s price: %s', self._shorted_coin, shorted_coin_price)
-
-        await self._calculate_coins_amounts(longed_coin_price, shorted_coin_price, available_capital)
+        return {symbol: results[symbol]['last'] for symbol in symbols}
 
     async def _calculate_coins_amounts(self, longed_coin_price: float, shorted_coin_price: float, available_capital: float) -> None:
         price = self.strategy_data.get(CryptoPairTrading.DATA_PRICE)
@@ -423,7 +748,9 @@ class CryptoPairTrading(Strategy):
             )
 
         # for entry & exit
-        expected_fees = 2 * consts.BINANCE_TRADE_FEE * total_capital
+        expected_fees = 2 * (
+            BinanceMetadata.get_taker_fee(self._longed_coin) * long_capital + BinanceMetadata.get_taker_fee(self._shorted_coin) * short_capital
+        )
         if expected_fees > (CryptoPairTrading.IGNORE_TRADE_FEE_PERCENT_OF_STOPLOSS / 100) * expected_max_loss:
             percent = expected_fees / expected_max_loss * 100
             pair_raw = self.strategy_data.get(CryptoPairTrading.DATA_PAIR)
@@ -436,33 +763,92 @@ class CryptoPairTrading(Strategy):
             raise SilentCryptoPairTradingException()
 
         # floored so math operations won't accidently result larger number leading to an error
-        self._transfer_amount = floor_coin_amount(
+        self._transfer_amount = BinanceMetadata.floor_currency_amount(
             self.strategy_instance_config.get(CryptoPairTrading.CONFIG_KEY_BASE_CURRENCY),
             long_capital
         )
         reduction = self._transfer_amount / long_capital
 
-        # ccxt checks number of decimals in each coin and sends request correctly. But Binance may not return this info sometimes.
-        # To reduce error rate leave only 8 decimals, as BTC the largest one and uses 8 so it will be fine with other cryptos too.
-        # But actually, seems like Binance allows to borrow even the cheapest coins using 8 digits. So it should be good for all coins.
-        self._longed_capital = floor_amount(self._transfer_amount * reduction, 8)
-        self._shorted_amount = floor_amount(short_amount * reduction, 8)
+        # Floor to the exchange step sizes from metadata index, so borrow & orders are accepted on first request.
+        self._longed_capital = BinanceMetadata.floor_market_cost(self._longed_coin, self._transfer_amount * reduction)
+        self._shorted_amount = BinanceMetadata.floor_market_amount(self._shorted_coin, short_amount * reduction)
+
+        await self._validate_min_notional(self._longed_coin, self._longed_capital)
+        await self._validate_min_notional(self._shorted_coin, self._shorted_amount * shorted_coin_price)
+
+    async def _validate_min_notional(self, symbol: str, cost: float) -> None:
+        market = BinanceMetadata.get_market(symbol)
+        if market is None or market.min_notional is None or cost >= market.min_notional:
+            return
+
+        await log_and_send(
+            logging.warning, ChannelsManager.get_communication_channel(),
+            f'Order cost {cost} of {symbol} is below exchange min notional {market.min_notional}. Skipping entry.'
+        )
+        raise SilentCryptoPairTradingException()
 
     async def _exception_revert_internal(self) -> bool:
         data_action = self.strategy_data.get(CryptoPairTrading.DATA_ACTION)
-        if data_action != CryptoPairTrading.ACTION_ENTRY:
+        if data_action == CryptoPairTrading.ACTION_EXIT and self._existing_position:
+            await self._revert_failed_exit()
+            return True
+
+        if data_action not in [CryptoPairTrading.ACTION_ENTRY, CryptoPairTrading.ACTION_ARM, CryptoPairTrading.ACTION_FIRE]:
             return False
 
+        # Compensate legs with amounts that were actually filled
         for action_params in reversed(self._actions_track):
             param_name = action_params[CryptoPairTrading.ACTION_PARAM_NAME]
+            amount = action_params.get(CryptoPairTrading.ACTION_PARAM_AMOUNT)
 
-            if param_name == CryptoPairTrading.ACTION_NAME_BOUGHT:
-                await self._exit_sell_longed_coins()
+            if param_name == CryptoPairTrading.ACTION_NAME_BOUGHT and amount:
+                await self._exit_sell_longed_coins(amount)
 
-            if param_name == CryptoPairTrading.ACTION_NAME_SOLD:
-                await self._exit_buy_shorted_coins()
+            if param_name == CryptoPairTrading.ACTION_NAME_SOLD and amount:
+                await self._exit_buy_shorted_coins(amount)
 
             if param_name == CryptoPairTrading.ACTION_NAME_BORROWED:
                 await self._repay_borrowed_funds()
 
         return True
+
+    async def _revert_failed_exit(self) -> None:
+        """
+        Exit can't be undone, so legs that went through are kept. Bought back coins are repaid, and position is left open
+        with what remains, so next exit only closes the rest.
+        """
+        def tracked_amount(name: str) -> float:
+            return sum(
+                action_params.get(CryptoPairTrading.ACTION_PARAM_AMOUNT) or 0
+                for action_params in self._actions_track if action_params[CryptoPairTrading.ACTION_PARAM_NAME] == name
+            )
+
+        sold = tracked_amount(CryptoPairTrading.ACTION_NAME_EXIT_SOLD)
+        bought = tracked_amount(CryptoPairTrading.ACTION_NAME_EXIT_BOUGHT)
+        is_repaid = tracked_amount(CryptoPairTrading.ACTION_NAME_REPAID) > 0
+
+        longed_amount = max(0, self._existing_position.longed_amount - sold)
+        shorted_amount = max(0, self._existing_position.shorted_amount - bought)
+        logging.warning(
+            'Exit failed. Sold %s of %s, bought back %s of %s. Remaining long %s, short %s.',
+            sold, self._longed_coin, bought, self._shorted_coin, longed_amount, shorted_amount
+        )
+
+        # Recorded before repay, so if repay fails too, legs are not sent again by next exit
+        await update_dataclass(
+            consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING,
+            consts.COLLECTION_POSITION_INFO,
+            PositionInfo(_id=self._existing_position._id),
+            PositionInfo(longed_amount=longed_amount, shorted_amount=shorted_amount)
+        )
+
+        if bought and not is_repaid:
+            await self._repay_borrowed_funds(bought)
+
+        if not longed_amount and not shorted_amount:
+            await update_dataclass(
+                consts.DB_NAME_STRATEGY_CRYPTO_PAIR_TRADING,
+                consts.COLLECTION_POSITION_INFO,
+                PositionInfo(_id=self._existing_position._id),
+                PositionInfo(is_open=False)
+            )
@@ -27,3 +27,4 @@ class PositionInfo(BaseDbRecord):
 
     transfer_amount: Optional[float] = None
     base_currency: Optional[str] = None
+    broker: Optional[str] = None
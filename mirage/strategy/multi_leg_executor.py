@@ -0,0 +1,74 @@
+import asyncio
+from dataclasses import dataclass
+import logging
+import time
+from typing import Awaitable, Callable
+
+
+class PartiallyFilledLegException(Exception):
+    """
+    Raised by leg that was filled only partly. Filled part is still recorded in compensation log, so it gets unwound.
+    """
+
+    def __init__(self, message: str, action_params: dict[str, any]):
+        super().__init__(message)
+        self.action_params = action_params
+
+
+@dataclass
+class Leg:
+    name: str
+    # Places the leg and returns action params to record in compensation log. Should include what was actually filled.
+    run: Callable[[], Awaitable[dict[str, any]]]
+
+
+class MultiLegExecutor:
+    """
+    Executes strategy legs and records each completed leg in the strategy actions track, which serves as compensation log.
+    Independent legs can be sent concurrently to reduce time legs are exposed to market one without the other.
+    When a leg fails, other legs are still awaited and recorded, so exception revert unwinds everything that was filled.
+    """
+
+    def __init__(self, actions_track: list[dict[str, any]]):
+        self._actions_track = actions_track
+
+    async def run_sequential(self, legs: list[Leg]) -> None:
+        for leg in legs:
+            try:
+                self._actions_track.append(await leg.run())
+
+            except PartiallyFilledLegException as exc:
+                self._actions_track.append(exc.action_params)
+                raise
+
+    async def run_concurrent(self, legs: list[Leg]) -> None:
+        start_time = time.monotonic()
+        finish_times = {}
+
+        async def run_leg(leg: Leg) -> dict[str, any]:
+            action_params = await leg.run()
+            finish_times[leg.name] = time.monotonic()
+            return action_params
+
+        results = await asyncio.gather(*[run_leg(leg) for leg in legs], return_exceptions=True)
+
+        first_exception = None
+        for leg, result in zip(legs, results):
+            if isinstance(result, PartiallyFilledLegException):
+                self._actions_track.append(result.action_params)
+
+            if isinstance(result, BaseException):
+                logging.error('Leg %s failed', leg.name, exc_info=result)
+                first_exception = first_exception or result
+                continue
+
+            self._actions_track.append(result)
+
+        if finish_times:
+            logging.info(
+                'Executed legs %s concurrently. Took %.3fs, skew between legs %.3fs',
+                [leg.name for leg in legs], max(finish_times.values()) - start_time, max(finish_times.values()) - min(finish_times.values())
+            )
+
+        if first_exception is not None:
+            raise first_exception
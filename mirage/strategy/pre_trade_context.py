@@ -0,0 +1,62 @@
+import asyncio
+from dataclasses import dataclass
+import logging
+from typing import Awaitable, Callable
+
+from mirage.tracing.request_tracer import RequestTracer
+
+
+class PreTradeContextException(Exception):
+    pass
+
+
+@dataclass
+class ContextSource:
+    name: str
+    fetch: Callable[[], Awaitable[any]]
+    timeout: float
+    # Optional source that fails or times out gives None instead of failing the request
+    required: bool = True
+
+
+class PreTradeContext:
+    """
+    Data strategy and strategy manager need before deciding on trade, like balances, positions and prices.
+    They declare sources, which are fetched concurrently, each with own timeout, so waiting is for the slowest one only.
+    """
+
+    def __init__(self, values: dict[str, any]):
+        self._values = values
+
+    def get(self, name: str) -> any:
+        if name not in self._values:
+            raise PreTradeContextException(f'Context source {name} was not declared')
+
+        return self._values[name]
+
+    @staticmethod
+    async def gather(sources: list[ContextSource]) -> 'PreTradeContext':
+        results = await asyncio.gather(*[PreTradeContext._fetch(source) for source in sources], return_exceptions=True)
+
+        values = {}
+        for source, result in zip(sources, results):
+            if not isinstance(result, Exception):
+                values[source.name] = result
+                continue
+
+            if source.required:
+                raise PreTradeContextException(f'Failed fetching context source {source.name}') from result
+
+            logging.warning('Optional context source %s failed: %s', source.name, repr(result))
+            values[source.name] = None
+
+        return PreTradeContext(values)
+
+    @staticmethod
+    async def _fetch(source: ContextSource) -> any:
+        with RequestTracer.span(f'context_{source.name}'):
+            try:
+                return await asyncio.wait_for(source.fetch(), source.timeout)
+
+            except asyncio.TimeoutError as exc:
+                raise PreTradeContextException(f'Context source {source.name} timed out after {source.timeout} seconds') from exc
@@ -5,6 +5,7 @@ import traceback
 from mirage.channels.channels_manager import ChannelsManager
 from mirage.config.config import Config
 from mirage.strategy.pre_execution_status import PreExecutionStatus
+from mirage.strategy.pre_trade_context import ContextSource, PreTradeContext
 from mirage.strategy.strategy_execution_status import StrategyExecutionStatus
 from mirage.utils.multi_logging import log_and_send
 from mirage.utils.variable_reference import VariableReference
@@ -42,8 +43,32 @@ class Strategy:
         self.capital_flow: VariableReference = None
         self.spent_fees: VariableReference = None
 
+        # Set by strategy manager before should_execute_strategy
+        self.context: PreTradeContext = None
+
         self._actions_track = []
 
+    @staticmethod
+    async def get_open_position_exits() -> list[tuple[str, str, dict[str, any]]]:
+        """
+        Strategy instance, broker and strategy data of exit signal for each open position. Used to close all positions.
+        """
+        return []
+
+    @staticmethod
+    async def get_expired_releases() -> list[tuple[str, str, dict[str, any]]]:
+        """
+        Strategy instance, broker and strategy data of request releasing what was staged and expired, like armed entry never fired.
+        Processed by expiry job.
+        """
+        return []
+
+    def get_context_sources(self) -> list[ContextSource]:
+        """
+        Data should_execute_strategy needs. Fetched concurrently with strategy manager sources, results available in context.
+        """
+        return []
+
     @abstractmethod
     async def should_execute_strategy(self, available_capital: float) -> tuple[bool, PreExecutionStatus, dict[str, any]]:
         """
@@ -63,6 +88,12 @@ class Strategy:
         """
         raise NotImplementedError()
 
+    def is_capital_staged(self) -> bool:
+        """
+        Entry using capital transferred to strategy by earlier request. Strategy manager doesn't check or reserve funds for it.
+        """
+        return False
+
     async def exception_revert(self) -> None:
         logging.warning('Doing exception revert for strategy %s, instance %s', self.strategy_name, self.strategy_instance)
 
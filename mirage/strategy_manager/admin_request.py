@@ -0,0 +1,53 @@
+from typing import Optional
+
+import consts
+from mirage.config.config_manager import ConfigManager
+from mirage.database.mongo.write_behind_writer import WriteBehindWriter
+from mirage.strategy_manager import enabled_strategy_managers
+from mirage.tasks.task_manager import TaskPriority
+from mirage.tracing.request_tracer import RequestTracer
+from mirage.utils.mirage_dict import MirageDict
+
+
+CONFIG_KEY_STRATEGY_MANAGER_NAME = 'strategy_manager.name'
+
+
+async def process_admin_request(
+        source: str, strategy_name: str, strategy_instance: str, strategy_data: dict[str, any], broker: Optional[str] = None
+) -> bool:
+    """
+    Processes request Mirage issues itself, like from telegram command or job, the way signal is processed.
+    Admin priority, not reprocessed. Recorded as request data and traced. Raises what processing raised.
+    Runs with given broker, like the one of record it acts on, or the configured one.
+    Returns true if strategy was executed.
+    """
+    RequestTracer.start_trace(source)
+    try:
+        request_data_id = WriteBehindWriter.enqueue(
+            consts.DB_NAME_HISTORY,
+            consts.COLLECTION_REQUEST_DATA,
+            {
+                'source': source,
+                'content': {'strategy_name': strategy_name, 'strategy_instance': strategy_instance, 'data': strategy_data},
+                'broker': broker
+            }
+        )
+        RequestTracer.set_request_data_id(request_data_id)
+
+        strategy_manager_name = ConfigManager.fetch_strategy_instance_config(strategy_name, strategy_instance).get(
+            CONFIG_KEY_STRATEGY_MANAGER_NAME
+        )
+        strategy_manager = enabled_strategy_managers[strategy_manager_name](
+            strategy_manager_name,
+            request_data_id,
+            MirageDict(strategy_data),
+            strategy_name,
+            strategy_instance,
+            allow_reprocess=False,
+            priority=TaskPriority.ADMIN,
+            broker=broker
+        )
+        return await strategy_manager.process_strategy()
+
+    finally:
+        await RequestTracer.finish_trace()
@@ -1,9 +1,13 @@
 import logging
-from ccxt.base.types import Balances
+import time
 
 import consts
 from mirage.algorithm.fetch_balance import fetch_balance_algorithm
 from mirage.algorithm.transfer.transfer_algorithm import Command, TransferAlgorithm
+from mirage.brokers.binance.account_mirror import BinanceAccountMirror
+from mirage.brokers.binance.binance_sessions import BinanceSessions
+from mirage.config.config import Config
+from mirage.config.config_manager import ConfigManager
 from mirage.strategy_manager.strategy_manager import StrategyManager, StrategyManagerException
 
 
@@ -30,7 +34,18 @@ class BinanceStrategyManager(StrategyManager):
     CONFIG_KEY_WALLET = 'strategy_manager.wallet'
     CONFIG_KEY_LOCKING_COIN = 'locking_coin'
     CONFIG_KEY_CROSS_MARGIN_LOCKED = 'cross_margin_locked'
+    # Funds paper broker runs left in simulated margin wallet, kept apart from real ones
+    CONFIG_KEY_PAPER_CROSS_MARGIN_LOCKED = 'paper_cross_margin_locked'
     CONFIG_KEY_MIN_TRANSFER_AMOUNT = 'min_transfer_amount'
+    CONFIG_KEY_ACCOUNT_MIRROR_MAX_AGE = 'brokers.binance.account_mirror_max_age_seconds'
+    DEFAULT_ACCOUNT_MIRROR_MAX_AGE = 60
+
+    def _get_shared_capital_keys(self, strategy_instance_config: Config) -> list[str]:
+        return [f'wallet:{self._strategy_manager_name}:{strategy_instance_config.get(BinanceStrategyManager.CONFIG_KEY_WALLET)}']
+
+    def _get_capital_pool(self) -> str:
+        base_currency = self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_BASE_CURRENCY)
+        return f'{BinanceSessions.selected_broker.get()}:{BinanceStrategyManager.FUNDING_WALLET}:{base_currency}'
 
     async def _transfer_capital_to_strategy(self, amount: float) -> None:
         wallet = self._strategy.strategy_instance_config.get(BinanceStrategyManager.CONFIG_KEY_WALLET)
@@ -60,7 +75,8 @@ class BinanceStrategyManager(StrategyManager):
         base_currency = self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_BASE_CURRENCY)
 
         max_allowed_transfer_amount = await self._get_max_allowed_transfer_out_amount()
-        cross_margin_locked = self._strategy_manager_config.get(BinanceStrategyManager.CONFIG_KEY_CROSS_MARGIN_LOCKED)
+        cross_margin_locked_key = self._get_cross_margin_locked_key()
+        cross_margin_locked = self._strategy_manager_config.get(cross_margin_locked_key, 0)
         min_transfer_amount = self._strategy_manager_config.get(BinanceStrategyManager.CONFIG_KEY_MIN_TRANSFER_AMOUNT)
 
         wanted_to_transfer = self._capital_flow.variable + cross_margin_locked
@@ -76,10 +92,7 @@ class BinanceStrategyManager(StrategyManager):
                 'Transfer amount %s less than min transfer amount %s. Funds will remain in cross margin wallet till next attempt.',
                 amount_to_transfer, min_transfer_amount
             )
-            self._strategy_manager_config.set(
-                BinanceStrategyManager.CONFIG_KEY_CROSS_MARGIN_LOCKED,
-                self._capital_flow.variable + cross_margin_locked
-            )
+            self._strategy_manager_config.set(cross_margin_locked_key, self._capital_flow.variable + cross_margin_locked)
             return
 
         await TransferAlgorithm(
@@ -98,10 +111,14 @@ class BinanceStrategyManager(StrategyManager):
             ]
         ).execute()
 
-        self._strategy_manager_config.set(
-            BinanceStrategyManager.CONFIG_KEY_CROSS_MARGIN_LOCKED,
-            wanted_to_transfer - amount_to_transfer
-        )
+        self._strategy_manager_config.set(cross_margin_locked_key, wanted_to_transfer - amount_to_transfer)
+
+    @staticmethod
+    def _get_cross_margin_locked_key() -> str:
+        if BinanceSessions.is_paper_selected():
+            return BinanceStrategyManager.CONFIG_KEY_PAPER_CROSS_MARGIN_LOCKED
+
+        return BinanceStrategyManager.CONFIG_KEY_CROSS_MARGIN_LOCKED
 
     async def _get_max_allowed_transfer_out_amount(self) -> float:
         max_transfer_amount_usdt = await self._calculate_max_allowed_transfer_out_amount_usdt()
@@ -112,6 +129,22 @@ class BinanceStrategyManager(StrategyManager):
         raise BinanceStrategyManagerException(f'Currently supports only locking coin USDT. Requested coin {locking_coin}.')
 
     async def _calculate_max_allowed_transfer_out_amount_usdt(self) -> float:
+        info = BinanceAccountMirror.get_margin_info(BinanceStrategyManager.MARGIN_WALLET, self._get_account_mirror_max_age())
+        if info is None:
+            info = await self._fetch_margin_info()
+        else:
+            logging.info('Using margin info from account mirror')
+
+        total_collateral_usdt = float(info['totalCollateralValueInUSDT'])
+        total_asset_btc = float(info['totalAssetOfBtc'])
+        total_liability_btc = float(info['totalLiabilityOfBtc'])
+
+        btc_price_usdt = total_collateral_usdt / total_asset_btc
+        liability_usdt = btc_price_usdt * total_liability_btc
+        max_transfer_amount_usdt = total_collateral_usdt - liability_usdt * BinanceStrategyManager.TRANSFER_OUT_MARGIN_REQUIREMENT
+        return max_transfer_amount_usdt
+
+    async def _fetch_margin_info(self) -> dict[str, any]:
         fba = fetch_balance_algorithm.FetchBalanceAlgorithm(
             self._capital_flow,
             self._spent_fees,
@@ -127,17 +160,18 @@ class BinanceStrategyManager(StrategyManager):
         await fba.execute()
 
         results = fba.command_results[0]
-        info = results['info']
-        total_collateral_usdt = float(info['totalCollateralValueInUSDT'])
-        total_asset_btc = float(info['totalAssetOfBtc'])
-        total_liability_btc = float(info['totalLiabilityOfBtc'])
+        return results['info']
 
-        btc_price_usdt = total_collateral_usdt / total_asset_btc
-        liability_usdt = btc_price_usdt * total_liability_btc
-        max_transfer_amount_usdt = total_collateral_usdt - liability_usdt * BinanceStrategyManager.TRANSFER_OUT_MARGIN_REQUIREMENT
-        return max_transfer_amount_usdt
+    async def _fetch_balance(self) -> tuple[float, float]:
+        base_currency = self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_BASE_CURRENCY)
+
+        free = BinanceAccountMirror.get_free(BinanceStrategyManager.FUNDING_WALLET, base_currency, self._get_account_mirror_max_age())
+        if free is not None:
+            logging.info('Using funding wallet balance from account mirror')
+            return free, BinanceAccountMirror.get_balance_time(BinanceStrategyManager.FUNDING_WALLET)
+
+        started_at = time.time()
 
-    async def _fetch_balance(self) -> Balances:
         fba = fetch_balance_algorithm.FetchBalanceAlgorithm(
             self._capital_flow,
             self._spent_fees,
@@ -153,9 +187,12 @@ class BinanceStrategyManager(StrategyManager):
         await fba.execute()
 
         results = fba.command_results[0]
-        base_currency = self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_BASE_CURRENCY)
-
         if base_currency not in results:
-            return 0
+            return 0, started_at
+
+        return results[base_currency]['free'], started_at
 
-        return results[base_currency]['free']
+    def _get_account_mirror_max_age(self) -> float:
+        return ConfigManager.config.get(
+            BinanceStrategyManager.CONFIG_KEY_ACCOUNT_MIRROR_MAX_AGE, BinanceStrategyManager.DEFAULT_ACCOUNT_MIRROR_MAX_AGE
+        )
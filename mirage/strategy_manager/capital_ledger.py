@@ -0,0 +1,102 @@
+from dataclasses import dataclass
+import itertools
+import logging
+import time
+from typing import Optional
+
+import consts
+from mirage.database.mongo.write_behind_writer import WriteBehindWriter
+
+
+@dataclass
+class CapitalReservation:
+    reservation_id: int
+    pool: str
+    amount: float
+    owner: str
+    # Set on commit. Balances with earlier balance time may not include the transfer yet.
+    committed_at: Optional[float] = None
+
+
+class CapitalLedger:
+    """
+    Reservations on shared capital pools, like funding wallet, so concurrent entries don't over-allocate it.
+    Entry reserves from live balance minus what others reserved, commits amount actually transferred and releases the rest.
+    Committed amounts keep being deducted from balances read before the commit, until those can't be in use anymore.
+    Operations don't await, so each is atomic in the event loop. Every operation is journaled.
+    Reservations live in memory only, as transfers they guard don't survive restart either.
+    """
+
+    # Longer than any balance read can take
+    COMMIT_SYNC_SECONDS = 120
+
+    ACTION_RESERVE = 'reserve'
+    ACTION_COMMIT = 'commit'
+    ACTION_RELEASE = 'release'
+
+    reservations: dict[int, CapitalReservation] = {}
+    _reservation_ids = itertools.count(1)
+
+    @staticmethod
+    def reserve(pool: str, balance: float, balance_time: float, wanted: float, owner: str) -> CapitalReservation:
+        """
+        Reserves up to wanted. Balance time is till when our transfers are known to be in balance, like when its read started.
+        """
+        CapitalLedger._prune()
+        reserved = sum(
+            reservation.amount for reservation in CapitalLedger.reservations.values()
+            if reservation.pool == pool and (reservation.committed_at is None or reservation.committed_at > balance_time)
+        )
+
+        reservation = CapitalReservation(next(CapitalLedger._reservation_ids), pool, max(0, min(wanted, balance - reserved)), owner)
+        CapitalLedger.reservations[reservation.reservation_id] = reservation
+        logging.info('Reserved %s of %s from pool %s. Others reserved %s.', reservation.amount, balance, pool, reserved)
+        CapitalLedger._journal(CapitalLedger.ACTION_RESERVE, reservation, reservation.amount)
+        return reservation
+
+    @staticmethod
+    def commit(reservation: CapitalReservation, amount: float) -> None:
+        """
+        Amount left the pool. Rest of reservation is released.
+        """
+        if reservation.reservation_id not in CapitalLedger.reservations or reservation.committed_at is not None:
+            return
+
+        if amount <= 0:
+            CapitalLedger.release(reservation)
+            return
+
+        CapitalLedger._journal(CapitalLedger.ACTION_RELEASE, reservation, max(0, reservation.amount - amount))
+        reservation.amount = amount
+        reservation.committed_at = time.time()
+        CapitalLedger._journal(CapitalLedger.ACTION_COMMIT, reservation, amount)
+
+    @staticmethod
+    def release(reservation: CapitalReservation) -> None:
+        """
+        No-op for committed or already released reservation, so can always be called when request finishes.
+        """
+        if reservation.reservation_id not in CapitalLedger.reservations or reservation.committed_at is not None:
+            return
+
+        del CapitalLedger.reservations[reservation.reservation_id]
+        CapitalLedger._journal(CapitalLedger.ACTION_RELEASE, reservation, reservation.amount)
+
+    @staticmethod
+    def _prune() -> None:
+        expired_before = time.time() - CapitalLedger.COMMIT_SYNC_SECONDS
+        for reservation_id in [
+            reservation_id for reservation_id, reservation in CapitalLedger.reservations.items()
+            if reservation.committed_at is not None and reservation.committed_at < expired_before
+        ]:
+            del CapitalLedger.reservations[reservation_id]
+
+    @staticmethod
+    def _journal(action: str, reservation: CapitalReservation, amount: float) -> None:
+        WriteBehindWriter.enqueue(consts.DB_NAME_HISTORY, consts.COLLECTION_CAPITAL_JOURNAL, {
+            'action': action,
+            'reservation_id': reservation.reservation_id,
+            'pool': reservation.pool,
+            'amount': amount,
+            'owner': reservation.owner
+        })
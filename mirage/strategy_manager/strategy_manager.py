@@ -1,29 +1,50 @@
 from abc import ABCMeta, abstractmethod
 import asyncio
+import copy
 import logging
+import time
+from typing import Optional
+import ccxt.async_support as ccxt
 
 import consts
+from mirage.brokers.binance.binance_metadata import BinanceMetadata
+from mirage.brokers.binance.circuit_breaker import CircuitBreaker, CircuitBreakerException
+from mirage.brokers.binance.binance_sessions import BinanceSessions
 from mirage.channels.channels_manager import ChannelsManager
+from mirage.config.config import Config
 from mirage.config.config_manager import ConfigManager
 from mirage.config.suspend_state import SuspendState
 from mirage.performance.mirage_performance import InputTradePerformance, MiragePerformance
 from mirage.strategy.pre_execution_status import PARAM_REPROCESS_TIME, PARAM_TRANSFER_AMOUNT, PreExecutionStatus
+from mirage.strategy.pre_trade_context import ContextSource, PreTradeContext
 from mirage.strategy import enabled_strategies
-from mirage.strategy.strategy import StrategySilentException
+from mirage.strategy.strategy import Strategy, StrategySilentException
 from mirage.strategy.strategy_execution_status import StrategyExecutionStatus
+from mirage.strategy_manager.capital_ledger import CapitalLedger, CapitalReservation
 from mirage.strategy_manager.exceptions import NotEnoughFundsException, StrategyManagerException
-from mirage.tasks.task_manager import TaskManager
+from mirage.tasks.task_manager import TaskManager, TaskPriority
+from mirage.tracing.request_tracer import RequestTracer
 from mirage.utils.multi_logging import log_and_send, log_send_raise
-from mirage.utils.symbol_utils import floor_coin_amount
 from mirage.utils.variable_reference import VariableReference
-from tools.key_generator import generate_key
 
 
 class StrategyManager:
+    """
+    Requests of same strategy instance are processed one at a time, exits before entries. Others run in parallel.
+    Entries reserve capital they may transfer in capital ledger, so parallel entries don't over-allocate it.
+    Transfers out of instances sharing capital change shared state, so only they take turns.
+    Entries whose signal gets older than max signal age while waiting are dropped,
+    as they would trade at stale price. Exits are never dropped.
+    While Binance endpoints are unavailable entries are rejected, and exits and reverts wait for them in circuit breaker retry lane.
+    Failing because of unavailable exchange does not disable strategy instance.
+    """
+
     __metaclass__ = ABCMeta
 
-    TASK_GROUP_TRADE_REQUESTS = 'trade_requests'
     MAX_REPROCESS_REQUESTS = 1
+    CONTEXT_TIMEOUT = 5
+
+    CONTEXT_FUNDING_BALANCE = 'funding_balance'
 
     description = ''
     # How many can be used by strategy in total
@@ -40,6 +61,13 @@ class StrategyManager:
     CONFIG_KEY_MIN_ENTRY_CAPITAL = 'strategy_manager.min_entry_capital'
     CONFIG_KEY_BASE_CURRENCY = 'strategy_manager.base_currency'
     CONFIG_KEY_IS_ACTIVE = 'strategy_manager.is_active'
+    # Max seconds from signal time till entry gets its turn. 0 to disable.
+    CONFIG_KEY_MAX_ENTRY_SIGNAL_AGE = 'strategy_manager.max_entry_signal_age_seconds'
+    # Strategy manager config. Paper broker runs the whole request against simulated exchange.
+    CONFIG_KEY_BROKER = 'broker'
+    # Paper broker runs keep capital keys under this section, so they don't change real capital of instance.
+    # Allocated capital and capital pool start from real ones.
+    CONFIG_KEY_PAPER_CAPITAL = 'strategy_manager.paper'
 
     def __init__(
             self,
@@ -48,15 +76,31 @@ class StrategyManager:
             strategy_data: dict[str, any],
             strategy_name: str,
             strategy_instance: str,
+            signal_time: Optional[float] = None,
+            allow_reprocess: bool = True,
+            priority: Optional[TaskPriority] = None,
+            broker: Optional[str] = None
     ):
+        """
+        Sequenced signals arrive in order, so are not reprocessed.
+        Priority is given for admin requests, which run even for deactivated instances or when suspended.
+        Otherwise it follows entry or exit.
+        Broker is given for admin requests acting on records of specific broker. Otherwise it's taken from strategy manager config.
+        """
         self._strategy_manager_name = strategy_manager_name
         self._request_data_id = request_data_id
         self._strategy_data = strategy_data
         self._strategy_name = strategy_name
         self._strategy_instance = strategy_instance
+        self._signal_time = signal_time
+        self._allow_reprocess = allow_reprocess
+        self._priority = priority
+        self._broker = broker
 
         self._strategy = None
         self._strategy_manager_config = None
+        self._loaded_strategy_manager_config = None
+        self._capital_reservation: Optional[CapitalReservation] = None
 
         self._allocated_capital = None
         self._strategy_capital = None
@@ -65,6 +109,7 @@ class StrategyManager:
 
         self._reprocess_time = None
         self._reprocess_requests_count = 0
+        self._is_executed = False
 
         self._mirage_performance = MiragePerformance()
 
@@ -77,34 +122,59 @@ class StrategyManager:
         raise NotImplementedError()
 
     @abstractmethod
-    async def _fetch_balance(self) -> None:
+    async def _fetch_balance(self) -> tuple[float, float]:
+        """
+        Free balance of capital pool, and time it was taken. For rest read it's when the read started.
+        """
         raise NotImplementedError()
 
-    async def process_strategy(self) -> None:
-        try:
-            await TaskManager.wait_for_turn(StrategyManager.TASK_GROUP_TRADE_REQUESTS, generate_key(20))
+    @abstractmethod
+    def _get_shared_capital_keys(self, strategy_instance_config: Config) -> list[str]:
+        """
+        Task keys of capital that strategy instance trades with and shares with other instances. Held while transferring out.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def _get_capital_pool(self) -> str:
+        """
+        Capital ledger pool entries transfer from.
+        """
+        raise NotImplementedError()
+
+    async def process_strategy(self) -> bool:
+        """
+        Returns true if strategy was executed, and not ignored or skipped on the way.
+        """
+        strategy_instance_config = ConfigManager.fetch_strategy_instance_config(self._strategy_name, self._strategy_instance)
+        turn_keys = [TaskManager.strategy_instance_key(self._strategy_name, self._strategy_instance)]
 
-            self._strategy = enabled_strategies[self._strategy_name](
-                self._request_data_id,
-                self._strategy_data,
-                self._strategy_name,
-                self._strategy_instance,
+        if not await self._wait_for_turn(turn_keys, strategy_instance_config):
+            return False
+
+        try:
+            # Created after getting turn, so config includes changes of previous requests
+            self._strategy = self._create_strategy(
                 ConfigManager.fetch_strategy_instance_config(self._strategy_name, self._strategy_instance)
             )
 
             self._strategy_manager_config = ConfigManager.fetch_strategy_manager_config(self._strategy_manager_name)
+            self._loaded_strategy_manager_config = copy.deepcopy(self._strategy_manager_config.raw_dict)
+            BinanceSessions.selected_broker.set(
+                self._broker or self._strategy_manager_config.get(StrategyManager.CONFIG_KEY_BROKER, BinanceSessions.BROKER_BINANCE)
+            )
             self._init_capital_variables()
 
             is_entry = self._strategy.is_entry()
-            if self._is_suspent(is_entry):
-                return
-
-            await self._process_strategy_internal(is_entry)
+            CircuitBreaker.retry_lane.set(not is_entry)
+            if self._priority == TaskPriority.ADMIN or not self._is_suspent(is_entry):
+                await self._process_strategy_internal(is_entry)
 
         finally:
-            TaskManager.finish_turn(StrategyManager.TASK_GROUP_TRADE_REQUESTS)
+            TaskManager.finish_turn(turn_keys)
             self._strategy = None
             self._strategy_manager_config = None
+            self._loaded_strategy_manager_config = None
 
             if self._reprocess_time is not None:
                 if self._reprocess_requests_count < StrategyManager.MAX_REPROCESS_REQUESTS:
@@ -123,20 +193,78 @@ class StrategyManager:
                         + f' Strategy: {self._strategy_name}, Instance: {self._strategy_instance}.'
                     )
 
-    def _init_capital_variables(self) -> None:
-        self._allocated_capital = VariableReference(
-            self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_ALLOCATED_CAPITAL)
-        )
-        self._strategy_capital = VariableReference(
-            self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_STRATEGY_CAPITAL)
-        )
-        self._capital_flow = VariableReference(
-            self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_CAPITAL_FLOW)
+        return self._is_executed
+
+    def _create_strategy(self, strategy_instance_config: Config) -> Strategy:
+        return enabled_strategies[self._strategy_name](
+            self._request_data_id,
+            self._strategy_data,
+            self._strategy_name,
+            self._strategy_instance,
+            strategy_instance_config
         )
-        self._spent_fees = VariableReference(
-            self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_SPENT_FEES)
+
+    async def _wait_for_turn(self, turn_keys: list[str], strategy_instance_config: Config) -> bool:
+        """
+        Returns false if entry was dropped as stale.
+        """
+        is_entry = self._create_strategy(strategy_instance_config).is_entry()
+        priority = self._priority
+        if priority is None:
+            priority = TaskPriority.ENTRY if is_entry else TaskPriority.EXIT
+
+        max_signal_age = strategy_instance_config.get(StrategyManager.CONFIG_KEY_MAX_ENTRY_SIGNAL_AGE, 0)
+        timeout = None
+        if is_entry and max_signal_age and self._signal_time is not None:
+            timeout = self._signal_time + max_signal_age - time.time()
+            if timeout <= 0:
+                await self._report_stale_entry(max_signal_age)
+                return False
+
+        with RequestTracer.span('queue_wait', priority=priority.name):
+            try:
+                await asyncio.wait_for(TaskManager.wait_for_turn(turn_keys, str(self._request_data_id), priority), timeout)
+
+            except asyncio.TimeoutError:
+                await self._report_stale_entry(max_signal_age)
+                return False
+
+        return True
+
+    async def _report_stale_entry(self, max_signal_age: float) -> None:
+        await log_and_send(
+            logging.warning, ChannelsManager.get_communication_channel(),
+            f'Dropped stale entry of strategy {self._strategy_name}, instance {self._strategy_instance}. '
+            + f'Signal age {time.time() - self._signal_time:.1f} seconds, max {max_signal_age}.'
         )
 
+    def _init_capital_variables(self) -> None:
+        self._allocated_capital = VariableReference(self._get_capital_config(StrategyManager.CONFIG_KEY_ALLOCATED_CAPITAL))
+        self._strategy_capital = VariableReference(self._get_capital_config(StrategyManager.CONFIG_KEY_STRATEGY_CAPITAL))
+        self._capital_flow = VariableReference(self._get_capital_config(StrategyManager.CONFIG_KEY_CAPITAL_FLOW))
+        self._spent_fees = VariableReference(self._get_capital_config(StrategyManager.CONFIG_KEY_SPENT_FEES))
+
+    def _get_capital_config(self, key: str) -> float:
+        config = self._strategy.strategy_instance_config
+        if not BinanceSessions.is_paper_selected():
+            return config.get(key)
+
+        initial = config.get(key) if key in [StrategyManager.CONFIG_KEY_ALLOCATED_CAPITAL, StrategyManager.CONFIG_KEY_CAPITAL_POOL] else 0
+        return config.get(StrategyManager._get_paper_capital_key(key), initial)
+
+    def _set_capital_config(self, key: str, value: float) -> None:
+        config = self._strategy.strategy_instance_config
+        if not BinanceSessions.is_paper_selected():
+            config.set(key, value)
+            return
+
+        config.set(StrategyManager.CONFIG_KEY_PAPER_CAPITAL, config.get(StrategyManager.CONFIG_KEY_PAPER_CAPITAL, {}))
+        config.set(StrategyManager._get_paper_capital_key(key), value)
+
+    @staticmethod
+    def _get_paper_capital_key(key: str) -> str:
+        return f'{StrategyManager.CONFIG_KEY_PAPER_CAPITAL}.{key.rpartition(".")[2]}'
+
     async def _process_strategy_internal(self, is_entry: bool) -> None:
         execution_status = StrategyExecutionStatus.RETURN_FUNDS
         exception_cache = None
@@ -148,10 +276,12 @@ class StrategyManager:
             if not self._should_trade_strategy():
                 return
 
+            # Entry of staged capital, like fire of armed entry, already has its capital
+            needs_capital = is_entry and not self._strategy.is_capital_staged()
             available_capital = -1
             if is_entry:
                 min_entry_capital = self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_MIN_ENTRY_CAPITAL)
-                if self._allocated_capital.variable < min_entry_capital:
+                if needs_capital and self._allocated_capital.variable < min_entry_capital:
                     await log_and_send(
                         logging.warning, ChannelsManager.get_communication_channel(),
                         f'Not enough allocated funds to strategy {self._strategy_name}, instance {self._strategy_instance}'
@@ -159,7 +289,23 @@ class StrategyManager:
                     )
                     return
 
-                available_capital = await self._get_amount_can_transfer()
+                unavailable_groups = CircuitBreaker.get_unavailable_groups()
+                if unavailable_groups:
+                    await log_and_send(
+                        logging.warning, ChannelsManager.get_communication_channel(),
+                        f'Rejected entry of strategy {self._strategy_name}, instance {self._strategy_instance}'
+                        + f'. Binance endpoints unavailable: {", ".join(unavailable_groups)}.'
+                    )
+                    return
+
+            # Sources of strategy and manager are independent, so fetched together
+            with RequestTracer.span('gather_context'):
+                self._strategy.context = await PreTradeContext.gather(
+                    self._get_context_sources(needs_capital) + self._strategy.get_context_sources()
+                )
+
+            if needs_capital:
+                available_capital = self._reserve_entry_capital(*self._strategy.context.get(StrategyManager.CONTEXT_FUNDING_BALANCE))
                 if available_capital < min_entry_capital:
                     await log_and_send(
                         logging.warning, ChannelsManager.get_communication_channel(),
@@ -168,10 +314,14 @@ class StrategyManager:
                     )
                     return
 
-            should_trade, status, params = await self._strategy.should_execute_strategy(available_capital)
+            with RequestTracer.span('should_execute_strategy'):
+                should_trade, status, params = await self._strategy.should_execute_strategy(available_capital)
 
             if status == PreExecutionStatus.REPROCESS:
-                self._reprocess_time = params[PARAM_REPROCESS_TIME]
+                if self._allow_reprocess:
+                    self._reprocess_time = params[PARAM_REPROCESS_TIME]
+                else:
+                    logging.warning('Strategy asked to reprocess sequenced request. Ignoring request.')
                 return
 
             if not should_trade:
@@ -180,13 +330,13 @@ class StrategyManager:
             transfer_amount = self._allocated_capital.variable
             if is_entry and status == PreExecutionStatus.PARTIAL_ALLOCATION:
                 transfer_amount = params[PARAM_TRANSFER_AMOUNT]
-                if transfer_amount > available_capital:
+                if needs_capital and transfer_amount > available_capital:
                     await log_send_raise(
                         logging.error, ChannelsManager.get_communication_channel(), NotEnoughFundsException,
                         f'Strategy wants to transfer {transfer_amount} of base currency, when max given is {available_capital}'
                     )
 
-            if is_entry and transfer_amount < min_entry_capital:
+            if needs_capital and transfer_amount < min_entry_capital:
                 await log_and_send(
                     logging.warning, ChannelsManager.get_communication_channel(),
                     f'Strategy {self._strategy_name}, instance {self._strategy_instance}'
@@ -195,30 +345,50 @@ class StrategyManager:
                 )
                 return
 
-            await self._maybe_transfer_capital_to_strategy(transfer_amount)
+            with RequestTracer.span('transfer_capital_to_strategy'):
+                transferred = await self._maybe_transfer_capital_to_strategy(transfer_amount)
+
+            if self._capital_reservation is not None:
+                CapitalLedger.commit(self._capital_reservation, transferred)
 
             self._strategy.strategy_capital = self._strategy_capital
             self._strategy.capital_flow = self._capital_flow
             self._strategy.spent_fees = self._spent_fees
 
-            execution_status: StrategyExecutionStatus = await self._strategy.execute()
+            with RequestTracer.span('execute_strategy', strategy=self._strategy_name, instance=self._strategy_instance):
+                execution_status: StrategyExecutionStatus = await self._strategy.execute()
             logging.info('Executed strategy successfully')
 
             should_record_trade = True
+            self._is_executed = True
 
         except StrategySilentException:
             logging.error('Strategy execution silent exception occurred')
+            CircuitBreaker.retry_lane.set(True)
             await self._strategy.exception_revert()
 
         except Exception as exc:
-            logging.error('Exception occurred. Disabling strategy instance.')
-            self._strategy.strategy_instance_config.set(StrategyManager.CONFIG_KEY_IS_ACTIVE, False)
+            if StrategyManager._is_exchange_unavailable(exc):
+                logging.error('Exception occurred, Binance unavailable. Strategy instance stays active.')
+            else:
+                logging.error('Exception occurred. Disabling strategy instance.')
+                self._strategy.strategy_instance_config.set(StrategyManager.CONFIG_KEY_IS_ACTIVE, False)
+
+            CircuitBreaker.retry_lane.set(True)
             await self._strategy.exception_revert()
             exception_cache = exc
 
+        finally:
+            # Returning funds must not be rejected
+            CircuitBreaker.retry_lane.set(True)
+            if self._capital_reservation is not None:
+                CapitalLedger.release(self._capital_reservation)
+                self._capital_reservation = None
+
         try:
             if execution_status == StrategyExecutionStatus.RETURN_FUNDS:
-                await self._maybe_transfer_capital_from_strategy(should_record_trade)
+                with RequestTracer.span('transfer_capital_from_strategy'):
+                    await self._maybe_transfer_capital_from_strategy(should_record_trade)
 
         except Exception as exc:
             logging.critical('Failed transferring money out of strategy.')
@@ -228,34 +398,64 @@ class StrategyManager:
             raise exc
 
         finally:
-            self._update_strategy_config()
-            self._update_strategy_manager_config()
+            with RequestTracer.span('update_configs'):
+                self._update_strategy_config()
+                self._update_strategy_manager_config()
 
         if exception_cache:
             raise exception_cache
 
         logging.info('Strategy flow manager finished successfully')
 
-    async def _get_amount_can_transfer(self):
-        balance = await self._fetch_balance()
-        can_transfer = self._allocated_capital.variable + self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_CAPITAL_POOL)
-        if balance > can_transfer:
-            return can_transfer
+    @staticmethod
+    def _is_exchange_unavailable(exc: BaseException) -> bool:
+        # May come wrapped, like by failed context source. Network errors before circuit opens count too,
+        # ExchangeNotAvailable being one of them.
+        while exc is not None:
+            if isinstance(exc, (CircuitBreakerException, ccxt.NetworkError)):
+                return True
+            exc = exc.__cause__
+
+        return False
+
+    def _get_context_sources(self, needs_capital: bool) -> list[ContextSource]:
+        if not needs_capital:
+            return []
 
-        return balance
+        return [ContextSource(StrategyManager.CONTEXT_FUNDING_BALANCE, self._fetch_balance, StrategyManager.CONTEXT_TIMEOUT)]
+
+    def _reserve_entry_capital(self, balance: float, balance_time: float) -> float:
+        """
+        Balance time is till when transfers are known to be in balance, so ledger deducts only those that may not be in it.
+        """
+        can_transfer = self._allocated_capital.variable + self._get_capital_config(StrategyManager.CONFIG_KEY_CAPITAL_POOL)
+        self._capital_reservation = CapitalLedger.reserve(
+            self._get_capital_pool(), balance, balance_time, can_transfer, str(self._request_data_id)
+        )
+        return self._capital_reservation.amount
 
     def _update_strategy_config(self) -> None:
-        self._strategy.strategy_instance_config.set(StrategyManager.CONFIG_KEY_ALLOCATED_CAPITAL, self._allocated_capital.variable)
-        self._strategy.strategy_instance_config.set(StrategyManager.CONFIG_KEY_STRATEGY_CAPITAL, self._strategy_capital.variable)
-        self._strategy.strategy_instance_config.set(StrategyManager.CONFIG_KEY_CAPITAL_FLOW, self._capital_flow.variable)
-        self._strategy.strategy_instance_config.set(StrategyManager.CONFIG_KEY_SPENT_FEES, self._spent_fees.variable)
+        self._set_capital_config(StrategyManager.CONFIG_KEY_ALLOCATED_CAPITAL, self._allocated_capital.variable)
+        self._set_capital_config(StrategyManager.CONFIG_KEY_STRATEGY_CAPITAL, self._strategy_capital.variable)
+        self._set_capital_config(StrategyManager.CONFIG_KEY_CAPITAL_FLOW, self._capital_flow.variable)
+        self._set_capital_config(StrategyManager.CONFIG_KEY_SPENT_FEES, self._spent_fees.variable)
         ConfigManager.update_strategy_config(
             self._strategy.strategy_instance_config, self._strategy_name, self._strategy_instance, ''
         )
 
     def _update_strategy_manager_config(self) -> None:
+        """
+        Shared by instances running in parallel, so only keys this request changed are written over current file.
+        """
+        changed = {
+            key: value for key, value in self._strategy_manager_config.raw_dict.items()
+            if self._loaded_strategy_manager_config.get(key) != value
+        }
+        if not changed:
+            return
+
         ConfigManager.update_strategy_manager_config(
-            self._strategy_manager_config, self._strategy_manager_name, ''
+            Config(changed, f'Strategy manager "{self._strategy_manager_name}" config changes'), self._strategy_manager_name, ''
         )
 
     def _is_suspent(self, is_entry: bool) -> bool:
@@ -270,9 +470,12 @@ class StrategyManager:
 
         return False
 
-    async def _maybe_transfer_capital_to_strategy(self, transfer_amount: float) -> None:
+    async def _maybe_transfer_capital_to_strategy(self, transfer_amount: float) -> float:
+        """
+        Returns amount transferred.
+        """
         if self._strategy_capital.variable != 0 or transfer_amount <= 0:
-            return
+            return 0
 
         if self._allocated_capital.variable <= 0:
             raise StrategyManagerException('No allocated capital. Need to allocate more money.'
@@ -281,12 +484,13 @@ class StrategyManager:
         await self._transfer_capital_to_strategy(transfer_amount)
 
         # Tell strategy that transferred a bit less, to give room for miscalculations
-        floored = floor_coin_amount(
+        floored = BinanceMetadata.floor_currency_amount(
             self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_BASE_CURRENCY),
             transfer_amount
         )
         self._strategy_capital.variable = floored
         self._capital_flow.variable = floored
+        return transfer_amount
 
     async def _maybe_transfer_capital_from_strategy(self, should_record_trade: bool) -> None:
         if self._capital_flow.variable <= 0:
@@ -297,30 +501,52 @@ class StrategyManager:
             return
 
         # give strategies small room for errors in calculations
-        self._capital_flow.variable = floor_coin_amount(
+        self._capital_flow.variable = BinanceMetadata.floor_currency_amount(
             self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_BASE_CURRENCY),
             self._capital_flow.variable
         )
 
         if should_record_trade:
-            self._mirage_performance.record_trade_performance(InputTradePerformance(
-                request_data_id=self._request_data_id,
-                strategy_name=self._strategy_name,
-                strategy_instance=self._strategy_instance,
-                available_capital=self._strategy_capital.variable,
-                profit=self._capital_flow.variable - self._strategy_capital.variable,
-                fees=self._spent_fees.variable
-            ))
-
-        await self._transfer_capital_from_strategy()
+            with RequestTracer.span('record_trade_performance'):
+                await self._mirage_performance.record_trade_performance(InputTradePerformance(
+                    request_data_id=self._request_data_id,
+                    strategy_name=self._strategy_name,
+                    strategy_instance=self._strategy_instance,
+                    available_capital=self._strategy_capital.variable,
+                    profit=self._capital_flow.variable - self._strategy_capital.variable,
+                    fees=self._spent_fees.variable,
+                    broker=BinanceSessions.selected_broker.get()
+                ))
+
+        await self._transfer_capital_from_strategy_in_turn()
 
         self._allocated_capital.variable += self._capital_flow.variable - self._strategy_capital.variable - self._spent_fees.variable
         self._strategy_capital.variable = 0
         self._capital_flow.variable = 0
         self._spent_fees.variable = 0
 
+    async def _transfer_capital_from_strategy_in_turn(self) -> None:
+        """
+        Transfer out changes state shared by instances of same capital, like funds left locked in margin wallet.
+        So it's done holding shared capital keys, with strategy manager config loaded again and saved before releasing them.
+        """
+        shared_keys = self._get_shared_capital_keys(self._strategy.strategy_instance_config)
+        priority = self._priority if self._priority is not None else TaskPriority.EXIT
+        with RequestTracer.span('shared_capital_wait', priority=priority.name):
+            await TaskManager.wait_for_turn(shared_keys, str(self._request_data_id), priority)
+
+        try:
+            self._strategy_manager_config = ConfigManager.fetch_strategy_manager_config(self._strategy_manager_name)
+            self._loaded_strategy_manager_config = copy.deepcopy(self._strategy_manager_config.raw_dict)
+            await self._transfer_capital_from_strategy()
+
+        finally:
+            self._update_strategy_manager_config()
+            self._loaded_strategy_manager_config = copy.deepcopy(self._strategy_manager_config.raw_dict)
+            TaskManager.finish_turn(shared_keys)
+
     def _should_trade_strategy(self) -> bool:
-        if self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_IS_ACTIVE):
+        if self._priority == TaskPriority.ADMIN or self._strategy.strategy_instance_config.get(StrategyManager.CONFIG_KEY_IS_ACTIVE):
             return True
 
         logging.warning(
@@ -1,23 +1,90 @@
 import asyncio
+from dataclasses import dataclass, field
+from enum import IntEnum
+import heapq
+import itertools
 import logging
+from typing import Optional
+
+
+class TaskPriority(IntEnum):
+    """
+    Lower value gets turn first. Exits reduce risk, so they go before entries.
+    """
+    ADMIN = 0
+    EXIT = 1
+    ENTRY = 2
+
+
+@dataclass
+class _KeyQueue:
+    holder: Optional[asyncio.Future] = None
+    waiters: list[tuple[int, int, asyncio.Future]] = field(default_factory=list)
 
 
 class TaskManager:
-    tasks_queue: dict[str, list[str]] = {}
+    """
+    Keyed turns. Task waits to hold every key it asks for, and is woken by the task finishing before it.
+    Waiters of a key get turn by priority, then arrival order.
+    Keys are taken one by one in sorted order, so tasks sharing several keys can't deadlock.
+    """
+
+    tasks_queue: dict[str, _KeyQueue] = {}
+    _arrival_counter = itertools.count()
 
     @staticmethod
-    async def wait_for_turn(group: str, name: str) -> None:
-        if group not in TaskManager.tasks_queue:
-            TaskManager.tasks_queue[group] = []
-
-        TaskManager.tasks_queue[group].append(name)
-        while True:
-            if TaskManager.tasks_queue[group][0] == name:
-                logging.debug('Task Manager - can execute task "%s"', name)
-                return
+    def strategy_instance_key(strategy_name: str, strategy_instance: str) -> str:
+        return f'instance:{strategy_name}:{strategy_instance}'
+
+    @staticmethod
+    async def wait_for_turn(keys: list[str], name: str, priority: TaskPriority = TaskPriority.ENTRY) -> None:
+        acquired = []
+        try:
+            for key in sorted(set(keys)):
+                await TaskManager._wait_for_key(key, priority)
+                acquired.append(key)
+
+        except BaseException:
+            TaskManager.finish_turn(acquired)
+            raise
+
+        logging.debug('Task Manager - can execute task "%s"', name)
 
-            await asyncio.sleep(1)
+    @staticmethod
+    def finish_turn(keys: list[str]) -> None:
+        for key in set(keys):
+            TaskManager._release_key(key)
+
+    @staticmethod
+    async def _wait_for_key(key: str, priority: TaskPriority) -> None:
+        queue = TaskManager.tasks_queue.setdefault(key, _KeyQueue())
+        turn = asyncio.get_running_loop().create_future()
+
+        if queue.holder is None:
+            queue.holder = turn
+            return
+
+        heapq.heappush(queue.waiters, (priority, next(TaskManager._arrival_counter), turn))
+        try:
+            await turn
+
+        except asyncio.CancelledError:
+            # Got the turn just before being cancelled. Otherwise skipped by release.
+            if not turn.cancelled():
+                TaskManager._release_key(key)
+
+            raise
 
     @staticmethod
-    def finish_turn(group: str) -> None:
-        TaskManager.tasks_queue[group].pop(0)
+    def _release_key(key: str) -> None:
+        queue = TaskManager.tasks_queue[key]
+        queue.holder = None
+
+        while queue.waiters:
+            _, _, turn = heapq.heappop(queue.waiters)
+            if not turn.cancelled():
+                queue.holder = turn
+                turn.set_result(None)
+                return
+
+        del TaskManager.tasks_queue[key]
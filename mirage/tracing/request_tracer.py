@@ -0,0 +1,113 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+import logging
+import time
+from typing import Iterator, Optional
+
+import consts
+from mirage.config.config_manager import ConfigManager
+from mirage.database.mongo.write_behind_writer import WriteBehindWriter
+
+
+@dataclass
+class Span:
+    name: str
+    started_at: float
+    finished_at: Optional[float] = None
+    attributes: dict[str, any] = field(default_factory=dict)
+    error: Optional[str] = None
+    children: list['Span'] = field(default_factory=list)
+
+    def to_dict(self, trace_started_at: float) -> dict[str, any]:
+        finished_at = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return {
+            'name': self.name,
+            'start_ms': round((self.started_at - trace_started_at) * 1000, 3),
+            'duration_ms': round((finished_at - self.started_at) * 1000, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+            'children': [child.to_dict(trace_started_at) for child in self.children]
+        }
+
+
+@dataclass
+class RequestTrace:
+    root: Span
+    request_data_id: Optional[str] = None
+
+
+class RequestTracer:
+    """
+    Span tree per webhook request, from receiving it until trade finished. Current trace and span live in context variables,
+    so tasks created while handling request, including concurrent ones, attach their spans to the span that created them.
+    Span calls outside of traced request are no-op. Finished traces are stored next to broker responses.
+    """
+
+    CONFIG_KEY_ENABLED = 'tracing.enabled'
+
+    current_trace: ContextVar[Optional[RequestTrace]] = ContextVar('current_trace', default=None)
+    current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+    @staticmethod
+    def start_trace(name: str) -> None:
+        if not ConfigManager.config.get(RequestTracer.CONFIG_KEY_ENABLED, True):
+            return
+
+        root = Span(name=name, started_at=time.perf_counter())
+        RequestTracer.current_trace.set(RequestTrace(root=root))
+        RequestTracer.current_span.set(root)
+
+    @staticmethod
+    def set_request_data_id(request_data_id: str) -> None:
+        trace = RequestTracer.current_trace.get()
+        if trace is not None:
+            trace.request_data_id = request_data_id
+
+    @staticmethod
+    @contextmanager
+    def span(name: str, **attributes) -> Iterator[Optional[Span]]:
+        parent = RequestTracer.current_span.get()
+        if parent is None:
+            yield None
+            return
+
+        span = Span(name=name, started_at=time.perf_counter(), attributes=attributes)
+        parent.children.append(span)
+        token = RequestTracer.current_span.set(span)
+
+        try:
+            yield span
+
+        except BaseException as exc:
+            span.error = repr(exc)
+            raise
+
+        finally:
+            span.finished_at = time.perf_counter()
+            RequestTracer.current_span.reset(token)
+
+    @staticmethod
+    async def finish_trace() -> None:
+        trace = RequestTracer.current_trace.get()
+        if trace is None:
+            return
+
+        RequestTracer.current_trace.set(None)
+        RequestTracer.current_span.set(None)
+        trace.root.finished_at = time.perf_counter()
+
+        try:
+            root = trace.root.to_dict(trace.root.started_at)
+            WriteBehindWriter.enqueue(
+                consts.DB_NAME_HISTORY,
+                consts.COLLECTION_REQUEST_TRACES,
+                {
+                    'request_data_id': trace.request_data_id,
+                    'total_ms': root['duration_ms'],
+                    'spans': root
+                }
+            )
+
+        except Exception:
+            logging.exception('Failed saving request trace')
@@ -11,3 +11,13 @@ def get_utc_datetime_for_filename() -> str:
 # Example expected format: 2024-01-16T16:47:12
 def iso_string_to_datetime(date_string: str) -> datetime.datetime:
     return datetime.datetime.fromisoformat(date_string)
+
+
+def timenow_to_timestamp(timenow: int | float | str) -> float:
+    """
+    Signal time in seconds. Accepts epoch milliseconds, sent by Mirage security, or iso string of TradingView {{timenow}}.
+    """
+    if isinstance(timenow, str) and not timenow.isdigit():
+        return datetime.datetime.fromisoformat(timenow).timestamp()
+
+    return int(timenow) / 1000
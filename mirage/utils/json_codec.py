@@ -0,0 +1,31 @@
+import json
+
+# Fast codec if installed, stdlib otherwise. ccxt does the same for exchange responses.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data: str | bytes) -> any:
+    if orjson is not None:
+        return orjson.loads(data)
+
+    return json.loads(data)
+
+
+def dumps(data: any) -> str:
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    return json.dumps(data)
+
+
+def load_file(path: str) -> any:
+    with open(path, 'rb') as file:
+        return loads(file.read())
+
+
+def dump_file(path: str, data: any) -> None:
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(dumps(data))
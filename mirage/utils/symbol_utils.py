@@ -1,3 +1,4 @@
+from decimal import Decimal
 import math
 import consts
 
@@ -23,3 +24,11 @@ def floor_amount(number: float, decimals: int) -> float:
     scaled_number = number * (10 ** decimals)
     floored_number = math.floor(scaled_number)
     return floored_number / (10 ** decimals)
+
+
+def floor_to_step(number: float, step: float) -> float:
+    """
+    Decimal math, as float division may floor exact multiples of the step one step lower.
+    """
+    decimal_step = Decimal(str(step))
+    return float((Decimal(str(number)) // decimal_step) * decimal_step)
@@ -0,0 +1,58 @@
+import json
+import random
+import sys
+import timeit
+
+sys.path.append('.')
+from mirage.utils import json_codec  # noqa: E402
+from mirage_security_request_generator import generate_v1_request, generate_v2_request  # noqa: E402
+
+def _balance_response() -> dict[str, any]:
+    # Shape of binance margin account response, the largest one decoded on trade path
+    return {
+        'tradeEnabled': True, 'marginLevel': '999.00000000', 'totalAssetOfBtc': '0.51234000',
+        'userAssets': [
+            {
+                'asset': f'COIN{index}', 'borrowed': '0.00000000', 'free': f'{random.random():.8f}',
+                'interest': '0.00000000', 'locked': '0.00000000', 'netAsset': f'{random.random():.8f}'
+            } for index in range(400)
+        ]
+    }
+
+
+def _payloads() -> dict[str, str]:
+    body = {
+        'strategy': 'crypto_pair_trading', 'strategy_instance': 'default',
+        'data': {'action': 'entry_long', 'ticker': 'BTCUSDT/ETHUSDT', 'close': 0.05321, 'hedge_ratio': 1.1}
+    }
+    keys = ['abcdefghijklmnopqrstuvwxyz0123456789', 'ZYXWVUTSRQPONMLKJIHGFEDCBA98765']
+    return {
+        'webhook v1': json.dumps(generate_v1_request(body, keys, 'secret')),
+        'webhook v2': json.dumps(generate_v2_request(body, keys, 'secret')),
+        'margin account': json.dumps(_balance_response())
+    }
+
+
+def run_benchmark() -> None:
+    """
+    Compare stdlib json with json codec on payloads Mirage decodes. Checks outputs are identical.
+    """
+    print(f'json codec uses {"orjson" if json_codec.orjson is not None else "stdlib json"}')
+    for name, payload in _payloads().items():
+        data = json.loads(payload)
+        assert json_codec.loads(payload) == data and json_codec.loads(json_codec.dumps(data)) == data
+
+        runs = 2000
+        stdlib_loads = timeit.timeit(lambda: json.loads(payload), number=runs) / runs
+        codec_loads = timeit.timeit(lambda: json_codec.loads(payload), number=runs) / runs
+        stdlib_dumps = timeit.timeit(lambda: json.dumps(data), number=runs) / runs
+        codec_dumps = timeit.timeit(lambda: json_codec.dumps(data), number=runs) / runs
+        print(
+            f'{name:>32} {len(payload):>7} bytes: '
+            f'loads {stdlib_loads * 1e6:8.1f}us -> {codec_loads * 1e6:8.1f}us x{stdlib_loads / codec_loads:.1f}, '
+            f'dumps {stdlib_dumps * 1e6:8.1f}us -> {codec_dumps * 1e6:8.1f}us x{stdlib_dumps / codec_dumps:.1f}'
+        )
+
+
+if __name__ == '__main__':
+    run_benchmark()
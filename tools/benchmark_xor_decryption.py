@@ -0,0 +1,59 @@
+import json
+import random
+import timeit
+import warnings
+import numpy as np
+
+
+def _legacy_decrypt(data: str, keys: list[str]) -> dict[str, any]:
+    decrypted_data = bytearray([int(number) for number in data.split(',')])
+    for key in keys:
+        for index, _ in enumerate(decrypted_data):
+            decrypted_data[index] ^= ord(key[index % len(key)])
+
+    return json.loads(decrypted_data.decode())
+
+
+def _vectorized_decrypt(data: str, keys: list[str]) -> dict[str, any]:
+    with warnings.catch_warnings(action='error'):
+        encrypted_data = np.fromstring(data, dtype=np.int64, sep=',').astype(np.uint32)
+
+    key_stream = np.zeros(len(encrypted_data), dtype=np.uint32)
+    for key in keys:
+        key_stream ^= np.resize(np.fromiter(map(ord, key), dtype=np.uint32, count=len(key)), len(encrypted_data))
+
+    return json.loads((encrypted_data ^ key_stream).astype(np.uint8).tobytes().decode())
+
+
+def _encrypt(content: str, keys: list[str]) -> str:
+    encrypted = bytearray(content.encode())
+    for key in keys:
+        for index, _ in enumerate(encrypted):
+            encrypted[index] ^= ord(key[index % len(key)])
+
+    return ','.join(str(number) for number in encrypted)
+
+
+def _random_key() -> str:
+    alphabet = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+    return ''.join(random.choice(alphabet) for _ in range(random.randint(32, 64)))
+
+
+def run_benchmark() -> None:
+    """
+    Compare MirageSecurity decryption before and after vectorizing, across payload sizes. Checks outputs are identical.
+    """
+    keys = [_random_key() for _ in range(3)]
+    for payload_size in [256, 1024, 4096, 16384, 65536]:
+        content = json.dumps({'decrypted_data': {'message': 'x' * payload_size, 'hash': 'h'}})
+        data = _encrypt(content, keys)
+        assert _legacy_decrypt(data, keys) == _vectorized_decrypt(data, keys)
+
+        runs = max(3, 200000 // payload_size)
+        legacy = timeit.timeit(lambda: _legacy_decrypt(data, keys), number=runs) / runs
+        vectorized = timeit.timeit(lambda: _vectorized_decrypt(data, keys), number=runs) / runs
+        print(f'{len(content):>7} bytes: legacy {legacy * 1000:8.3f}ms, vectorized {vectorized * 1000:8.3f}ms, x{legacy / vectorized:.1f}')
+
+
+if __name__ == '__main__':
+    run_benchmark()
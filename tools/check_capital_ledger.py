@@ -0,0 +1,77 @@
+import sys
+import time
+
+sys.path.append('.')
+from mirage.brokers.binance.account_mirror import BinanceAccountMirror  # noqa: E402
+from mirage.config.config import Config  # noqa: E402
+from mirage.config.config_manager import ConfigManager  # noqa: E402
+from mirage.strategy_manager.capital_ledger import CapitalLedger  # noqa: E402
+
+_WALLET = 'funding'
+_POOL = 'binance:funding:USDT'
+
+
+def _enter(wanted: float, balance: float, balance_time: float, owner: str) -> float:
+    """
+    Entry as strategy manager runs it: reserve from balance, transfer to margin wallet, commit what was transferred.
+    """
+    reservation = CapitalLedger.reserve(_POOL, balance, balance_time, wanted, owner)
+    if reservation.amount > 0:
+        BinanceAccountMirror.apply_transfer('USDT', reservation.amount, _WALLET, 'margin')
+    CapitalLedger.commit(reservation, reservation.amount)
+    return reservation.amount
+
+
+def _reset() -> None:
+    CapitalLedger.reservations = {}
+    BinanceAccountMirror.wallets = {}
+    BinanceAccountMirror.transfer_times = {}
+
+
+def check_back_to_back_entries_from_mirror() -> None:
+    _reset()
+    BinanceAccountMirror.update_from_balance(_WALLET, {'USDT': {'free': 1000}}, snapshot_started_at=time.time())
+
+    funded = []
+    for owner in ['entry a', 'entry b']:
+        balance = BinanceAccountMirror.get_free(_WALLET, 'USDT', 60)
+        funded.append(_enter(600, balance, BinanceAccountMirror.get_balance_time(_WALLET), owner))
+
+    assert funded == [600, 400], f'Back to back entries from mirror funded {funded}, expected [600, 400]'
+
+
+def check_back_to_back_entries_from_rest() -> None:
+    _reset()
+    funded = []
+    funding = 1000
+    for owner in ['entry a', 'entry b']:
+        started_at = time.time()
+        funded.append(_enter(600, funding, started_at, owner))
+        funding -= funded[-1]
+
+    assert funded == [600, 400], f'Back to back entries from rest funded {funded}, expected [600, 400]'
+
+
+def check_transfer_during_snapshot_is_deducted() -> None:
+    """
+    Snapshot requested before entry a transferred may not include the transfer, so entry b can't count on those funds.
+    """
+    _reset()
+    BinanceAccountMirror.update_from_balance(_WALLET, {'USDT': {'free': 1000}}, snapshot_started_at=time.time())
+    snapshot_started_at = time.time()
+    assert _enter(600, 1000, BinanceAccountMirror.get_balance_time(_WALLET), 'entry a') == 600
+    BinanceAccountMirror.update_from_balance(_WALLET, {'USDT': {'free': 1000}}, snapshot_started_at=snapshot_started_at)
+
+    funded = _enter(600, BinanceAccountMirror.get_free(_WALLET, 'USDT', 60), BinanceAccountMirror.get_balance_time(_WALLET), 'entry b')
+    assert funded == 400, f'Entry after snapshot without transfer funded {funded}, expected 400'
+
+
+def run_checks() -> None:
+    ConfigManager.config = Config({}, 'check')
+    for check in [check_back_to_back_entries_from_mirror, check_back_to_back_entries_from_rest, check_transfer_during_snapshot_is_deducted]:
+        check()
+        print(f'{check.__name__}: ok')
+
+
+if __name__ == '__main__':
+    run_checks()
@@ -0,0 +1,51 @@
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import sys
+import time
+
+sys.path.append('.')
+from mirage.channels.trading_view.security.security_methods.mirage_security import build_v2_signed_content  # noqa: E402
+
+
+def _xor(content: bytes, xor_keys: list[str]) -> bytearray:
+    encrypted = bytearray(content)
+    for key in xor_keys:
+        for index, _ in enumerate(encrypted):
+            encrypted[index] ^= ord(key[index % len(key)])
+
+    return encrypted
+
+
+def _generate_nonce() -> str:
+    return secrets.token_urlsafe(16)
+
+
+def generate_v1_request(body: dict[str, any], xor_keys: list[str], secret_key: str) -> dict[str, any]:
+    message_content = json.dumps({'message': {'body': body, 'nonce': _generate_nonce(), 'timenow': int(time.time() * 1000)}})
+    message_hash = hashlib.sha256((message_content + secret_key).encode()).hexdigest()
+
+    decrypted_data = json.dumps({'decrypted_data': {'message': message_content, 'hash': message_hash}})
+    data = ','.join(str(number) for number in _xor(decrypted_data.encode(), xor_keys))
+    return {'request': {'data': data}}
+
+
+def generate_v2_request(body: dict[str, any], xor_keys: list[str], secret_key: str) -> dict[str, any]:
+    timenow = int(time.time() * 1000)
+    nonce = _generate_nonce()
+    data = base64.b64encode(_xor(json.dumps(body).encode(), xor_keys)).decode()
+    tag = hmac.new(secret_key.encode(), build_v2_signed_content(timenow, nonce, data).encode(), hashlib.sha256).hexdigest()
+
+    return {'request': {'version': 2, 'data': data, 'timenow': timenow, 'nonce': nonce, 'tag': tag}}
+
+
+if __name__ == '__main__':
+    # Usage: python tools/mirage_security_request_generator.py <config.json> '<body json>' [1|2]
+    with open(sys.argv[1], 'r', encoding='utf-8') as file:
+        security_methods = json.load(file)['channels']['tradingview']['security_methods']
+
+    method_config = next(method['config'] for method in security_methods if method['name'] == 'mirage-security')
+    generator = generate_v1_request if len(sys.argv) > 3 and sys.argv[3] == '1' else generate_v2_request
+    print(json.dumps(generator(json.loads(sys.argv[2]), method_config['xor_keys'], method_config['secret_key'])))